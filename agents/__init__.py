@@ -1,5 +1,11 @@
 from .research_team import ResearchTeam
 from .debug_team import DebugTeam
 from .team_manager import TeamManager
+from .agent_pool import AgentPool
+from .compaction import HistoryCompactor
+from .termination import ConvergenceMonitor, is_termination_msg
+from .streaming import ChatStreamer, last_code_block
+from .progress import report_progress, reporting
 
-__all__ = ['ResearchTeam', 'DebugTeam', 'TeamManager']
+__all__ = ['ResearchTeam', 'DebugTeam', 'TeamManager', 'AgentPool', 'HistoryCompactor', 'ConvergenceMonitor', 'is_termination_msg',
+           'ChatStreamer', 'last_code_block', 'report_progress', 'reporting']
@@ -0,0 +1,105 @@
+from typing import Dict, List, Optional, Callable, Tuple, Any
+import asyncio
+import time
+from contextlib import asynccontextmanager
+import autogen
+from .progress import report_progress
+
+AgentPair = Tuple[autogen.ConversableAgent, autogen.ConversableAgent]
+
+# Per-peer state a ConversableAgent keeps for everyone it has talked to
+PEER_STATE = ("_oai_messages", "_consecutive_auto_reply_counter", "reply_at_receive",
+              "_max_consecutive_auto_reply_dict")
+
+
+def forget_peer(agent: autogen.ConversableAgent, peer: autogen.Agent) -> None:
+    """Drop everything agent keeps about peer, transcript included.
+
+    reset() and clear_history() empty these entries but keep the keys, so
+    an agent that talks to a new peer per chat would hold on to all of them.
+    """
+    for name in PEER_STATE:
+        state = getattr(agent, name, None)
+        if isinstance(state, dict):
+            state.pop(peer, None)
+
+
+async def run_chat(team: Any, coordinator: autogen.UserProxyAgent, recipient: autogen.ConversableAgent,
+                   message: str, use_cache: bool):
+    """Run one coordinator chat of a team without blocking the event loop.
+
+    team supplies the ``compactor``, ``monitor`` and ``tracer`` the chat runs
+    under, its ``cache`` and its ``chat_timeout``. Progress is reported when
+    the chat starts and with its summary once it ends.
+    """
+    report_progress(recipient.name)
+    with team.compactor.chat(recipient.name), team.monitor.chat(recipient.name), team.tracer.chat(recipient.name):
+        chat_result = await asyncio.wait_for(
+            coordinator.a_initiate_chat(
+                recipient,
+                message=message,
+                cache=team.cache if use_cache else None
+            ),
+            timeout=team.chat_timeout
+        )
+    report_progress(recipient.name, {recipient.name: chat_result.summary})
+    return chat_result
+
+
+class AgentPool:
+    """Pre-built assistant/user_proxy pairs handed out one request at a time.
+
+    A checked-out pair belongs to a single chat, so concurrent requests never
+    share message state. Pairs are reset when they come back, which keeps
+    each chat's prompt free of earlier conversations. When every pair is in
+    use, callers wait in line for the next one to be returned.
+    """
+
+    def __init__(self, factory: Callable[[], AgentPair], size: int = 4):
+        if size < 1:
+            raise ValueError("Agent pool needs at least one pair")
+        self.size = size
+        self._pairs: List[AgentPair] = [factory() for _ in range(size)]
+        self._loop = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._waiting = 0
+        self.counters = {"checkouts": 0, "waited": 0}
+        self._total_wait = 0.0
+
+    def _ensure_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._idle = asyncio.Queue()
+            for pair in self._pairs:
+                self._idle.put_nowait(pair)
+
+    @asynccontextmanager
+    async def checkout(self):
+        self._ensure_loop()
+        started = time.monotonic()
+        if self._idle.empty():
+            self.counters["waited"] += 1
+        self._waiting += 1
+        try:
+            pair = await self._idle.get()
+        finally:
+            self._waiting -= 1
+        self.counters["checkouts"] += 1
+        self._total_wait += time.monotonic() - started
+        try:
+            yield pair
+        finally:
+            for agent in pair:
+                agent.reset()
+            self._idle.put_nowait(pair)
+
+    def stats(self) -> Dict[str, Any]:
+        checkouts = self.counters["checkouts"]
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize() if self._idle is not None else self.size,
+            "waiting": self._waiting,
+            "avg_wait_time": self._total_wait / checkouts if checkouts else 0.0,
+            **self.counters
+        }
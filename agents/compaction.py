@@ -0,0 +1,151 @@
+from typing import Dict, List, Optional, Any, Tuple
+import contextvars
+import copy
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from llm.tokens import estimate_tokens, token_budget_chars
+
+
+def _tokens(message: Dict[str, Any]) -> int:
+    content = message.get("content")
+    return estimate_tokens(content) if isinstance(content, str) else 0
+
+
+class CollapseLongMessages:
+    """Cut message bodies over max_tokens down to a head and tail excerpt.
+
+    Code execution output is the usual culprit; its start and its end (where
+    tracebacks and results are) carry most of the signal. The first message
+    is the task itself and is left alone.
+    """
+
+    def __init__(self, max_tokens: int = 1000, head_ratio: float = 0.4):
+        self.max_chars = token_budget_chars(max_tokens)
+        self.head_chars = int(self.max_chars * head_ratio)
+        self.tail_chars = self.max_chars - self.head_chars
+
+    def apply_transform(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        result = []
+        for index, message in enumerate(messages):
+            content = message.get("content")
+            if index > 0 and isinstance(content, str) and len(content) > self.max_chars:
+                omitted = len(content) - self.head_chars - self.tail_chars
+                message = dict(message)
+                message["content"] = (
+                    f"{content[:self.head_chars]}\n[... {omitted} characters omitted ...]\n"
+                    f"{content[-self.tail_chars:]}"
+                )
+            result.append(message)
+        return result
+
+    def get_logs(self, pre_transform_messages: List[Dict], post_transform_messages: List[Dict]) -> Tuple[str, bool]:
+        saved = sum(map(_tokens, pre_transform_messages)) - sum(map(_tokens, post_transform_messages))
+        return f"Collapsed long messages, saving about {saved} tokens.", saved > 0
+
+
+class TokenBudget:
+    """Keep the first message and the most recent ones that fit in max_tokens.
+
+    Dropped turns are noted on the first message so the model knows the
+    history was cut.
+    """
+
+    def __init__(self, max_tokens: int = 8000):
+        self.max_tokens = max_tokens
+
+    def apply_transform(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if len(messages) < 3 or sum(map(_tokens, messages)) <= self.max_tokens:
+            return messages
+        first, rest = messages[0], messages[1:]
+        used = _tokens(first)
+        keep = 0
+        for message in reversed(rest):
+            cost = _tokens(message)
+            if keep and used + cost > self.max_tokens:
+                break
+            used += cost
+            keep += 1
+        recent = rest[len(rest) - keep:]
+        # A tool result can't lead the history without the call that made it
+        while len(recent) > 1 and recent[0].get("role") == "tool":
+            recent = recent[1:]
+        omitted = len(rest) - len(recent)
+        if omitted == 0:
+            return messages
+        first = dict(first)
+        if isinstance(first.get("content"), str):
+            first["content"] += f"\n\n[... {omitted} earlier messages omitted to fit the context budget ...]"
+        return [first] + recent
+
+    def get_logs(self, pre_transform_messages: List[Dict], post_transform_messages: List[Dict]) -> Tuple[str, bool]:
+        omitted = len(pre_transform_messages) - len(post_transform_messages)
+        return f"Dropped {omitted} older messages to fit {self.max_tokens} tokens.", omitted > 0
+
+
+_chat_report: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("chat_report", default=None)
+
+
+class HistoryCompactor:
+    """Compacts the history an agent sends to the model on every turn.
+
+    Registered as a ``process_all_messages_before_reply`` hook, so only the
+    prompt is compacted; the stored chat history stays complete. Transforms
+    follow autogen's ``MessageTransform`` protocol (``apply_transform`` and
+    ``get_logs``) and run in order. Savings are added to the report of the
+    enclosing ``chat()`` scope and to running totals.
+    """
+
+    def __init__(self, transforms: Optional[List[Any]] = None, max_tokens: int = 8000,
+                 max_message_tokens: int = 1000, history: int = 20):
+        self.transforms = transforms if transforms is not None else [
+            CollapseLongMessages(max_message_tokens),
+            TokenBudget(max_tokens)
+        ]
+        self._lock = threading.Lock()
+        self.counters = {"chats": 0, "turns": 0, "compacted_turns": 0, "tokens_before": 0, "tokens_saved": 0}
+        self.recent = deque(maxlen=history)
+
+    def add_to_agent(self, agent) -> None:
+        agent.register_hook(hookable_method="process_all_messages_before_reply", hook=self.process)
+
+    def process(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        before = sum(map(_tokens, messages))
+        processed = copy.copy(messages)
+        for transform in self.transforms:
+            processed = transform.apply_transform(processed)
+        saved = before - sum(map(_tokens, processed))
+
+        with self._lock:
+            self.counters["turns"] += 1
+            self.counters["tokens_before"] += before
+            if saved > 0:
+                self.counters["compacted_turns"] += 1
+                self.counters["tokens_saved"] += saved
+        report = _chat_report.get()
+        if report is not None:
+            report["turns"] += 1
+            report["tokens_before"] += before
+            report["tokens_saved"] += max(saved, 0)
+        return processed
+
+    @contextmanager
+    def chat(self, label: str):
+        """Scope collecting one chat's compaction report"""
+        report = {"chat": label, "turns": 0, "tokens_before": 0, "tokens_saved": 0}
+        token = _chat_report.set(report)
+        try:
+            yield report
+        finally:
+            _chat_report.reset(token)
+            with self._lock:
+                self.counters["chats"] += 1
+                self.recent.append(report)
+            if report["tokens_saved"]:
+                logging.info(f"History compaction saved {report['tokens_saved']} of "
+                             f"{report['tokens_before']} tokens over {report['turns']} turns in {label}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.counters, "recent_chats": list(self.recent)}
@@ -1,42 +1,77 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import autogen
 from pathlib import Path
+from llm import CompletionCache, LLMRouter
+from monitoring import LLMCallMetrics, Tracer
+from .agent_pool import AgentPool, run_chat
+from .compaction import HistoryCompactor
+from .termination import ConvergenceMonitor, is_termination_msg
 import traceback
 
 class DebugTeam:
-    def __init__(self, config_list: List[Dict]):
+    def __init__(self, config_list: List[Dict], cache: Optional[CompletionCache] = None,
+                 chat_timeout: Optional[float] = 300, compactor: Optional[HistoryCompactor] = None,
+                 monitor: Optional[ConvergenceMonitor] = None,
+                 llm_metrics: Optional[LLMCallMetrics] = None, tracer: Optional[Tracer] = None,
+                 router: Optional[LLMRouter] = None, pool_size: int = 2):
         self.llm_config = {
             "config_list": config_list,
             "timeout": 120,
-            "temperature": 0
+            "temperature": 0,
+            "cache_seed": None
         }
+        self.cache = cache
+        self.chat_timeout = chat_timeout
         
-        self.error_analyzer = autogen.AssistantAgent(
+        self.compactor = compactor or HistoryCompactor()
+        self.monitor = monitor or ConvergenceMonitor()
+        self.tracer = tracer or Tracer()
+        self.llm_metrics = llm_metrics
+        self.router = router
+        # Each request checks out its own coordinator and assistants, so
+        # concurrent chats never share message history or replies
+        self.agents = AgentPool(self._make_agents, size=pool_size)
+
+    def _make_agents(self) -> Tuple[autogen.ConversableAgent, ...]:
+        """Build one coordinator with its own set of assistants"""
+        error_analyzer = autogen.AssistantAgent(
             name="error_analyzer",
             llm_config=self.llm_config,
             system_message="You analyze error messages, stack traces, and code context to identify root causes of issues.",
         )
         
-        self.fix_proposer = autogen.AssistantAgent(
+        fix_proposer = autogen.AssistantAgent(
             name="fix_proposer",
             llm_config=self.llm_config,
             system_message="You propose specific code fixes based on error analysis. Focus on robust, maintainable solutions.",
         )
         
-        self.test_validator = autogen.AssistantAgent(
+        test_validator = autogen.AssistantAgent(
             name="test_validator",
             llm_config=self.llm_config,
             system_message="You validate proposed fixes through targeted testing. Ensure fixes don't introduce new issues.",
         )
         
-        self.coordinator = autogen.UserProxyAgent(
+        for agent in (error_analyzer, fix_proposer, test_validator):
+            self.compactor.add_to_agent(agent)
+            self.monitor.add_to_agent(agent)
+            if self.llm_metrics is not None:
+                self.llm_metrics.add_to_agent(agent)
+            if self.router is not None:
+                self.router.add_to_agent(agent)
+            self.tracer.add_to_agent(agent)
+        
+        coordinator = autogen.UserProxyAgent(
             name="debug_coordinator",
             human_input_mode="NEVER",
             code_execution_config={"work_dir": "workspace"},
-            is_termination_msg=lambda msg: "TERMINATE" in msg.get("content", "").upper(),
+            is_termination_msg=is_termination_msg,
         )
+        self.monitor.add_to_agent(coordinator)
+        self.tracer.add_to_agent(coordinator)
+        return coordinator, error_analyzer, fix_proposer, test_validator
 
-    async def analyze_error(self, error_info: Dict) -> Dict:
+    async def analyze_error(self, error_info: Dict, use_cache: bool = True) -> Dict:
         """Analyze error information and propose fixes"""
         results = {}
         
@@ -46,30 +81,40 @@ class DebugTeam:
         Code Context: {error_info.get('context', '')}
         """
         
-        # Error analysis
-        chat_result = self.coordinator.initiate_chat(
-            self.error_analyzer,
-            message=f"Analyze error and identify root cause:\n{error_context}"
-        )
-        results["error_analysis"] = chat_result.last_message["content"]
-        
-        # Fix proposal
-        chat_result = self.coordinator.initiate_chat(
-            self.fix_proposer,
-            message=f"Propose specific code fixes based on analysis:\n{results['error_analysis']}"
-        )
-        results["fix_proposal"] = chat_result.last_message["content"]
-        
-        # Validation plan
-        chat_result = self.coordinator.initiate_chat(
-            self.test_validator,
-            message=f"Design validation tests for proposed fix:\n{results['fix_proposal']}"
-        )
-        results["validation_plan"] = chat_result.last_message["content"]
+        async with self.agents.checkout() as (coordinator, error_analyzer, fix_proposer, test_validator):
+            # Error analysis
+            chat_result = await run_chat(
+                self,
+                coordinator,
+                error_analyzer,
+                f"Analyze error and identify root cause:\n{error_context}",
+                use_cache
+            )
+            results["error_analysis"] = chat_result.summary
+            
+            # Fix proposal
+            chat_result = await run_chat(
+                self,
+                coordinator,
+                fix_proposer,
+                f"Propose specific code fixes based on analysis:\n{results['error_analysis']}",
+                use_cache
+            )
+            results["fix_proposal"] = chat_result.summary
+            
+            # Validation plan
+            chat_result = await run_chat(
+                self,
+                coordinator,
+                test_validator,
+                f"Design validation tests for proposed fix:\n{results['fix_proposal']}",
+                use_cache
+            )
+            results["validation_plan"] = chat_result.summary
         
         return results
 
-    async def validate_fix(self, fix_info: Dict) -> Dict:
+    async def validate_fix(self, fix_info: Dict, use_cache: bool = True) -> Dict:
         """Validate proposed fix through testing"""
         validation_context = f"""
         Original Issue: {fix_info.get('original_issue', '')}
@@ -77,28 +122,39 @@ class DebugTeam:
         Test Cases: {fix_info.get('test_cases', [])}
         """
         
-        chat_result = self.coordinator.initiate_chat(
-            self.test_validator,
-            message=f"Validate fix implementation:\n{validation_context}"
-        )
-        return {"validation_result": chat_result.last_message["content"]}
+        async with self.agents.checkout() as (coordinator, _, _, test_validator):
+            chat_result = await run_chat(
+                self,
+                coordinator,
+                test_validator,
+                f"Validate fix implementation:\n{validation_context}",
+                use_cache
+            )
+        return {"validation_result": chat_result.summary}
 
-    async def debug_code_section(self, code: str, error_message: str) -> Dict:
+    async def debug_code_section(self, code: str, error_message: str, use_cache: bool = True) -> Dict:
         """Debug specific section of code"""
         results = {}
         
-        # Initial error analysis
-        chat_result = self.coordinator.initiate_chat(
-            self.error_analyzer,
-            message=f"Analyze code section and error:\nCode:\n{code}\nError:\n{error_message}"
-        )
-        results["analysis"] = chat_result.last_message["content"]
-        
-        # Generate fix
-        chat_result = self.coordinator.initiate_chat(
-            self.fix_proposer,
-            message=f"Propose fix based on analysis:\n{results['analysis']}"
-        )
-        results["fix"] = chat_result.last_message["content"]
+        async with self.agents.checkout() as (coordinator, error_analyzer, fix_proposer, _):
+            # Initial error analysis
+            chat_result = await run_chat(
+                self,
+                coordinator,
+                error_analyzer,
+                f"Analyze code section and error:\nCode:\n{code}\nError:\n{error_message}",
+                use_cache
+            )
+            results["analysis"] = chat_result.summary
+            
+            # Generate fix
+            chat_result = await run_chat(
+                self,
+                coordinator,
+                fix_proposer,
+                f"Propose fix based on analysis:\n{results['analysis']}",
+                use_cache
+            )
+            results["fix"] = chat_result.summary
         
         return results
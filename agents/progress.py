@@ -0,0 +1,28 @@
+from typing import Dict, Optional, Any, Callable
+import contextvars
+from contextlib import contextmanager
+
+Reporter = Callable[[str, Optional[Dict[str, Any]]], None]
+
+_reporter: contextvars.ContextVar[Optional[Reporter]] = contextvars.ContextVar("progress_reporter", default=None)
+
+
+def report_progress(phase: str, partial: Optional[Dict[str, Any]] = None) -> None:
+    """Tell whoever runs this code which phase it is in, with any results so far.
+
+    Does nothing outside a ``reporting()`` scope, so team code can report
+    unconditionally whether it runs as a job or inside a request.
+    """
+    reporter = _reporter.get()
+    if reporter is not None:
+        reporter(phase, partial)
+
+
+@contextmanager
+def reporting(reporter: Reporter):
+    """Send progress reported in this scope (and tasks started from it) to reporter"""
+    token = _reporter.set(reporter)
+    try:
+        yield
+    finally:
+        _reporter.reset(token)
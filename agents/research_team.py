@@ -1,91 +1,145 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import time
 import autogen
 from pathlib import Path
+from llm import CompletionCache, LLMRouter
+from monitoring import LLMCallMetrics, Tracer
+from .agent_pool import AgentPool, forget_peer, run_chat
+from .compaction import HistoryCompactor
+from .termination import ConvergenceMonitor, is_termination_msg
 
 class ResearchTeam:
-    def __init__(self, config_list: List[Dict]):
+    def __init__(self, config_list: List[Dict], cache: Optional[CompletionCache] = None,
+                 chat_timeout: Optional[float] = 300, fan_out: bool = True, max_concurrent_phases: int = 3,
+                 compactor: Optional[HistoryCompactor] = None, monitor: Optional[ConvergenceMonitor] = None,
+                 llm_metrics: Optional[LLMCallMetrics] = None, tracer: Optional[Tracer] = None,
+                 router: Optional[LLMRouter] = None, pool_size: int = 2):
         self.llm_config = {
             "config_list": config_list,
             "timeout": 120,
-            "temperature": 0
+            "temperature": 0,
+            "cache_seed": None
         }
+        self.cache = cache
+        self.chat_timeout = chat_timeout
+        # Independent phases run concurrently, each with its own coordinator
+        self.fan_out = fan_out
+        self.phase_limit = asyncio.Semaphore(max_concurrent_phases)
         
-        self.code_analyzer = autogen.AssistantAgent(
+        self.compactor = compactor or HistoryCompactor()
+        self.monitor = monitor or ConvergenceMonitor()
+        self.tracer = tracer or Tracer()
+        self.llm_metrics = llm_metrics
+        self.router = router
+        # Each request checks out its own coordinator and assistants, so
+        # concurrent chats never share message history or replies
+        self.agents = AgentPool(self._make_agents, size=pool_size)
+
+    def _make_agents(self) -> Tuple[autogen.ConversableAgent, ...]:
+        """Build one coordinator with its own set of assistants"""
+        code_analyzer = autogen.AssistantAgent(
             name="code_analyzer",
             llm_config=self.llm_config,
             system_message="You analyze code structure, patterns, and potential improvements. Focus on code quality and best practices.",
         )
         
-        self.solution_researcher = autogen.AssistantAgent(
+        solution_researcher = autogen.AssistantAgent(
             name="solution_researcher",
             llm_config=self.llm_config,
             system_message="You research and propose optimal solutions for coding problems. Consider performance, scalability, and maintainability.",
         )
         
-        self.test_strategist = autogen.AssistantAgent(
+        test_strategist = autogen.AssistantAgent(
             name="test_strategist",
             llm_config=self.llm_config,
             system_message="You design comprehensive test strategies. Focus on test coverage, edge cases, and isolation principles.",
         )
         
-        self.coordinator = autogen.UserProxyAgent(
+        for agent in (code_analyzer, solution_researcher, test_strategist):
+            self.compactor.add_to_agent(agent)
+            self.monitor.add_to_agent(agent)
+            if self.llm_metrics is not None:
+                self.llm_metrics.add_to_agent(agent)
+            if self.router is not None:
+                self.router.add_to_agent(agent)
+            self.tracer.add_to_agent(agent)
+        
+        return self._make_coordinator(), code_analyzer, solution_researcher, test_strategist
+
+    def _make_coordinator(self) -> autogen.UserProxyAgent:
+        coordinator = autogen.UserProxyAgent(
             name="research_coordinator",
             human_input_mode="NEVER",
             code_execution_config={"work_dir": "workspace"},
-            is_termination_msg=lambda msg: "TERMINATE" in msg.get("content", "").upper(),
+            is_termination_msg=is_termination_msg,
         )
+        self.monitor.add_to_agent(coordinator)
+        self.tracer.add_to_agent(coordinator)
+        return coordinator
 
-    async def analyze_codebase(self, path: Path) -> Dict:
+    async def analyze_codebase(self, path: Path, use_cache: bool = True, context: Optional[str] = None) -> Dict:
         """Analyze codebase structure and propose improvements"""
-        results = {}
-        
-        # Code analysis
-        chat_result = await self.coordinator.initiate_chat(
-            self.code_analyzer,
-            message=f"Analyze code structure and patterns in: {path}"
-        )
-        results["code_analysis"] = chat_result.last_message["content"]
-        
-        # Solution research
-        chat_result = await self.coordinator.initiate_chat(
-            self.solution_researcher,
-            message=f"Research optimal solutions and improvements for: {path}"
-        )
-        results["solution_research"] = chat_result.last_message["content"]
-        
-        # Test strategy
-        chat_result = await self.coordinator.initiate_chat(
-            self.test_strategist,
-            message=f"Design test strategy for codebase: {path}"
-        )
-        results["test_strategy"] = chat_result.last_message["content"]
-        
-        return results
+        # context is an index of the files and symbols under path
+        overview = f"\n\n{context}" if context else ""
+        async with self.agents.checkout() as (coordinator, code_analyzer, solution_researcher, test_strategist):
+            return await self._run_phases(coordinator, {
+                # Code analysis
+                "code_analysis": (code_analyzer, f"Analyze code structure and patterns in: {path}{overview}"),
+                # Solution research
+                "solution_research": (solution_researcher, f"Research optimal solutions and improvements for: {path}{overview}"),
+                # Test strategy
+                "test_strategy": (test_strategist, f"Design test strategy for codebase: {path}{overview}"),
+            }, use_cache)
 
-    async def research_solution(self, problem_description: str) -> Dict:
+    async def research_solution(self, problem_description: str, use_cache: bool = True) -> Dict:
         """Research solutions for a specific coding problem"""
-        results = {}
-        
-        # Solution research
-        chat_result = await self.coordinator.initiate_chat(
-            self.solution_researcher,
-            message=f"Research solution approaches for: {problem_description}"
-        )
-        results["solution_approaches"] = chat_result.last_message["content"]
-        
-        # Implementation strategy
-        chat_result = await self.coordinator.initiate_chat(
-            self.code_analyzer,
-            message=f"Analyze implementation strategy for: {problem_description}"
-        )
-        results["implementation_strategy"] = chat_result.last_message["content"]
-        
-        return results
+        async with self.agents.checkout() as (coordinator, code_analyzer, solution_researcher, _):
+            return await self._run_phases(coordinator, {
+                # Solution research
+                "solution_approaches": (solution_researcher, f"Research solution approaches for: {problem_description}"),
+                # Implementation strategy
+                "implementation_strategy": (code_analyzer, f"Analyze implementation strategy for: {problem_description}"),
+            }, use_cache)
 
-    async def design_test_plan(self, feature_description: str) -> Dict:
+    async def design_test_plan(self, feature_description: str, use_cache: bool = True) -> Dict:
         """Design comprehensive test plan for a feature"""
-        chat_result = await self.coordinator.initiate_chat(
-            self.test_strategist,
-            message=f"Design complete test plan for: {feature_description}"
-        )
-        return {"test_plan": chat_result.last_message["content"]}
+        async with self.agents.checkout() as (coordinator, _, _, test_strategist):
+            chat_result = await run_chat(
+                self,
+                coordinator,
+                test_strategist,
+                f"Design complete test plan for: {feature_description}",
+                use_cache
+            )
+        return {"test_plan": chat_result.summary}
+
+    async def _run_phases(self, coordinator: autogen.UserProxyAgent,
+                          phases: Dict[str, Tuple[autogen.ConversableAgent, str]], use_cache: bool) -> Dict:
+        """Run phases that don't depend on each other, concurrently in fan-out mode.
+
+        Returns each phase's answer under its name plus ``phase_latency``.
+        """
+        latency = {}
+
+        async def run(name: str, recipient: autogen.ConversableAgent, message: str) -> Tuple[str, str]:
+            async with self.phase_limit:
+                started = time.monotonic()
+                phase_coordinator = self._make_coordinator() if self.fan_out else coordinator
+                try:
+                    chat_result = await run_chat(self, phase_coordinator, recipient, message, use_cache)
+                finally:
+                    if phase_coordinator is not coordinator:
+                        # The recipient outlives this phase's coordinator
+                        forget_peer(recipient, phase_coordinator)
+                latency[name] = time.monotonic() - started
+                return name, chat_result.summary
+
+        if self.fan_out:
+            answers = await asyncio.gather(*(run(name, *phase) for name, phase in phases.items()))
+        else:
+            answers = [await run(name, *phase) for name, phase in phases.items()]
+
+        results = dict(answers)
+        results["phase_latency"] = latency
+        return results
@@ -0,0 +1,101 @@
+from typing import Dict, List, Optional, Any, Callable
+import asyncio
+import contextvars
+import re
+import threading
+from contextlib import contextmanager
+from autogen.io.base import IOStream
+from .termination import message_text
+
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*m")
+
+Publish = Callable[[str, Dict[str, Any]], None]
+
+
+class _EventSink:
+    """IOStream that turns the model's streamed tokens into events.
+
+    With ``stream`` in the LLM config, autogen prints each token to the
+    default IOStream with ``end=""``; its other prints are the console
+    transcript of whole messages, which ``ChatStreamer`` picks up from the
+    send hook instead. Tokens are printed from autogen's worker threads, so
+    events are handed to the loop that opened the stream.
+    """
+
+    def __init__(self, publish: Publish, loop: asyncio.AbstractEventLoop):
+        self._publish = publish
+        self._loop = loop
+        self._thread = threading.get_ident()
+        self.speaker: Optional[str] = None
+
+    def publish(self, event: str, data: Dict[str, Any]):
+        if threading.get_ident() == self._thread:
+            self._publish(event, data)
+        else:
+            self._loop.call_soon_threadsafe(self._publish, event, data)
+
+    def print(self, *objects: Any, sep: str = " ", end: str = "\n", flush: bool = False) -> None:
+        if end != "":
+            return
+        text = ANSI_ESCAPE.sub("", sep.join(map(str, objects)))
+        if text:
+            self.publish("token", {"agent": self.speaker, "text": text})
+
+    def input(self, prompt: str = "", *, password: bool = False) -> str:
+        # Agents run with human_input_mode="NEVER"; nobody is there to answer
+        return ""
+
+
+_sink: contextvars.ContextVar[Optional[_EventSink]] = contextvars.ContextVar("chat_sink", default=None)
+
+
+class ChatStreamer:
+    """Streams agent chats as events while they run.
+
+    Registered on agents, it reports each agent starting a turn
+    (``turn``) and every message sent (``message``); inside a ``stream()``
+    scope the model's tokens arrive as ``token`` events in between. Outside
+    a scope the hooks do nothing.
+    """
+
+    def add_to_agent(self, agent) -> None:
+        def before_reply(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            sink = _sink.get()
+            if sink is not None:
+                sink.speaker = agent.name
+                sink.publish("turn", {"agent": agent.name})
+            return messages
+
+        agent.register_hook(hookable_method="process_all_messages_before_reply", hook=before_reply)
+        agent.register_hook(hookable_method="process_message_before_send", hook=self._before_send)
+
+    def _before_send(self, sender, message, recipient, silent):
+        sink = _sink.get()
+        if sink is not None:
+            sink.publish("message", {
+                "sender": sender.name,
+                "recipient": recipient.name,
+                "content": message_text(message)
+            })
+        return message
+
+    @contextmanager
+    def stream(self, publish: Publish):
+        """Send the events of chats run in this scope to publish, on the current loop"""
+        sink = _EventSink(publish, asyncio.get_running_loop())
+        token = _sink.set(sink)
+        try:
+            with IOStream.set_default(sink):
+                yield sink
+        finally:
+            _sink.reset(token)
+
+
+def last_code_block(texts: List[str], language: str) -> Optional[str]:
+    """The last fenced code block in language among texts, searching from the end"""
+    pattern = re.compile(rf"```[ \t]*{re.escape(language)}[ \t]*\r?\n(.*?)```", re.DOTALL | re.IGNORECASE)
+    for text in reversed(texts):
+        blocks = pattern.findall(text)
+        if blocks:
+            return blocks[-1].strip()
+    return None
@@ -3,29 +3,67 @@ import asyncio
 from pathlib import Path
 from .research_team import ResearchTeam
 from .debug_team import DebugTeam
+from .compaction import HistoryCompactor
+from .termination import ConvergenceMonitor
+from .progress import report_progress
+from analysis.code_index import CodeIndex
+from llm import CompletionCache, LLMRouter
+from monitoring import LLMCallMetrics, Tracer
 
 class TeamManager:
-    def __init__(self, config_list: List[Dict]):
-        self.research_team = ResearchTeam(config_list)
-        self.debug_team = DebugTeam(config_list)
+    def __init__(self, config_list: List[Dict], cache: Optional[CompletionCache] = None,
+                 chat_timeout: Optional[float] = 300, research_concurrency: int = 3,
+                 index_dir: Path = Path(".cache/code_index"), index_tokens: int = 6000,
+                 compactor: Optional[HistoryCompactor] = None, monitor: Optional[ConvergenceMonitor] = None,
+                 llm_metrics: Optional[LLMCallMetrics] = None, tracer: Optional[Tracer] = None,
+                 router: Optional[LLMRouter] = None, team_pool_size: int = 2):
+        self.compactor = compactor or HistoryCompactor()
+        self.monitor = monitor or ConvergenceMonitor()
+        self.research_team = ResearchTeam(config_list, cache, chat_timeout,
+                                          max_concurrent_phases=research_concurrency,
+                                          compactor=self.compactor, monitor=self.monitor,
+                                          llm_metrics=llm_metrics, tracer=tracer, router=router,
+                                          pool_size=team_pool_size)
+        self.debug_team = DebugTeam(config_list, cache, chat_timeout,
+                                    compactor=self.compactor, monitor=self.monitor,
+                                    llm_metrics=llm_metrics, tracer=tracer, router=router,
+                                    pool_size=team_pool_size)
+        self.index_dir = Path(index_dir)
+        self.index_tokens = index_tokens
+        self._indexes: Dict[Path, CodeIndex] = {}
 
-    async def analyze_and_improve(self, path: Path) -> Dict:
+    def _index(self, path: Path) -> CodeIndex:
+        root = Path(path).resolve()
+        if root not in self._indexes:
+            self._indexes[root] = CodeIndex(root, self.index_dir)
+        return self._indexes[root]
+
+    async def analyze_and_improve(self, path: Path, use_cache: bool = True, focus: Optional[str] = None) -> Dict:
         """Coordinate research and debug teams for codebase improvement"""
         results = {}
+
+        # Refresh the index (only changed files are parsed) and give the
+        # teams the slice of it most relevant to the request
+        index = self._index(path)
+        report_progress("indexing")
+        results["index"] = await asyncio.to_thread(index.update)
+        report_progress("indexing", {"index": results["index"]})
+        # render() waits on the index lock while another request re-indexes
+        context = await asyncio.to_thread(index.render, self.index_tokens, query=focus)
         
         # Run research and debug tasks in parallel
         research_task = asyncio.create_task(
-            self.research_team.analyze_codebase(path)
+            self.research_team.analyze_codebase(path, use_cache, context)
         )
         
         # Simulate error info for demonstration
         error_info = {
-            "message": "Analyzing potential issues in codebase",
-            "context": str(path),
+            "message": f"Analyzing potential issues in codebase{': ' + focus if focus else ''}",
+            "context": context,
             "traceback": ""
         }
         debug_task = asyncio.create_task(
-            self.debug_team.analyze_error(error_info)
+            self.debug_team.analyze_error(error_info, use_cache)
         )
         
         # Wait for both teams to complete their analysis
@@ -33,13 +71,13 @@ class TeamManager:
         
         return results
 
-    async def solve_problem(self, problem_description: str) -> Dict:
+    async def solve_problem(self, problem_description: str, use_cache: bool = True) -> Dict:
         """Coordinate teams to solve a specific problem"""
         results = {}
         
         # Research solutions
         results["research"] = await self.research_team.research_solution(
-            problem_description
+            problem_description, use_cache
         )
         
         # Validate proposed solution
@@ -48,17 +86,17 @@ class TeamManager:
             "fix": results["research"]["solution_approaches"],
             "test_cases": []
         }
-        results["validation"] = await self.debug_team.validate_fix(fix_info)
+        results["validation"] = await self.debug_team.validate_fix(fix_info, use_cache)
         
         return results
 
-    async def improve_test_coverage(self, feature_description: str) -> Dict:
+    async def improve_test_coverage(self, feature_description: str, use_cache: bool = True) -> Dict:
         """Design and validate test improvements"""
         results = {}
         
         # Get test plan
         results["test_plan"] = await self.research_team.design_test_plan(
-            feature_description
+            feature_description, use_cache
         )
         
         # Validate test plan
@@ -66,6 +104,6 @@ class TeamManager:
             "original_issue": "Test coverage improvement",
             "fix": str(results["test_plan"]),
             "test_cases": []
-        })
+        }, use_cache)
         
         return results
@@ -0,0 +1,147 @@
+from typing import Dict, List, Optional, Any, Tuple, Union
+import contextvars
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+import autogen
+from llm.tokens import estimate_tokens
+
+# TERMINATE on a line of its own, or as the last sentence of the message, in
+# any case and with markdown decoration. Instructions that merely mention it
+# ("reply TERMINATE when done") don't count.
+TERMINATE_LINE = re.compile(r"^[\s*_`'\"]*terminate[\s.!*_`'\"]*$", re.IGNORECASE | re.MULTILINE)
+TERMINATE_AT_END = re.compile(r"(?:^|[.!?:]\s*)[*_`'\"]*terminate[\s.!*_`'\"]*$", re.IGNORECASE)
+CODE_BLOCK = re.compile(r"```[ \t]*\w*[ \t]*\r?\n.*?```", re.DOTALL)
+EXECUTION_RESULT = re.compile(r"exitcode:\s*(-?\d+)")
+
+
+def message_text(message: Union[Dict[str, Any], str, None]) -> str:
+    """Text of a chat message; empty for tool calls and missing content"""
+    if isinstance(message, str):
+        return message
+    content = (message or {}).get("content")
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return ""
+
+
+def is_termination_msg(message: Union[Dict[str, Any], str, None]) -> bool:
+    text = message_text(message)
+    return bool(TERMINATE_LINE.search(text) or TERMINATE_AT_END.search(text.strip()))
+
+
+_chat_state: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("chat_state", default=None)
+
+
+class ConvergenceMonitor:
+    """Ends agent chats once further turns would be wasted.
+
+    Registered as the first reply function of an agent, it stops the reply
+    (and with it the chat) when the incoming message asks to terminate, when
+    a message repeats one from the last few turns, when code ran
+    successfully and the answer to it carries no new code, or when the chat
+    is over its wall-clock or token limit. Limits and turn counts are per
+    ``chat()`` scope; without one only the message-based checks apply.
+    """
+
+    def __init__(self, max_seconds: Optional[float] = None, max_tokens: Optional[int] = None,
+                 repeat_window: int = 4, history: int = 20):
+        self.max_seconds = max_seconds
+        self.max_tokens = max_tokens
+        self.repeat_window = repeat_window
+        self._lock = threading.Lock()
+        self.counters = {"chats": 0, "turns": 0}
+        self.reasons: Counter = Counter()
+        self.recent = deque(maxlen=history)
+
+    def add_to_agent(self, agent: autogen.ConversableAgent) -> None:
+        agent.register_reply([autogen.Agent, None], self.check, position=0)
+
+    def stop_reason(self, messages: List[Dict[str, Any]], state: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        if not messages:
+            return None
+        last = message_text(messages[-1])
+        if is_termination_msg(last):
+            return "terminated"
+
+        normalized = " ".join(last.split())
+        if normalized:
+            earlier = messages[-1 - self.repeat_window:-1]
+            if any(" ".join(message_text(m).split()) == normalized for m in earlier):
+                return "repeated"
+
+        if not CODE_BLOCK.search(last):
+            for message in reversed(messages[:-1]):
+                result = EXECUTION_RESULT.search(message_text(message))
+                if result:
+                    if result.group(1) == "0":
+                        return "converged"
+                    break
+                if CODE_BLOCK.search(message_text(message)):
+                    break
+
+        if state is not None:
+            if self.max_seconds is not None and time.monotonic() - state["started"] > self.max_seconds:
+                return "time_limit"
+            if self.max_tokens is not None and state["tokens"] > self.max_tokens:
+                return "token_limit"
+        return None
+
+    def check(self, recipient: autogen.ConversableAgent, messages: Optional[List[Dict]] = None,
+              sender: Optional[autogen.Agent] = None, config: Optional[Any] = None) -> Tuple[bool, None]:
+        messages = messages or []
+        state = _chat_state.get()
+        if state is not None:
+            # The history is what the next completion would be sent
+            state["tokens"] += sum(estimate_tokens(message_text(m)) for m in messages)
+        reason = self.stop_reason(messages, state)
+        if state is not None:
+            if reason:
+                state["reason"] = reason
+            else:
+                state["turns"] += 1
+        with self._lock:
+            if reason:
+                self.reasons[reason] += 1
+            else:
+                self.counters["turns"] += 1
+        # A final None reply ends the conversation
+        return (True, None) if reason else (False, None)
+
+    @contextmanager
+    def chat(self, label: str):
+        """Scope for one chat's limits and turn count"""
+        state = {"chat": label, "turns": 0, "tokens": 0, "reason": None, "started": time.monotonic()}
+        token = _chat_state.set(state)
+        try:
+            yield state
+        except BaseException:
+            state["reason"] = state["reason"] or "error"
+            raise
+        finally:
+            _chat_state.reset(token)
+            report = {
+                "chat": label,
+                "turns": state["turns"],
+                "tokens": state["tokens"],
+                "reason": state["reason"] or "reply_limit",
+                "duration": time.monotonic() - state["started"]
+            }
+            with self._lock:
+                self.counters["chats"] += 1
+                self.recent.append(report)
+            logging.info(f"Chat {label} ended ({report['reason']}) after {report['turns']} turns")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.counters,
+                "avg_turns": sum(r["turns"] for r in self.recent) / len(self.recent) if self.recent else 0.0,
+                "stop_reasons": dict(self.reasons),
+                "recent_chats": list(self.recent)
+            }
@@ -0,0 +1,6 @@
+from .chunking import iter_chunks, has_header
+from .map_reduce import map_reduce
+from .profiling import ProfileCache, profile_table, format_profile
+from .code_index import CodeIndex
+
+__all__ = ['iter_chunks', 'has_header', 'map_reduce', 'ProfileCache', 'profile_table', 'format_profile', 'CodeIndex']
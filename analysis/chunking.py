@@ -0,0 +1,59 @@
+from typing import Dict, Optional, Any, Iterator
+import mmap
+import os
+from pathlib import Path
+from llm.tokens import token_budget_chars
+
+TABULAR_SUFFIXES = (".csv", ".tsv")
+
+
+def has_header(path: Path) -> bool:
+    return Path(path).suffix.lower() in TABULAR_SUFFIXES
+
+
+def iter_chunks(path: Path, max_tokens: int = 3000, header: Optional[bool] = None) -> Iterator[Dict[str, Any]]:
+    """Split a file into chunks of about max_tokens on line boundaries.
+
+    The file is memory-mapped and only one chunk is decoded at a time, so
+    memory use does not grow with the file. For tabular files the header
+    row is repeated at the top of every chunk. A single line longer than
+    the budget becomes a chunk of its own.
+    """
+    path = Path(path)
+    if header is None:
+        header = has_header(path)
+    if os.path.getsize(path) == 0:
+        return
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        start = 0
+        header_text = ""
+        if header:
+            end = mm.find(b"\n")
+            start = size if end == -1 else end + 1
+            header_text = mm[:start].decode("utf-8", errors="replace")
+            if not header_text.endswith("\n"):
+                header_text += "\n"
+
+        budget = max(token_budget_chars(max_tokens) - len(header_text), 1)
+        index = 0
+        row = 1
+        while start < size:
+            end = min(start + budget, size)
+            if end < size:
+                newline = mm.rfind(b"\n", start, end)
+                if newline == -1:
+                    newline = mm.find(b"\n", end)
+                end = size if newline == -1 else newline + 1
+            text = mm[start:end].decode("utf-8", errors="replace")
+            rows = text.count("\n") + (0 if text.endswith("\n") else 1)
+            yield {
+                "index": index,
+                "first_row": row,
+                "last_row": row + rows - 1,
+                "text": header_text + text
+            }
+            index += 1
+            row += rows
+            start = end
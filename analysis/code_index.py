@@ -0,0 +1,248 @@
+from typing import Dict, List, Optional, Any, Iterator
+import ast
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from llm.tokens import estimate_tokens
+
+INDEX_VERSION = 1
+SOURCE_SUFFIXES = {
+    ".py": "python", ".java": "java", ".js": "javascript", ".ts": "typescript",
+    ".go": "go", ".rs": "rust", ".c": "c", ".h": "c", ".cpp": "cpp", ".cs": "csharp"
+}
+SKIP_DIRS = {".git", "__pycache__", "node_modules", "venv", ".venv", "env", "build", "dist", ".cache", ".tox"}
+MAX_FILE_BYTES = 1024 * 1024
+
+# Declarations in languages without a parser here; good enough for a symbol list
+DECLARATION_PATTERNS = [
+    ("class", re.compile(r"^\s*(?:export\s+)?(?:public\s+|private\s+|protected\s+)?(?:abstract\s+|final\s+|static\s+)*"
+                         r"(?:class|interface|enum|struct|trait)\s+(\w+)", re.M)),
+    ("function", re.compile(r"^\s*(?:export\s+)?(?:async\s+)?function\s*\*?\s*(\w+)\s*\(", re.M)),
+    ("function", re.compile(r"^\s*func\s+(?:\([^)]*\)\s*)?(\w+)\s*\(", re.M)),
+    ("function", re.compile(r"^\s*(?:pub\s+)?fn\s+(\w+)", re.M)),
+    ("method", re.compile(r"^\s*(?:public|private|protected)\s+(?:static\s+)?(?:final\s+)?[\w<>\[\],\s]+?\s+(\w+)\s*\([^;]*$", re.M)),
+]
+
+IMPORT_PATTERN = re.compile(r"^\s*(?:import|from|#include|using|require)\s+[\"<]?([\w./:-]+)", re.M)
+
+
+def _first_line(text: Optional[str]) -> str:
+    return text.strip().splitlines()[0] if text and text.strip() else ""
+
+
+def _python_symbols(source: str) -> Dict[str, Any]:
+    tree = ast.parse(source)
+    symbols = []
+
+    def signature(node) -> str:
+        return f"{node.name}({ast.unparse(node.args)})"
+
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            symbols.append({"kind": "function", "name": node.name, "line": node.lineno,
+                            "signature": signature(node), "doc": _first_line(ast.get_docstring(node))})
+        elif isinstance(node, ast.ClassDef):
+            bases = ", ".join(ast.unparse(base) for base in node.bases)
+            symbols.append({"kind": "class", "name": node.name, "line": node.lineno,
+                            "signature": f"{node.name}({bases})" if bases else node.name,
+                            "doc": _first_line(ast.get_docstring(node))})
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    symbols.append({"kind": "method", "name": f"{node.name}.{item.name}", "line": item.lineno,
+                                    "signature": signature(item), "doc": _first_line(ast.get_docstring(item))})
+
+    imports = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            imports.add(node.module)
+    return {"doc": _first_line(ast.get_docstring(tree)), "symbols": symbols, "imports": sorted(imports)}
+
+
+def _generic_symbols(source: str) -> Dict[str, Any]:
+    symbols = []
+    seen = set()
+    for kind, pattern in DECLARATION_PATTERNS:
+        for match in pattern.finditer(source):
+            name = match.group(1)
+            line = source.count("\n", 0, match.start(1)) + 1
+            if (name, line) in seen or name in ("if", "for", "while", "switch", "return", "new"):
+                continue
+            seen.add((name, line))
+            symbols.append({"kind": kind, "name": name, "line": line,
+                            "signature": match.group(0).strip().rstrip("{").strip(), "doc": ""})
+    symbols.sort(key=lambda symbol: symbol["line"])
+    return {"doc": "", "symbols": symbols, "imports": sorted(set(IMPORT_PATTERN.findall(source)))}
+
+
+def parse_source(source: str, language: str) -> Dict[str, Any]:
+    """Symbols, imports and a one-line summary for a source file"""
+    if language == "python":
+        try:
+            parsed = _python_symbols(source)
+        except SyntaxError as e:
+            parsed = {"doc": f"(syntax error on line {e.lineno})", "symbols": [], "imports": []}
+    else:
+        parsed = _generic_symbols(source)
+
+    kinds: Dict[str, List[str]] = {}
+    for symbol in parsed["symbols"]:
+        if symbol["kind"] != "method":
+            kinds.setdefault(symbol["kind"], []).append(symbol["name"])
+    parts = [parsed["doc"]] if parsed["doc"] else []
+    parts.extend(f"{kind}es {', '.join(names)}" if kind == "class" else f"{kind}s {', '.join(names)}"
+                 for kind, names in kinds.items())
+    if parsed["imports"]:
+        parts.append(f"imports {', '.join(parsed['imports'][:10])}")
+    parsed["summary"] = "; ".join(parts) or "no top-level definitions"
+    parsed["lines"] = source.count("\n") + 1
+    return parsed
+
+
+class CodeIndex:
+    """On-disk index of a source tree, updated incrementally.
+
+    Each file entry keeps its content hash, mtime and size, the symbols
+    parsed from it and a one-line summary. ``update()`` only reads files
+    whose mtime or size changed and only re-parses those whose hash did.
+    ``render()`` turns the slice of the index most relevant to a query into
+    prompt text within a token budget.
+    """
+
+    def __init__(self, root: Path, index_dir: Path):
+        self.root = Path(root).resolve()
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        key = hashlib.sha256(str(self.root).encode()).hexdigest()[:16]
+        self.path = self.index_dir / f"{self.root.name or 'root'}-{key}.json"
+        self._lock = threading.Lock()
+        self.files: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION and data.get("root") == str(self.root):
+                return data["files"]
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning(f"Rebuilding unreadable code index: {str(e)}")
+        return {}
+
+    def _save(self):
+        tmp = self.path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"version": INDEX_VERSION, "root": str(self.root), "files": self.files}, f)
+        os.replace(tmp, self.path)
+
+    def _sources(self) -> Iterator[Path]:
+        if self.root.is_file():
+            if self.root.suffix in SOURCE_SUFFIXES:
+                yield self.root
+            return
+        for directory, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS and not d.startswith("."))
+            for filename in sorted(filenames):
+                if Path(filename).suffix in SOURCE_SUFFIXES:
+                    yield Path(directory) / filename
+
+    def _relative(self, path: Path) -> str:
+        if self.root.is_file():
+            return path.name
+        return path.relative_to(self.root).as_posix()
+
+    def update(self) -> Dict[str, int]:
+        """Bring the index in line with the tree, returning what changed"""
+        with self._lock:
+            counts = {"files": 0, "parsed": 0, "unchanged": 0, "removed": 0}
+            seen = set()
+            for path in self._sources():
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                if stat.st_size > MAX_FILE_BYTES:
+                    continue
+                name = self._relative(path)
+                seen.add(name)
+                counts["files"] += 1
+                entry = self.files.get(name)
+                if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                    counts["unchanged"] += 1
+                    continue
+
+                data = path.read_bytes()
+                digest = hashlib.sha256(data).hexdigest()
+                if entry and entry["hash"] == digest:
+                    entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                    counts["unchanged"] += 1
+                    continue
+
+                language = SOURCE_SUFFIXES[path.suffix]
+                entry = parse_source(data.decode("utf-8", errors="replace"), language)
+                entry.update(hash=digest, mtime_ns=stat.st_mtime_ns, size=stat.st_size, language=language)
+                self.files[name] = entry
+                counts["parsed"] += 1
+
+            for name in set(self.files) - seen:
+                del self.files[name]
+                counts["removed"] += 1
+            self._save()
+            return counts
+
+    def _rank(self, query: Optional[str]) -> List[str]:
+        terms = {term for term in re.findall(r"[a-z0-9]+", (query or "").lower()) if len(term) > 2}
+        # Modules imported by many others are the ones to understand first
+        imported = {}
+        for entry in self.files.values():
+            for module in entry["imports"]:
+                leaf = module.replace("/", ".").split(".")[-1]
+                imported[leaf] = imported.get(leaf, 0) + 1
+
+        def score(name: str) -> float:
+            entry = self.files[name]
+            stem = Path(name).stem
+            value = imported.get(stem, 0) + min(len(entry["symbols"]), 20) / 20
+            if terms:
+                words = set(re.findall(r"[a-z0-9]+", (name + " " + entry["summary"] + " " +
+                                                      " ".join(s["name"] for s in entry["symbols"])).lower()))
+                value += 5 * len(terms & words)
+            return value
+
+        return sorted(self.files, key=lambda name: (-score(name), name))
+
+    def render(self, max_tokens: int = 6000, query: Optional[str] = None) -> str:
+        """Prompt text for the files most relevant to query, within max_tokens"""
+        # update() may be changing the entries from another request
+        with self._lock:
+            return self._render(max_tokens, query)
+
+    def _render(self, max_tokens: int, query: Optional[str]) -> str:
+        lines = [f"Code index of {self.root.name}: {len(self.files)} files"]
+        used = estimate_tokens(lines[0])
+        omitted = 0
+        for name in self._rank(query):
+            entry = self.files[name]
+            block = [f"\n{name} ({entry['language']}, {entry['lines']} lines): {entry['summary']}"]
+            for symbol in entry["symbols"]:
+                doc = f"  # {symbol['doc']}" if symbol["doc"] else ""
+                block.append(f"  L{symbol['line']} {symbol['kind']} {symbol['signature']}{doc}")
+            text = "\n".join(block)
+            cost = estimate_tokens(text)
+            if used + cost > max_tokens:
+                # Fall back to just the summary line before giving up on the file
+                text, cost = block[0], estimate_tokens(block[0])
+                if used + cost > max_tokens:
+                    omitted += 1
+                    continue
+            lines.append(text)
+            used += cost
+        if omitted:
+            lines.append(f"\n({omitted} less relevant files omitted)")
+        return "\n".join(lines)
@@ -0,0 +1,102 @@
+from typing import Dict, List, Optional, Any, Callable, Awaitable, Iterable
+import asyncio
+from llm.tokens import estimate_tokens
+
+Ask = Callable[[str], Awaitable[Optional[str]]]
+
+MAP_TEMPLATE = """You are analyzing part of a larger data file (chunk {number}, rows {first_row}-{last_row}).
+Only this part is shown. Report the findings from this part that matter for the analysis prompt,
+including counts and values needed to combine with other parts. Be concise.
+
+Analysis prompt:
+{prompt}
+
+Data:
+{text}
+"""
+
+REDUCE_TEMPLATE = """Below are partial analyses of consecutive parts of one data file.
+Combine them into a single answer to the analysis prompt, merging counts and values
+across parts rather than listing the parts separately.
+
+Analysis prompt:
+{prompt}
+
+Partial analyses:
+{partials}
+"""
+
+
+async def map_chunks(chunks: Iterable[Dict[str, Any]], prompt: str, ask: Ask, concurrency: int = 4) -> List[str]:
+    """Analyze chunks concurrently, reading the next chunk only once a slot frees up"""
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    tasks = []
+
+    async def analyze(chunk: Dict[str, Any]) -> Optional[str]:
+        try:
+            return await ask(MAP_TEMPLATE.format(
+                number=chunk["index"] + 1,
+                first_row=chunk["first_row"],
+                last_row=chunk["last_row"],
+                prompt=prompt,
+                text=chunk["text"]
+            ))
+        finally:
+            semaphore.release()
+
+    try:
+        for chunk in chunks:
+            await semaphore.acquire()
+            tasks.append(asyncio.ensure_future(analyze(chunk)))
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    return [result or "" for result in results]
+
+
+def group_partials(partials: List[str], max_tokens: int) -> List[List[str]]:
+    """Pack consecutive partial answers into groups within the token budget"""
+    groups, current, used = [], [], 0
+    for partial in partials:
+        tokens = estimate_tokens(partial)
+        if current and used + tokens > max_tokens:
+            groups.append(current)
+            current, used = [], 0
+        current.append(partial)
+        used += tokens
+    if current:
+        groups.append(current)
+    # Always make progress, even when single partials exceed the budget
+    if len(groups) == len(partials) and len(partials) > 1:
+        groups = [partials[i:i + 2] for i in range(0, len(partials), 2)]
+    return groups
+
+
+async def reduce_partials(partials: List[str], prompt: str, ask: Ask, max_tokens: int = 3000,
+                          concurrency: int = 4) -> Optional[str]:
+    """Combine partial answers level by level until one answer remains"""
+    if not partials:
+        return None
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def combine(group: List[str]) -> str:
+        if len(group) == 1:
+            return group[0]
+        text = "\n\n".join(f"Part {number}:\n{partial}" for number, partial in enumerate(group, 1))
+        async with semaphore:
+            return await ask(REDUCE_TEMPLATE.format(prompt=prompt, partials=text)) or ""
+
+    while len(partials) > 1:
+        partials = await asyncio.gather(*(combine(group) for group in group_partials(partials, max_tokens)))
+    return partials[0]
+
+
+async def map_reduce(chunks: Iterable[Dict[str, Any]], prompt: str, ask: Ask, max_tokens: int = 3000,
+                     concurrency: int = 4) -> Optional[str]:
+    """Analyze each chunk, then reduce the partial answers into one"""
+    partials = await map_chunks(chunks, prompt, ask, concurrency)
+    if len(partials) == 1:
+        return partials[0] or None
+    return await reduce_partials(partials, prompt, ask, max_tokens, concurrency)
@@ -0,0 +1,329 @@
+from typing import Dict, List, Optional, Any
+import csv
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import threading
+from collections import Counter
+from pathlib import Path
+import numpy as np
+
+NULL_TOKENS = np.array(["", "na", "n/a", "nan", "null", "none"])
+BATCH_ROWS = 10000
+MAX_DISTINCT = 10000
+TOP_VALUES = 5
+# Numeric values kept per column for quantiles; exact up to this many
+QUANTILE_SAMPLE = 10000
+# Longer cells are shortened before profiling: NumPy string arrays are as
+# wide as their longest value, so one huge cell would inflate the whole batch
+MAX_CELL_CHARS = 200
+
+
+def _cell(value: str) -> str:
+    """The value, or its first MAX_CELL_CHARS characters plus a hash that keeps it distinct"""
+    if len(value) <= MAX_CELL_CHARS:
+        return value
+    digest = hashlib.sha256(value.encode("utf-8", errors="replace")).hexdigest()[:12]
+    return f"{value[:MAX_CELL_CHARS]}...[{len(value)} chars #{digest}]"
+
+
+class _Column:
+    """Running statistics for one column, fed a batch of raw strings at a time.
+
+    Numeric columns keep a count, mean and sum of squared deviations merged
+    batch by batch, the exact min and max and a fixed-size reservoir of
+    values for the quantiles, so memory doesn't grow with the file.
+    """
+
+    def __init__(self, name: str, seed: int = 0):
+        self.name = name
+        self.count = 0
+        self.nulls = 0
+        self.numeric = True
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.integral = True
+        self.reservoir = np.empty(QUANTILE_SAMPLE, dtype=np.float64)
+        self._rng = np.random.default_rng(seed)
+        self.counts: Counter = Counter()
+        self.truncated = False
+
+    def add(self, raw: np.ndarray) -> Optional[np.ndarray]:
+        """Take a batch; returns its numbers while the column is still numeric"""
+        values = np.char.strip(raw)
+        missing = np.isin(np.char.lower(values), NULL_TOKENS)
+        values = values[~missing]
+        self.count += len(raw)
+        self.nulls += int(missing.sum())
+        # Raw values are tallied either way, so a column that turns out not
+        # to be numeric still has its distinct values
+        self._count(values)
+        if not self.numeric:
+            return None
+        try:
+            numbers = values.astype(np.float64)
+        except ValueError:
+            self.numeric = False
+            return None
+        self._add_numbers(numbers)
+        return numbers
+
+    def _add_numbers(self, numbers: np.ndarray):
+        if len(numbers) == 0:
+            return
+        # Chan et al.'s merge of two partial means and squared deviations
+        count = len(numbers)
+        mean = float(np.mean(numbers))
+        m2 = float(np.sum((numbers - mean) ** 2))
+        total = self.n + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.n * count / total
+        self.min = min(self.min, float(np.min(numbers)))
+        self.max = max(self.max, float(np.max(numbers)))
+        finite = numbers[np.isfinite(numbers)]
+        self.integral = self.integral and bool(np.all(np.mod(finite, 1) == 0))
+
+        # Reservoir sampling: fill it, then value number i replaces a random
+        # slot with probability QUANTILE_SAMPLE / i
+        fill = min(max(QUANTILE_SAMPLE - self.n, 0), count)
+        self.reservoir[self.n:self.n + fill] = numbers[:fill]
+        if fill < count:
+            seen = np.arange(self.n + fill + 1, total + 1)
+            slots = (self._rng.random(len(seen)) * seen).astype(np.int64)
+            keep = slots < QUANTILE_SAMPLE
+            self.reservoir[slots[keep]] = numbers[fill:][keep]
+        self.n = total
+
+    def _count(self, values: np.ndarray):
+        distinct, counts = np.unique(values, return_counts=True)
+        for value, count in zip(distinct.tolist(), counts.tolist()):
+            if value in self.counts or len(self.counts) < MAX_DISTINCT:
+                self.counts[value] += count
+            else:
+                self.truncated = True
+
+    def summary(self) -> Dict[str, Any]:
+        summary = {"name": self.name, "nulls": self.nulls}
+        if not self.numeric:
+            summary["type"] = "string"
+            summary["distinct"] = len(self.counts) if not self.truncated else f">{MAX_DISTINCT}"
+            summary["top_values"] = [[value, count] for value, count in self.counts.most_common(TOP_VALUES)]
+        elif self.n == 0:
+            summary["type"] = "empty"
+        else:
+            sample = self.reservoir[:min(self.n, QUANTILE_SAMPLE)]
+            quantiles = [self.min, *np.quantile(sample, [0.25, 0.5, 0.75]).tolist(), self.max]
+            summary.update({
+                "type": "integer" if self.integral else "float",
+                "mean": self.mean,
+                "std": math.sqrt(self.m2 / self.n),
+                "quantiles": dict(zip(["min", "p25", "p50", "p75", "max"], (float(q) for q in quantiles)))
+            })
+        return summary
+
+
+class _Correlations:
+    """Running co-moments of the columns that can still be correlated.
+
+    Only numeric columns without nulls line up row for row, and a column
+    that loses either property never regains it, so the candidates are
+    fixed by the first batch and dropped ones are left out at the end.
+    """
+
+    def __init__(self):
+        self.columns: Optional[List[_Column]] = None
+        self.n = 0
+        self.shift = None
+        self.sums = None
+        self.products = None
+
+    def add(self, columns: List[_Column], numbers: List[Optional[np.ndarray]]):
+        if self.columns is None:
+            self.columns = [column for column, values in zip(columns, numbers)
+                            if values is not None and column.nulls == 0]
+            self._index = [columns.index(column) for column in self.columns]
+        if len(self.columns) < 2:
+            return
+        live = [i for i in self._index if numbers[i] is not None and columns[i].nulls == 0]
+        if len(live) < len(self._index):
+            # A candidate hit a null or a non-number; its rows no longer line up
+            if len(live) < 2:
+                self.columns = []
+                return
+            keep = [self._index.index(i) for i in live]
+            self.columns = [columns[i] for i in live]
+            self._index = live
+            if self.sums is not None:
+                self.shift, self.sums = self.shift[keep], self.sums[keep]
+                self.products = self.products[np.ix_(keep, keep)]
+        matrix = np.vstack([numbers[i] for i in self._index])
+        if self.shift is None:
+            # Shifting by the first batch's means keeps the sums well conditioned
+            self.shift = matrix.mean(axis=1)
+            self.sums = np.zeros(len(self._index))
+            self.products = np.zeros((len(self._index), len(self._index)))
+        matrix = matrix - self.shift[:, None]
+        self.n += matrix.shape[1]
+        self.sums += matrix.sum(axis=1)
+        self.products += matrix @ matrix.T
+
+    def strongest(self, limit: int = 10) -> List[Dict[str, Any]]:
+        if not self.columns or len(self.columns) < 2 or self.n < 3:
+            return []
+        mean = self.sums / self.n
+        covariance = self.products / self.n - np.outer(mean, mean)
+        scale = np.sqrt(np.clip(np.diag(covariance), 0, None))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            coefficients = covariance / np.outer(scale, scale)
+        pairs = []
+        for i in range(len(self.columns)):
+            for j in range(i + 1, len(self.columns)):
+                if np.isfinite(coefficients[i, j]):
+                    pairs.append({"columns": [self.columns[i].name, self.columns[j].name],
+                                  "r": round(float(np.clip(coefficients[i, j], -1, 1)), 4)})
+        pairs.sort(key=lambda pair: abs(pair["r"]), reverse=True)
+        return pairs[:limit]
+
+
+def profile_table(path: Path, sample_rows: int = 20, seed: int = 0) -> Dict[str, Any]:
+    """Parse a CSV/TSV file once and summarize every column.
+
+    Rows are read in batches and each column's batch is typed, null-counted
+    and tallied with NumPy; cells over MAX_CELL_CHARS are shortened first.
+    Only running statistics and bounded samples are kept between batches,
+    so memory stays flat however long the file is. The profile holds
+    per-column types, null counts, quantiles or top values, the strongest
+    correlations between numeric columns and a uniform random sample of
+    rows.
+    """
+    path = Path(path)
+    delimiter = "\t" if path.suffix.lower() == ".tsv" else ","
+    rng = random.Random(seed)
+    sample: List[List[str]] = []
+    rows = 0
+
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        header = next(reader, None)
+        if header is None:
+            return {"rows": 0, "columns": [], "correlations": [], "header": [], "sample": [],
+                    "delimiter": delimiter}
+        columns = [_Column(name, seed + index) for index, name in enumerate(header)]
+        correlations = _Correlations()
+        width = len(header)
+
+        batch: List[List[str]] = []
+
+        def flush():
+            # One array per column, so a long cell only widens its own column
+            numbers = [column.add(np.array([row[index] for row in batch], dtype=str))
+                       for index, column in enumerate(columns)]
+            correlations.add(columns, numbers)
+            batch.clear()
+
+        for row in reader:
+            if not row:
+                continue
+            row = [_cell(value) for value in (row + [""] * width)[:width]]
+            rows += 1
+            # Reservoir sampling keeps the sample uniform over the whole file
+            if len(sample) < sample_rows:
+                sample.append(row)
+            else:
+                slot = rng.randrange(rows)
+                if slot < sample_rows:
+                    sample[slot] = row
+            batch.append(row)
+            if len(batch) >= BATCH_ROWS:
+                flush()
+        if batch:
+            flush()
+
+    return {
+        "rows": rows,
+        "header": header,
+        "columns": [column.summary() for column in columns],
+        "correlations": correlations.strongest(),
+        "sample": sample,
+        "delimiter": delimiter
+    }
+
+
+def format_profile(profile: Dict[str, Any]) -> str:
+    """Compact text rendering of a profile for a prompt"""
+    lines = [f"Rows: {profile['rows']}", f"Columns: {len(profile['columns'])}", ""]
+    for column in profile["columns"]:
+        details = [f"type={column['type']}", f"nulls={column['nulls']}"]
+        if "quantiles" in column:
+            q = column["quantiles"]
+            details.append(f"mean={column['mean']:.6g} std={column['std']:.6g}")
+            details.append(f"min={q['min']:.6g} p25={q['p25']:.6g} p50={q['p50']:.6g} p75={q['p75']:.6g} max={q['max']:.6g}")
+        if "top_values" in column:
+            top = ", ".join(f"{value!r}:{count}" for value, count in column["top_values"])
+            details.append(f"distinct={column['distinct']} top=[{top}]")
+        lines.append(f"- {column['name']}: " + " ".join(details))
+    if profile["correlations"]:
+        lines.append("")
+        lines.append("Strongest correlations:")
+        for pair in profile["correlations"]:
+            lines.append(f"- {pair['columns'][0]} ~ {pair['columns'][1]}: r={pair['r']}")
+    if profile["sample"]:
+        lines.append("")
+        lines.append("Sample rows:")
+        # Profiles cached before the delimiter was recorded came from CSVs
+        delimiter = profile.get("delimiter", ",")
+        lines.append(delimiter.join(profile["header"]))
+        lines.extend(delimiter.join(row) for row in profile["sample"])
+    return "\n".join(lines)
+
+
+class ProfileCache:
+    """Profiles of tabular files kept on disk as JSON.
+
+    Entries are keyed by the file's resolved path, mtime and size, so an
+    unchanged file is never parsed twice and an edited one is re-profiled.
+    """
+
+    def __init__(self, directory: Path, sample_rows: int = 20):
+        self.directory = Path(directory)
+        self.sample_rows = sample_rows
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0}
+
+    def _entry(self, path: Path) -> Path:
+        stat = os.stat(path)
+        key = f"{Path(path).resolve()}|{stat.st_mtime_ns}|{stat.st_size}|{self.sample_rows}"
+        return self.directory / f"{hashlib.sha256(key.encode()).hexdigest()}.json"
+
+    def profile(self, path: Path) -> Dict[str, Any]:
+        entry = self._entry(path)
+        try:
+            with open(entry) as f:
+                profile = json.load(f)
+            with self._lock:
+                self.counters["hits"] += 1
+            return profile
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning(f"Discarding unreadable profile: {str(e)}")
+
+        with self._lock:
+            self.counters["misses"] += 1
+        profile = profile_table(path, self.sample_rows)
+        tmp = entry.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(profile, f)
+        os.replace(tmp, entry)
+        return profile
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.counters)
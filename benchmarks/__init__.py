@@ -0,0 +1,5 @@
+from .stub_llm import StubLLMServer
+from .load import SCENARIOS, run_load
+from .report import percentile, summarize, format_table
+
+__all__ = ['StubLLMServer', 'SCENARIOS', 'run_load', 'percentile', 'summarize', 'format_table']
@@ -0,0 +1,118 @@
+"""Run the app against a stub LLM and report latency, throughput and RSS per load level"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+import httpx
+from .load import SCENARIOS, run_load
+from .report import RssSampler, format_table, load_results, summarize
+from .stub_llm import StubLLMServer
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(client: httpx.AsyncClient, server: subprocess.Popen, timeout: float = 120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            if (await client.get("/stats")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError("Server did not start in time")
+
+
+async def benchmark(args, server: subprocess.Popen, base_url: str) -> List[Dict[str, Any]]:
+    results = []
+    limits = httpx.Limits(max_connections=max(args.concurrency) + 10)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.request_timeout, limits=limits) as client:
+        await wait_ready(client, server)
+        for name in args.scenarios:
+            for concurrency in args.concurrency:
+                async with RssSampler(server.pid) as rss:
+                    run = await run_load(client, SCENARIOS[name], concurrency, args.requests, args.duration)
+                result = {"scenario": name, "concurrency": concurrency,
+                          **summarize(run["samples"], run["elapsed"]), **rss.summary()}
+                results.append(result)
+                print(format_table([result]).splitlines()[1], flush=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    parser.add_argument("--scenarios", default="execute_code,workflow,generate_python",
+                        type=lambda value: value.split(","),
+                        help=f"comma-separated, from {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", default="1,4,16", type=lambda value: [int(v) for v in value.split(",")],
+                        help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="requests per level")
+    parser.add_argument("--duration", type=float, help="cap on seconds per level")
+    parser.add_argument("--request-timeout", type=float, default=300)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="stub seconds to first token")
+    parser.add_argument("--llm-token-rate", type=float, default=50, help="stub tokens per second")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra server environment, e.g. CODE_POOL_SIZE=8")
+    parser.add_argument("--output", type=Path, help="where to save the run as JSON")
+    parser.add_argument("--compare", type=Path, help="saved run to show relative changes against")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    port = free_port()
+    with StubLLMServer(args.llm_latency, token_rate=args.llm_token_rate) as llm, \
+            tempfile.TemporaryDirectory(prefix="bench-") as scratch:
+        env = {
+            **os.environ,
+            "LLM_BASE_URL": llm.base_url,
+            "LLM_MODEL": "stub",
+            # A fresh cache per run keeps runs comparable
+            "LLM_CACHE_DIR": str(Path(scratch) / "llm"),
+            **dict(item.split("=", 1) for item in args.env)
+        }
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=ROOT, env=env
+        )
+        try:
+            print(format_table([]))
+            results = asyncio.run(benchmark(args, server, f"http://127.0.0.1:{port}"))
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    print()
+    baseline = load_results(args.compare) if args.compare else None
+    print(format_table(results, baseline))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({
+                "started": datetime.utcnow().isoformat(),
+                "config": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+                "results": results
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Closed-loop load generator for the app's endpoints"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import httpx
+
+Scenario = Callable[[httpx.AsyncClient, int], Awaitable[None]]
+
+POLL_INTERVAL = 0.02
+
+# How a workflow step reads its dependencies' output
+INPUTS = "import json, os\ninputs = json.loads(os.environ['WORKFLOW_INPUTS'])"
+
+
+class Rejected(Exception):
+    """The server shed the request (429) instead of failing it"""
+
+
+def _check(response: httpx.Response) -> Dict[str, Any]:
+    if response.status_code == 429:
+        raise Rejected(response.text)
+    response.raise_for_status()
+    return response.json()
+
+
+async def _poll(client: httpx.AsyncClient, url: str, done: Callable[[Dict[str, Any]], bool]) -> Dict[str, Any]:
+    while True:
+        status = _check(await client.get(url))
+        if done(status):
+            return status
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+async def execute_code(client: httpx.AsyncClient, index: int):
+    started = _check(await client.post("/execute_code", json={
+        "code": f"print(sum(range({1000 + index})))",
+        "language": "python"
+    }))
+    status = await _poll(client, f"/execution_status/{started['execution_id']}",
+                         lambda s: s["status"] in ("completed", "error"))
+    if status["status"] != "completed":
+        raise RuntimeError(status.get("error") or "execution failed")
+
+
+async def workflow(client: httpx.AsyncClient, index: int):
+    created = _check(await client.post("/workflow/create", json={
+        "name": f"bench-{index}",
+        "steps": [
+            {"type": "code", "id": "source", "code": f"print({index})"},
+            {"type": "code", "id": "double", "depends_on": ["source"], "code": f"{INPUTS}\nprint(int(inputs['source']) * 2)"},
+            {"type": "code", "id": "square", "depends_on": ["source"], "code": f"{INPUTS}\nprint(int(inputs['source']) ** 2)"}
+        ]
+    }))
+    _check(await client.post(f"/workflow/execute/{created['id']}"))
+    status = await _poll(client, f"/workflow/status/{created['id']}",
+                         lambda s: s["status"] in ("completed", "error"))
+    if status["status"] != "completed":
+        raise RuntimeError(status.get("error") or "workflow failed")
+
+
+async def generate_python(client: httpx.AsyncClient, index: int):
+    # Distinct prompts so neither the completion cache nor request
+    # coalescing turns the run into a cache benchmark
+    _check(await client.post("/generate_python", json={
+        "prompt": f"Write a function returning the first {index} primes",
+        "use_cache": False
+    }))
+
+
+async def solve_problem(client: httpx.AsyncClient, index: int):
+    _check(await client.post("/solve_problem", params={
+        "problem_description": f"Find why request {index} times out",
+        "use_cache": False
+    }))
+
+
+async def improve_tests(client: httpx.AsyncClient, index: int):
+    _check(await client.post("/improve_tests", params={
+        "feature_description": f"Pagination of result page {index}",
+        "use_cache": False
+    }))
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "execute_code": execute_code,
+    "workflow": workflow,
+    "generate_python": generate_python,
+    "solve_problem": solve_problem,
+    "improve_tests": improve_tests
+}
+
+
+async def run_load(client: httpx.AsyncClient, scenario: Scenario, concurrency: int, requests: int,
+                   duration: Optional[float] = None) -> Dict[str, Any]:
+    """Keep concurrency requests in flight until requests are done or duration is up.
+
+    Returns the per-request samples and the wall-clock time the level took.
+    """
+    samples: List[Dict[str, Any]] = []
+    counter = iter(range(requests))
+    started = time.perf_counter()
+    deadline = started + duration if duration else None
+
+    async def user():
+        for index in counter:
+            if deadline and time.perf_counter() >= deadline:
+                return
+            begun = time.perf_counter()
+            outcome = "ok"
+            error = None
+            try:
+                await scenario(client, index)
+            except Rejected:
+                outcome = "rejected"
+            except Exception as e:
+                outcome = "error"
+                error = f"{type(e).__name__}: {e}"
+            samples.append({"latency": time.perf_counter() - begun, "outcome": outcome, "error": error})
+
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return {"samples": samples, "elapsed": time.perf_counter() - started}
@@ -0,0 +1,147 @@
+"""Latency, throughput and memory summaries of load runs"""
+import asyncio
+import json
+import math
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)]
+
+
+def summarize(samples: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """Latency percentiles of successful requests, throughput and outcome counts"""
+    latencies = [s["latency"] for s in samples if s["outcome"] == "ok"]
+    outcomes = {"ok": 0, "rejected": 0, "error": 0}
+    for sample in samples:
+        outcomes[sample["outcome"]] += 1
+    summary = {
+        "requests": len(samples),
+        **outcomes,
+        "elapsed": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "mean": sum(latencies) / len(latencies) if latencies else None,
+        "max": max(latencies) if latencies else None
+    }
+    for p in PERCENTILES:
+        summary[f"p{p}"] = percentile(latencies, p)
+    errors = sorted({s["error"] for s in samples if s["error"]})
+    if errors:
+        summary["errors"] = errors[:5]
+    return summary
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """Resident set size of a process; None where it can't be read"""
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class RssSampler:
+    """Samples a process's RSS in the background while a load level runs"""
+
+    def __init__(self, pid: int, interval: float = 0.25):
+        self.pid = pid
+        self.interval = interval
+        self.samples: List[int] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _sample(self):
+        while True:
+            rss = rss_bytes(self.pid)
+            if rss is not None:
+                self.samples.append(rss)
+            await asyncio.sleep(self.interval)
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self._sample())
+        return self
+
+    async def __aexit__(self, *exc):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        rss = rss_bytes(self.pid)
+        if rss is not None:
+            self.samples.append(rss)
+
+    def summary(self) -> Dict[str, Optional[int]]:
+        return {
+            "rss_peak": max(self.samples) if self.samples else None,
+            "rss_end": self.samples[-1] if self.samples else None
+        }
+
+
+def _format(value: Any, unit: str) -> str:
+    if value is None:
+        return "-"
+    if unit == "ms":
+        return f"{value * 1000:.1f}"
+    if unit == "MB":
+        return f"{value / (1024 * 1024):.1f}"
+    return f"{value:.1f}" if isinstance(value, float) else str(value)
+
+
+COLUMNS = [("p50", "ms"), ("p95", "ms"), ("p99", "ms"), ("throughput", "req/s"),
+           ("ok", ""), ("rejected", ""), ("error", ""), ("rss_peak", "MB")]
+
+
+def format_table(results: List[Dict[str, Any]], baseline: Optional[List[Dict[str, Any]]] = None) -> str:
+    """Text table of a run, with the relative change against baseline where levels match"""
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline or []}
+    header = ["scenario", "conc"] + [f"{name} ({unit})" if unit else name for name, unit in COLUMNS]
+    rows = [header]
+    for result in results:
+        row = [result["scenario"], str(result["concurrency"])]
+        before = previous.get((result["scenario"], result["concurrency"]))
+        for name, unit in COLUMNS:
+            cell = _format(result.get(name), unit)
+            if before and isinstance(result.get(name), (int, float)) and before.get(name):
+                cell += f" {(result[name] / before[name] - 1) * 100:+.0f}%"
+            row.append(cell)
+        rows.append(row)
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    return "\n".join("  ".join(cell.ljust(width) for cell, width in zip(row, widths)) for row in rows)
+
+
+def load_results(path: Path) -> List[Dict[str, Any]]:
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def main():
+    """Compare two saved runs: python -m benchmarks.report BASELINE CURRENT"""
+    if len(sys.argv) != 3:
+        print(main.__doc__)
+        sys.exit(2)
+    print(format_table(load_results(Path(sys.argv[2])), load_results(Path(sys.argv[1]))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""OpenAI-compatible chat completions server with scripted, timed replies"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Union
+from llm.tokens import estimate_tokens
+
+Replies = Union[str, List[str], Callable[[Dict[str, Any]], str]]
+
+
+class StubLLMServer:
+    """Answers /v1/chat/completions like an LLM server would, minus the model.
+
+    ``latency`` is the time to the first token and ``token_rate`` the
+    tokens per second after it (``None`` sends the reply at once), so the
+    response time of a reply grows with its length. ``replies`` is a fixed
+    reply, a list cycled through, or a function of the request body.
+    Streaming requests get the reply as server-sent event chunks. Setting
+    ``status`` to an HTTP error code makes every request fail with it,
+    health checks on /v1/models included.
+    """
+
+    def __init__(self, latency: float = 0.0, reply: Replies = "Done. TERMINATE",
+                 token_rate: Optional[float] = None, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.token_rate = token_rate
+        self.status = 200
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        if callable(reply):
+            self._reply = reply
+        else:
+            replies = itertools.cycle([reply] if isinstance(reply, str) else list(reply))
+            self._reply = lambda body: next(replies)
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with server._lock:
+                    server.requests += 1
+                    number = server.requests
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    server._respond(self, body, number)
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+            def do_GET(self):
+                # Health checks; not counted as requests
+                if self.path.rstrip("/").endswith("/models") and server.status == 200:
+                    models = {"object": "list", "data": [{"id": "stub", "object": "model"}]}
+                    server._send(self, 200, json.dumps(models).encode(), "application/json")
+                else:
+                    server._send(self, server.status if server.status != 200 else 404, b"{}", "application/json")
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _send(self, handler: BaseHTTPRequestHandler, status: int, payload: bytes, content_type: str):
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def _respond(self, handler: BaseHTTPRequestHandler, body: Dict[str, Any], number: int):
+        time.sleep(self.latency)
+        if self.status != 200:
+            error = json.dumps({"error": {"message": "stub failure", "type": "server_error"}}).encode()
+            self._send(handler, self.status, error, "application/json")
+            return
+
+        with self._lock:
+            reply = self._reply(body)
+        prompt_tokens = sum(estimate_tokens(str(m.get("content") or "")) for m in body.get("messages", []))
+        completion_tokens = estimate_tokens(reply)
+        base = {
+            "id": f"stub-{number}",
+            "created": int(time.time()),
+            "model": body.get("model", "stub")
+        }
+
+        if not body.get("stream"):
+            if self.token_rate:
+                time.sleep(completion_tokens / self.token_rate)
+            payload = json.dumps({
+                **base,
+                "object": "chat.completion",
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": reply}
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens
+                }
+            }).encode()
+            self._send(handler, 200, payload, "application/json")
+            return
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        # Roughly one token per chunk, as real servers stream
+        pieces = [reply[i:i + 4] for i in range(0, len(reply), 4)] or [""]
+        for index, piece in enumerate(pieces):
+            if self.token_rate and index:
+                time.sleep(1 / self.token_rate)
+            chunk = {**base, "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+            handler.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            handler.wfile.flush()
+        final = {**base, "object": "chat.completion.chunk",
+                 "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        handler.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode())
+        handler.wfile.flush()
+        handler.close_connection = True
+
+    def start(self) -> "StubLLMServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve scripted chat completions for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds to the first token")
+    parser.add_argument("--token-rate", type=float, default=50, help="tokens per second after the first")
+    parser.add_argument("--reply", action="append", help="reply text; repeat to cycle through several")
+    args = parser.parse_args()
+
+    server = StubLLMServer(args.latency, args.reply or "Done. TERMINATE", args.token_rate, args.host, args.port)
+    print(f"Stub LLM serving {server.base_url}")
+    try:
+        server.start()._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
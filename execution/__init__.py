@@ -0,0 +1,17 @@
+from .interpreter_pool import InterpreterPool
+from .output_stream import OutputStream
+from .output import OutputCapture, OutputSpool, OutputRangeUnavailable
+from .store import ExecutionStore
+from .scheduler import ExecutionScheduler, QueueFull
+from .workflow_runner import WorkflowGraphError, validate_graph, run_workflow_graph
+from .java_build import JavaBuilder
+from .java_pool import JavaSnippetPool
+from .jobs import JobManager
+from .limits import ResourceLimits, classify_exit, kill_process_group, spawn_options
+
+__all__ = [
+    'InterpreterPool', 'OutputStream', 'OutputCapture', 'OutputSpool', 'OutputRangeUnavailable',
+    'ExecutionStore', 'ExecutionScheduler', 'QueueFull',
+    'WorkflowGraphError', 'validate_graph', 'run_workflow_graph', 'JavaBuilder', 'JavaSnippetPool', 'JobManager',
+    'ResourceLimits', 'classify_exit', 'kill_process_group', 'spawn_options'
+]
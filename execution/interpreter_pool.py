@@ -0,0 +1,317 @@
+from typing import Dict, List, Optional, Any, Callable
+import asyncio
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from .limits import ResourceLimits, classify_exit, kill_process_group, spawn_options
+from .output import OutputCapture
+
+WORKER_SCRIPT = Path(__file__).with_name("interpreter_worker.py")
+
+# Receives (stream, chunk) as the snippet writes to stdout or stderr
+OutputCallback = Callable[[str, str], None]
+
+# Worker events are JSON lines carrying at most CHUNK_SIZE characters of
+# output, which can grow several times over once escaped.
+STREAM_LIMIT = 1024 * 1024
+
+# Output written straight to fd 2 is kept up to this many characters (the end)
+STRAY_STDERR_LIMIT = 64 * 1024
+
+
+class WorkerCrashed(Exception):
+    pass
+
+
+class InterpreterWorker:
+    """A single pre-started interpreter that runs one snippet at a time"""
+
+    def __init__(self, proc: asyncio.subprocess.Process):
+        self.proc = proc
+        self.runs = 0
+        self.pid = proc.pid
+        self._stray_stderr: List[str] = []
+        self._stderr_task = asyncio.create_task(self._drain_stderr())
+
+    @classmethod
+    async def spawn(cls, python: str, preload: List[str], cwd: Optional[str] = None) -> "InterpreterWorker":
+        return await cls.start([python, str(WORKER_SCRIPT), "--preload", ",".join(preload)], cwd)
+
+    @classmethod
+    async def start(cls, args: List[str], cwd: Optional[str] = None,
+                    preexec_fn: Optional[Callable[[], None]] = None) -> "InterpreterWorker":
+        """Start a worker process and wait for its ready event"""
+        proc = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=cwd,
+            limit=STREAM_LIMIT,
+            # Its own process group, so a kill takes whatever snippets spawned with it
+            **spawn_options(preexec_fn)
+        )
+        worker = cls(proc)
+        event = await worker._read_event()
+        if event is None or event.get("event") != "ready":
+            await worker.kill()
+            detail = "".join(worker._stray_stderr).strip()
+            raise WorkerCrashed(f"{cls.__name__} failed to start" + (f": {detail}" if detail else ""))
+        if event["failed"]:
+            logging.warning(f"Interpreter worker could not preload: {', '.join(event['failed'])}")
+        return worker
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.returncode is None
+
+    async def _drain_stderr(self):
+        # Output written straight to fd 2 (C extensions, child processes)
+        while True:
+            chunk = await self.proc.stderr.read(65536)
+            if not chunk:
+                break
+            self._stray_stderr.append(chunk.decode(errors="replace"))
+            if sum(map(len, self._stray_stderr)) > STRAY_STDERR_LIMIT:
+                self._stray_stderr = ["".join(self._stray_stderr)[-STRAY_STDERR_LIMIT:]]
+
+    async def _read_event(self) -> Optional[Dict[str, Any]]:
+        try:
+            line = await self.proc.stdout.readline()
+        except (ValueError, asyncio.LimitOverrunError):
+            return None
+        if not line:
+            return None
+        return json.loads(line)
+
+    async def run(self, code: str, on_output: Optional[OutputCallback] = None,
+                  limits: Optional[ResourceLimits] = None, capture: Optional[OutputCapture] = None,
+                  env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        self.runs += 1
+        self._stray_stderr.clear()
+        capture = capture or OutputCapture()
+        started = time.perf_counter()
+        usage: Dict[str, Any] = {}
+        killed = None
+
+        request = {"code": code}
+        if limits is not None:
+            request["limits"] = limits.to_dict()
+        if env:
+            request["env"] = env
+        self.proc.stdin.write((json.dumps(request) + "\n").encode())
+        try:
+            await self.proc.stdin.drain()
+        except ConnectionError:
+            raise WorkerCrashed("Interpreter worker is not accepting work")
+
+        while True:
+            event = await self._read_event()
+            if event is None:
+                # The snippet took the interpreter down with it (os._exit,
+                # segfault, ...); report it the way a dying `python -c` would.
+                returncode = await self.proc.wait()
+                await self._stderr_task
+                ok = returncode == 0
+                killed = classify_exit(returncode, limits)
+                break
+            if event["event"] in ("stdout", "stderr"):
+                await capture.awrite(event["event"], event["data"])
+            elif event["event"] == "done":
+                ok = event["ok"]
+                usage = event.get("usage") or {}
+                if event.get("limit") == "oom":
+                    killed = {"status": "oom"}
+                elif event.get("returncode") is not None:
+                    # A limited run's forked process was killed by a signal
+                    killed = classify_exit(event["returncode"], limits)
+                break
+            if on_output is not None:
+                on_output(event["event"], event["data"])
+
+        stray = "".join(self._stray_stderr)
+        if stray:
+            await capture.awrite("stderr", stray)
+            if on_output is not None:
+                on_output("stderr", stray)
+
+        usage = {"wall_time": time.perf_counter() - started, **usage}
+        if not ok:
+            error = capture.text("stderr")
+            if killed is not None and "error" in killed:
+                error = f"{error}\n{killed['error']}" if error else killed["error"]
+            return {
+                'status': killed["status"] if killed is not None else 'error',
+                'error': error if error else 'Unknown error occurred',
+                'usage': usage
+            }
+        return {
+            'status': 'completed',
+            'result': capture.text("stdout"),
+            'usage': usage
+        }
+
+    async def kill(self):
+        # The whole group: a snippet's children outlive the worker otherwise
+        kill_process_group(self.proc)
+        if self.alive:
+            await self.proc.wait()
+        await self._stderr_task
+
+
+class InterpreterPool:
+    """Pool of warm Python interpreters with a shared list of preloaded modules.
+
+    Each worker runs one snippet at a time in a fresh namespace and is
+    replaced after ``max_runs`` executions or as soon as it dies. Runs are
+    held to ``limits`` unless run() is given its own; a limited run happens
+    in a child the worker forks for it, so the worker itself stays unlimited.
+    """
+
+    def __init__(self, size: int = 4, preload: Optional[List[str]] = None,
+                 max_runs: int = 50, python: str = sys.executable, cwd: Optional[str] = None,
+                 on_spawn: Optional[Callable[[float], None]] = None,
+                 limits: Optional[ResourceLimits] = None):
+        if size < 1:
+            raise ValueError("Interpreter pool needs at least one worker")
+        self.size = size
+        self.preload = list(preload or [])
+        self.max_runs = max_runs
+        self.python = python
+        self.cwd = cwd
+        # Called with each worker's startup time in seconds
+        self.on_spawn = on_spawn
+        self.limits = limits
+        self._loop = None
+        self._idle: Optional[asyncio.Queue] = None
+        self._workers: List[InterpreterWorker] = []
+        self._spawning: set = set()
+        self._live = 0
+        self.counters = {"spawned": 0, "recycled": 0, "crashed": 0, "runs": 0, "timeouts": 0, "oom": 0}
+
+    def _ensure_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # Subprocess transports are bound to the loop that created them, so a
+        # pool reused from another loop starts over with fresh workers.
+        for worker in self._workers:
+            kill_process_group(worker.proc)
+        self._loop = loop
+        self._idle = asyncio.Queue()
+        self._workers = []
+        self._spawning = set()
+        self._live = 0
+        for _ in range(self.size):
+            self._start_worker()
+
+    def _start_worker(self):
+        self._live += 1
+        task = asyncio.create_task(self._spawn_into_pool())
+        self._spawning.add(task)
+        task.add_done_callback(self._spawning.discard)
+
+    async def _spawn_into_pool(self):
+        try:
+            worker = await self._spawn()
+        except Exception as e:
+            logging.error(f"Error starting interpreter worker: {str(e)}")
+            self._live -= 1
+            # Wake a waiter so it can retry the spawn itself and see the error
+            self._idle.put_nowait(None)
+            return
+        self._idle.put_nowait(worker)
+
+    async def _spawn_worker(self) -> InterpreterWorker:
+        return await InterpreterWorker.spawn(self.python, self.preload, self.cwd)
+
+    async def _spawn(self) -> InterpreterWorker:
+        started = time.perf_counter()
+        worker = await self._spawn_worker()
+        if self.on_spawn is not None:
+            self.on_spawn(time.perf_counter() - started)
+        self._workers.append(worker)
+        self.counters["spawned"] += 1
+        return worker
+
+    async def start(self):
+        """Pre-start the workers so the first executions don't pay for it"""
+        self._ensure_loop()
+
+    async def _acquire(self) -> InterpreterWorker:
+        while True:
+            worker = await self._idle.get()
+            if worker is not None:
+                return worker
+            if self._live < self.size:
+                self._live += 1
+                try:
+                    return await self._spawn()
+                except Exception:
+                    self._live -= 1
+                    raise
+
+    async def _release(self, worker: InterpreterWorker):
+        if worker.alive and worker.runs < self.max_runs:
+            self._idle.put_nowait(worker)
+            return
+        if worker.alive:
+            self.counters["recycled"] += 1
+        else:
+            self.counters["crashed"] += 1
+        self._workers.remove(worker)
+        self._live -= 1
+        await worker.kill()
+        self._start_worker()
+
+    async def run(self, code: str, on_output: Optional[OutputCallback] = None,
+                  timeout: Optional[float] = None, limits: Optional[ResourceLimits] = None,
+                  capture: Optional[OutputCapture] = None, env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Run code on a free worker; past timeout seconds the worker is killed.
+
+        Output is collected in capture, by default one holding a bounded
+        head and tail in memory. env adds environment variables for this run.
+        """
+        self._ensure_loop()
+        worker = await self._acquire()
+        self.counters["runs"] += 1
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(worker.run(code, on_output, limits or self.limits, capture, env), timeout)
+        except asyncio.TimeoutError:
+            await worker.kill()
+            self.counters["timeouts"] += 1
+            return {
+                'status': 'timeout',
+                'error': f'Execution timed out after {timeout} seconds',
+                'usage': {'wall_time': time.perf_counter() - started}
+            }
+        except BaseException:
+            # A half-finished exchange leaves the protocol out of sync
+            await worker.kill()
+            raise
+        finally:
+            await self._release(worker)
+        if result['status'] == 'timeout':
+            self.counters["timeouts"] += 1
+        elif result['status'] == 'oom':
+            self.counters["oom"] += 1
+        return result
+
+    async def close(self):
+        # Workers still starting would outlive the pool otherwise
+        await asyncio.gather(*self._spawning, return_exceptions=True)
+        for worker in list(self._workers):
+            await worker.kill()
+        self._workers = []
+        self._loop = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": self.size,
+            "live": self._live,
+            "idle": self._idle.qsize() if self._idle is not None else 0,
+            **self.counters
+        }
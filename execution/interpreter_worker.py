@@ -0,0 +1,283 @@
+"""Long-lived Python interpreter driven by InterpreterPool.
+
+The worker imports the preload modules once, then reads one JSON request per
+line from stdin, runs the snippet in a fresh namespace and streams its output
+back to the pool as JSON events on stdout. Requests may carry environment
+variables, set for the duration of the run, and resource
+limits; those snippets run in a forked child that sets them as hard rlimits,
+so the snippet can't raise them and the worker itself is never limited.
+"""
+import argparse
+import codecs
+import importlib
+import io
+import json
+import math
+import os
+import signal
+import sys
+import tempfile
+import traceback
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+CHUNK_SIZE = 16384
+
+# Exit status of a forked run that ran out of memory (MemoryError)
+OOM_EXIT = 3
+
+# Limit fields sent by the pool -> rlimit names
+RLIMITS = {
+    "cpu_seconds": "RLIMIT_CPU",
+    "memory_bytes": "RLIMIT_AS",
+    "open_files": "RLIMIT_NOFILE",
+    "processes": "RLIMIT_NPROC",
+}
+
+
+def cpu_time(who) -> float:
+    usage = resource.getrusage(who)
+    return usage.ru_utime + usage.ru_stime
+
+
+def apply_limits(limits):
+    """Lower soft and hard rlimits of a forked run, for good"""
+    if resource is None:
+        return
+    for field, name in RLIMITS.items():
+        value = (limits or {}).get(field)
+        if not value or not hasattr(resource, name):
+            continue
+        kind = getattr(resource, name)
+        # A forked child's CPU time starts from zero
+        value = math.ceil(value)
+        # SIGKILL comes at the hard CPU limit, so leave a second for SIGXCPU
+        ceiling = value + 1 if field == "cpu_seconds" else value
+        soft, hard = resource.getrlimit(kind)
+        if hard != resource.RLIM_INFINITY:
+            value, ceiling = min(value, hard), min(ceiling, hard)
+        resource.setrlimit(kind, (value, ceiling))
+
+
+def run_usage(before):
+    """CPU time of the worker and its reaped children since before"""
+    if resource is None:
+        return {}
+    cpu = cpu_time(resource.RUSAGE_SELF) + cpu_time(resource.RUSAGE_CHILDREN)
+    if before is None:
+        return {"cpu_time": cpu}
+    return {"cpu_time": cpu - before["cpu_time"]}
+
+
+def kill_strays():
+    """SIGKILL whatever the last run left behind in the worker's process group.
+
+    Background children of a snippet would otherwise keep running, and
+    writing to the worker's fd 1 and fd 2, into the next execution.
+    """
+    if not hasattr(os, "getpgrp"):
+        # No process groups (Windows): they go when the pool kills the worker
+        return
+    me = os.getpid()
+    # Only a worker leading its own group; in a forked run this is the pool's
+    if os.getpgrp() != me:
+        return
+    try:
+        pids = [int(name) for name in os.listdir("/proc") if name.isdigit()]
+    except OSError:
+        # No /proc: they go when the pool kills the worker's group
+        return
+    for pid in pids:
+        try:
+            if pid != me and os.getpgid(pid) == me:
+                os.kill(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+    # Reap the ones that were our own children
+    while True:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            break
+
+
+class EventStream(io.TextIOBase):
+    """Line-buffered text stream that forwards writes as pool events"""
+
+    def __init__(self, name: str, emit):
+        self.name = name
+        self._emit = emit
+        self._buffer = ""
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if not isinstance(text, str):
+            raise TypeError(f"write() argument must be str, not {type(text).__name__}")
+        self._buffer += text
+        if "\n" in self._buffer or len(self._buffer) >= CHUNK_SIZE:
+            cut = self._buffer.rfind("\n") + 1 or len(self._buffer)
+            self._send(self._buffer[:cut])
+            self._buffer = self._buffer[cut:]
+        return len(text)
+
+    def flush(self):
+        if self._buffer:
+            self._send(self._buffer)
+            self._buffer = ""
+
+    def _send(self, text):
+        for i in range(0, len(text), CHUNK_SIZE):
+            self._emit({"event": self.name, "data": text[i:i + CHUNK_SIZE]})
+
+
+class Worker:
+    def __init__(self, preload):
+        # Keep private handles on the control pipes, then point fd 0 at
+        # /dev/null and fd 1 at a scratch file so snippets (and any processes
+        # they spawn) can't corrupt the protocol stream.
+        self.control_in = os.fdopen(os.dup(0), "r", encoding="utf-8")
+        self.control_out = os.fdopen(os.dup(1), "w", encoding="utf-8")
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.close(devnull)
+        self.fd_stdout = tempfile.TemporaryFile()
+        os.dup2(self.fd_stdout.fileno(), 1)
+
+        self.stdout = EventStream("stdout", self.emit)
+        self.stderr = EventStream("stderr", self.emit)
+        self.stdin = open(os.devnull, "r")
+        self.cwd = os.getcwd()
+        # Match `python -c`, which puts the working directory first on sys.path
+        sys.path[0] = ""
+        self.sys_path = list(sys.path)
+
+        self.preloaded, self.failed = [], []
+        for name in preload:
+            try:
+                importlib.import_module(name)
+                self.preloaded.append(name)
+            except Exception:
+                self.failed.append(name)
+
+    def emit(self, event):
+        self.control_out.write(json.dumps(event) + "\n")
+        self.control_out.flush()
+
+    def reset(self):
+        sys.stdout, sys.stderr = self.stdout, self.stderr
+        sys.stdin = self.stdin
+        sys.argv = ["-c"]
+        sys.path[:] = self.sys_path
+        os.chdir(self.cwd)
+
+    def run(self, code: str, env=None):
+        """Run code, returning whether it succeeded and the limit it hit, if any"""
+        self.reset()
+        namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+        ok = True
+        hit = None
+        previous_env = {name: os.environ.get(name) for name in env or {}}
+        os.environ.update(env or {})
+        try:
+            exec(compile(code, "<string>", "exec"), namespace)
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                ok = False
+                if not isinstance(e.code, int):
+                    print(e.code, file=sys.stderr)
+        except BaseException as e:
+            ok = False
+            if isinstance(e, MemoryError):
+                hit = "oom"
+            # Drop this frame so tracebacks look like they do under `python -c`
+            traceback.print_exception(type(e), e, e.__traceback__.tb_next, file=self.stderr)
+        finally:
+            namespace.clear()
+            for name, value in previous_env.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+        kill_strays()
+        self.stdout.flush()
+        self.stderr.flush()
+        self.collect_fd_output()
+        return ok, hit
+
+    def run_limited(self, code: str, limits, env=None):
+        """Run code in a forked child held to limits.
+
+        Returns what run() does, the child's returncode when a signal ended
+        it (as subprocess reports it) and the child's own usage.
+        """
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                apply_limits(limits)
+                ok, hit = self.run(code, env)
+                status = 0 if ok else OOM_EXIT if hit == "oom" else 1
+            finally:
+                os._exit(status)
+        _, status, rusage = os.wait4(pid, 0)
+        kill_strays()
+        # Output the child was killed before forwarding
+        self.collect_fd_output()
+        usage = {
+            "cpu_time": rusage.ru_utime + rusage.ru_stime,
+            # Peak of this run's process (kilobytes on Linux)
+            "max_rss": rusage.ru_maxrss * 1024
+        }
+        if os.WIFSIGNALED(status):
+            return False, None, -os.WTERMSIG(status), usage
+        exit_code = os.WEXITSTATUS(status)
+        return exit_code == 0, "oom" if exit_code == OOM_EXIT else None, None, usage
+
+    def collect_fd_output(self):
+        """Forward output written straight to fd 1 during the last run"""
+        self.fd_stdout.flush()
+        self.fd_stdout.seek(0)
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        # In chunks: a snippet can write far more than fits in memory
+        while True:
+            data = self.fd_stdout.read(CHUNK_SIZE)
+            text = decoder.decode(data, final=not data)
+            if text:
+                self.stdout._send(text)
+            if not data:
+                break
+        self.fd_stdout.seek(0)
+        self.fd_stdout.truncate()
+
+    def serve(self):
+        self.emit({"event": "ready", "pid": os.getpid(),
+                   "preloaded": self.preloaded, "failed": self.failed})
+        for line in self.control_in:
+            request = json.loads(line)
+            limits = request.get("limits")
+            if limits and any(limits.values()) and hasattr(os, "fork"):
+                ok, hit, returncode, usage = self.run_limited(request["code"], limits, request.get("env"))
+            else:
+                before = run_usage(None)
+                ok, hit = self.run(request["code"], request.get("env"))
+                returncode, usage = None, run_usage(before)
+            self.emit({"event": "done", "ok": ok, "limit": hit, "returncode": returncode, "usage": usage})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--preload", default="")
+    args = parser.parse_args()
+    preload = [name.strip() for name in args.preload.split(",") if name.strip()]
+    Worker(preload).serve()
+
+
+if __name__ == "__main__":
+    main()
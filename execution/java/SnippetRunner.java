@@ -0,0 +1,409 @@
+import java.io.BufferedReader;
+import java.io.ByteArrayOutputStream;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.InputStream;
+import java.io.InputStreamReader;
+import java.io.OutputStream;
+import java.io.PrintStream;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.lang.reflect.Modifier;
+import java.net.URI;
+import java.nio.charset.StandardCharsets;
+import java.util.ArrayList;
+import java.util.HashMap;
+import java.util.List;
+import java.util.Locale;
+import java.util.Map;
+import java.util.regex.Matcher;
+import java.util.regex.Pattern;
+import javax.tools.Diagnostic;
+import javax.tools.DiagnosticCollector;
+import javax.tools.FileObject;
+import javax.tools.ForwardingJavaFileManager;
+import javax.tools.JavaCompiler;
+import javax.tools.JavaFileObject;
+import javax.tools.SimpleJavaFileObject;
+import javax.tools.StandardJavaFileManager;
+import javax.tools.ToolProvider;
+
+/**
+ * Long-lived JVM driven by JavaSnippetPool.
+ *
+ * Speaks the same protocol as interpreter_worker.py: one JSON request per
+ * line on stdin ({"code": ...}), JSON events per line on stdout (ready,
+ * stdout, stderr, done). Each snippet is compiled in memory with the
+ * already-warm system compiler and loaded by its own class loader, so runs
+ * don't see each other's classes or static state.
+ *
+ * A snippet is either a compilation unit with a main method, or plain
+ * statements (optionally preceded by imports), which are wrapped in one.
+ */
+public final class SnippetRunner {
+    private static final int CHUNK_SIZE = 16384;
+    // Top-level declarations start at the beginning of a line; indented
+    // ones are local classes inside statements
+    private static final Pattern TYPE_DECLARATION = Pattern.compile(
+        "^(?:public\\s+)?(?:(?:final|abstract|sealed|strictfp)\\s+)*(?:class|interface|enum|record)\\s+\\w+",
+        Pattern.MULTILINE);
+    private static final Pattern PUBLIC_TYPE = Pattern.compile(
+        "^\\s*public\\s+(?:(?:final|abstract|sealed|strictfp)\\s+)*(?:class|interface|enum|record)\\s+(\\w+)",
+        Pattern.MULTILINE);
+    private static final Pattern IMPORT = Pattern.compile("^\\s*import\\s+[\\w.*\\s]+;\\s*$");
+
+    private static PrintStream protocol;
+    // Set when the last snippet ran out of heap (-Xmx)
+    private static boolean outOfMemory;
+
+    public static void main(String[] args) throws Exception {
+        // Keep the real stdout for events, and give snippets streams that
+        // turn their output into events instead
+        protocol = new PrintStream(new FileOutputStream(FileDescriptor.out), false, "UTF-8");
+        BufferedReader requests = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        EventStream out = new EventStream("stdout");
+        EventStream err = new EventStream("stderr");
+        System.setOut(new PrintStream(out, true, "UTF-8"));
+        System.setErr(new PrintStream(err, true, "UTF-8"));
+        System.setIn(InputStream.nullInputStream());
+
+        JavaCompiler compiler = ToolProvider.getSystemJavaCompiler();
+        StandardJavaFileManager files = compiler == null
+            ? null : compiler.getStandardFileManager(null, Locale.ROOT, StandardCharsets.UTF_8);
+        if (compiler != null) {
+            // Load and JIT the compiler now rather than on the first request
+            run(compiler, files, "int warmup = 1;");
+        }
+        emit("{\"event\":\"ready\",\"preloaded\":[],\"failed\":[]}");
+
+        String line;
+        while ((line = requests.readLine()) != null) {
+            if (line.isBlank()) {
+                continue;
+            }
+            boolean ok;
+            outOfMemory = false;
+            if (compiler == null) {
+                System.err.println("No Java compiler available; the worker needs a JDK, not a JRE");
+                ok = false;
+            } else {
+                ok = run(compiler, files, codeField(line));
+            }
+            System.out.flush();
+            System.err.flush();
+            out.drain();
+            err.drain();
+            emit("{\"event\":\"done\",\"ok\":" + ok + (outOfMemory ? ",\"limit\":\"oom\"" : "") + "}");
+        }
+    }
+
+    private static boolean run(JavaCompiler compiler, StandardJavaFileManager files, String code) {
+        String source = code;
+        String className;
+        if (TYPE_DECLARATION.matcher(code).find()) {
+            Matcher publicType = PUBLIC_TYPE.matcher(code);
+            className = publicType.find() ? publicType.group(1) : "Main";
+        } else {
+            className = "Snippet";
+            source = wrap(code, className);
+        }
+
+        DiagnosticCollector<JavaFileObject> diagnostics = new DiagnosticCollector<>();
+        MemoryFileManager memory = new MemoryFileManager(files);
+        List<String> options = new ArrayList<>();
+        String classPath = System.getProperty("java.class.path");
+        if (classPath != null && !classPath.isEmpty()) {
+            options.add("-classpath");
+            options.add(classPath);
+        }
+        List<JavaFileObject> units = List.of(new Source(className, source));
+        boolean compiled = compiler.getTask(null, memory, diagnostics, options, null, units).call();
+        if (!compiled) {
+            for (Diagnostic<? extends JavaFileObject> diagnostic : diagnostics.getDiagnostics()) {
+                if (diagnostic.getKind() == Diagnostic.Kind.ERROR) {
+                    System.err.println("line " + diagnostic.getLineNumber() + ": " + diagnostic.getMessage(Locale.ROOT));
+                }
+            }
+            return false;
+        }
+
+        MemoryClassLoader loader = new MemoryClassLoader(memory.classes, SnippetRunner.class.getClassLoader());
+        Method main;
+        try {
+            main = findMain(loader, className, memory.classes.keySet());
+        } catch (ReflectiveOperationException | LinkageError e) {
+            e.printStackTrace();
+            return false;
+        }
+        if (main == null) {
+            System.err.println("No public static void main(String[]) found");
+            return false;
+        }
+
+        Thread thread = Thread.currentThread();
+        ClassLoader previous = thread.getContextClassLoader();
+        thread.setContextClassLoader(loader);
+        try {
+            main.invoke(null, (Object) new String[0]);
+            return true;
+        } catch (InvocationTargetException e) {
+            outOfMemory = e.getCause() instanceof OutOfMemoryError;
+            printTrace(e.getCause());
+            return false;
+        } catch (ReflectiveOperationException e) {
+            e.printStackTrace();
+            return false;
+        } finally {
+            thread.setContextClassLoader(previous);
+        }
+    }
+
+    /** Keep leading imports at the top and put the statements inside main */
+    private static String wrap(String code, String className) {
+        String opening = "public class " + className + " { public static void main(String[] args) throws Throwable { ";
+        StringBuilder source = new StringBuilder();
+        boolean opened = false;
+        for (String line : code.split("\n", -1)) {
+            if (!opened && !line.isBlank() && !IMPORT.matcher(line).matches()) {
+                // Open the class on the first statement's own line so
+                // diagnostics keep the snippet's line numbers
+                source.append(opening);
+                opened = true;
+            }
+            source.append(line).append('\n');
+        }
+        if (!opened) {
+            source.append(opening);
+        }
+        return source.append("}}\n").toString();
+    }
+
+    private static Method findMain(ClassLoader loader, String preferred, Iterable<String> names)
+            throws ReflectiveOperationException {
+        List<String> order = new ArrayList<>();
+        order.add(preferred);
+        for (String name : names) {
+            order.add(name);
+        }
+        for (String name : order) {
+            Class<?> type;
+            try {
+                type = loader.loadClass(name);
+            } catch (ClassNotFoundException e) {
+                continue;
+            }
+            try {
+                Method main = type.getMethod("main", String[].class);
+                if (Modifier.isStatic(main.getModifiers())) {
+                    main.setAccessible(true);
+                    return main;
+                }
+            } catch (NoSuchMethodException e) {
+                // keep looking
+            }
+        }
+        return null;
+    }
+
+    /** Stack trace without the runner's own reflective frames */
+    private static void printTrace(Throwable error) {
+        StackTraceElement[] frames = error.getStackTrace();
+        int keep = frames.length;
+        for (int i = 0; i < frames.length; i++) {
+            if (frames[i].getClassName().startsWith("jdk.internal.reflect")
+                    || frames[i].getClassName().startsWith("java.lang.reflect")) {
+                keep = i;
+                break;
+            }
+        }
+        error.setStackTrace(java.util.Arrays.copyOf(frames, keep));
+        error.printStackTrace();
+    }
+
+    /** Value of the "code" field of a request produced by json.dumps */
+    static String codeField(String json) {
+        int key = json.indexOf("\"code\"");
+        int start = json.indexOf('"', json.indexOf(':', key + 6)) + 1;
+        StringBuilder value = new StringBuilder();
+        for (int i = start; i < json.length(); i++) {
+            char c = json.charAt(i);
+            if (c == '"') {
+                break;
+            }
+            if (c != '\\') {
+                value.append(c);
+                continue;
+            }
+            char escape = json.charAt(++i);
+            switch (escape) {
+                case 'n': value.append('\n'); break;
+                case 't': value.append('\t'); break;
+                case 'r': value.append('\r'); break;
+                case 'b': value.append('\b'); break;
+                case 'f': value.append('\f'); break;
+                case 'u':
+                    value.append((char) Integer.parseInt(json.substring(i + 1, i + 5), 16));
+                    i += 4;
+                    break;
+                default: value.append(escape);
+            }
+        }
+        return value.toString();
+    }
+
+    static String quote(String text) {
+        StringBuilder quoted = new StringBuilder(text.length() + 16).append('"');
+        for (int i = 0; i < text.length(); i++) {
+            char c = text.charAt(i);
+            switch (c) {
+                case '"': quoted.append("\\\""); break;
+                case '\\': quoted.append("\\\\"); break;
+                case '\n': quoted.append("\\n"); break;
+                case '\r': quoted.append("\\r"); break;
+                case '\t': quoted.append("\\t"); break;
+                default:
+                    if (c < 0x20 || Character.isSurrogate(c)) {
+                        quoted.append(String.format("\\u%04x", (int) c));
+                    } else {
+                        quoted.append(c);
+                    }
+            }
+        }
+        return quoted.append('"').toString();
+    }
+
+    private static void emit(String event) {
+        synchronized (SnippetRunner.class) {
+            protocol.print(event);
+            protocol.print('\n');
+            protocol.flush();
+        }
+    }
+
+    /** Line-buffered stream that forwards whole UTF-8 characters as events */
+    private static final class EventStream extends OutputStream {
+        private final String name;
+        private final ByteArrayOutputStream buffer = new ByteArrayOutputStream();
+
+        EventStream(String name) {
+            this.name = name;
+        }
+
+        @Override
+        public synchronized void write(int b) {
+            buffer.write(b);
+            if (b == '\n' || buffer.size() >= CHUNK_SIZE) {
+                send(false);
+            }
+        }
+
+        @Override
+        public synchronized void write(byte[] b, int off, int len) {
+            buffer.write(b, off, len);
+            if (buffer.size() >= CHUNK_SIZE) {
+                send(false);
+                return;
+            }
+            for (int i = off; i < off + len; i++) {
+                if (b[i] == '\n') {
+                    send(false);
+                    return;
+                }
+            }
+        }
+
+        /** Send everything, including a trailing partial character */
+        synchronized void drain() {
+            send(true);
+        }
+
+        private void send(boolean everything) {
+            byte[] bytes = buffer.toByteArray();
+            int end = bytes.length;
+            if (!everything) {
+                // Hold back a multi-byte character split across writes
+                int i = end - 1;
+                while (i >= 0 && (bytes[i] & 0xC0) == 0x80) {
+                    i--;
+                }
+                if (i >= 0 && (bytes[i] & 0x80) != 0) {
+                    int width = (bytes[i] & 0xE0) == 0xC0 ? 2 : (bytes[i] & 0xF0) == 0xE0 ? 3 : 4;
+                    if (end - i < width) {
+                        end = i;
+                    }
+                }
+            }
+            if (end == 0) {
+                return;
+            }
+            String text = new String(bytes, 0, end, StandardCharsets.UTF_8);
+            buffer.reset();
+            buffer.write(bytes, end, bytes.length - end);
+            for (int i = 0; i < text.length(); i += CHUNK_SIZE) {
+                emit("{\"event\":\"" + name + "\",\"data\":" + quote(text.substring(i, Math.min(text.length(), i + CHUNK_SIZE))) + "}");
+            }
+        }
+    }
+
+    private static final class Source extends SimpleJavaFileObject {
+        private final String code;
+
+        Source(String className, String code) {
+            super(URI.create("string:///" + className + Kind.SOURCE.extension), Kind.SOURCE);
+            this.code = code;
+        }
+
+        @Override
+        public CharSequence getCharContent(boolean ignoreEncodingErrors) {
+            return code;
+        }
+    }
+
+    private static final class ClassBytes extends SimpleJavaFileObject {
+        private final ByteArrayOutputStream bytes = new ByteArrayOutputStream();
+
+        ClassBytes(String className) {
+            super(URI.create("bytes:///" + className.replace('.', '/') + Kind.CLASS.extension), Kind.CLASS);
+        }
+
+        @Override
+        public OutputStream openOutputStream() {
+            return bytes;
+        }
+    }
+
+    private static final class MemoryFileManager extends ForwardingJavaFileManager<StandardJavaFileManager> {
+        final Map<String, ClassBytes> classes = new HashMap<>();
+
+        MemoryFileManager(StandardJavaFileManager files) {
+            super(files);
+        }
+
+        @Override
+        public JavaFileObject getJavaFileForOutput(Location location, String className,
+                                                   JavaFileObject.Kind kind, FileObject sibling) {
+            ClassBytes output = new ClassBytes(className);
+            classes.put(className, output);
+            return output;
+        }
+    }
+
+    private static final class MemoryClassLoader extends ClassLoader {
+        private final Map<String, ClassBytes> classes;
+
+        MemoryClassLoader(Map<String, ClassBytes> classes, ClassLoader parent) {
+            super(parent);
+            this.classes = classes;
+        }
+
+        @Override
+        protected Class<?> findClass(String name) throws ClassNotFoundException {
+            ClassBytes output = classes.get(name);
+            if (output == null) {
+                throw new ClassNotFoundException(name);
+            }
+            byte[] bytes = output.bytes.toByteArray();
+            return defineClass(name, bytes, 0, bytes.length);
+        }
+    }
+}
@@ -0,0 +1,157 @@
+from typing import Dict, List, Optional, Any, Tuple
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+PUBLIC_TYPE = re.compile(r"^\s*public\s+(?:(?:final|abstract|sealed|strictfp)\s+)*(?:class|interface|enum|record)\s+(\w+)", re.M)
+
+
+def source_filename(source: str, default: str) -> str:
+    """File name javac requires for the source's public type"""
+    match = PUBLIC_TYPE.search(source)
+    return f"{match.group(1) if match else default}.java"
+
+
+async def run_process(args: List[str], cwd: Path, timeout: float) -> Tuple[Optional[int], str]:
+    """Run a command without blocking the loop; returncode is None on timeout"""
+    process = await asyncio.create_subprocess_exec(
+        *args, cwd=str(cwd),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT
+    )
+    try:
+        output, _ = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return None, f"Timed out after {timeout} seconds"
+    except BaseException:
+        process.kill()
+        raise
+    return process.returncode, output.decode("utf-8", errors="replace")
+
+
+class JavaBuilder:
+    """Compiles and tests generated Java code in isolation.
+
+    Every build gets its own temporary directory, so concurrent requests
+    never see each other's files, and javac/JUnit run as asyncio
+    subprocesses with at most max_concurrency at once. Compiler output and
+    classes are cached by a hash of the sources; identical code and tests
+    run straight from the cached classes.
+    """
+
+    def __init__(self, junit_jar: Path, cache_dir: Path, max_concurrency: int = 2, timeout: float = 120,
+                 max_entries: int = 200, javac: Optional[List[str]] = None, java: Optional[List[str]] = None):
+        self.junit_jar = Path(junit_jar).resolve()
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self.javac = javac or ["javac"]
+        self.java = java or ["java"]
+        self._limit = asyncio.Semaphore(max_concurrency)
+        self.counters = {"builds": 0, "cache_hits": 0, "compile_failures": 0, "test_runs": 0}
+
+    def _key(self, code: str, test_code: Optional[str]) -> str:
+        digest = hashlib.sha256()
+        for part in (code, test_code or "", str(self.junit_jar)):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _cached(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.cache_dir / key
+        try:
+            with open(entry / "result.json") as f:
+                result = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        os.utime(entry)
+        return result
+
+    def _store(self, key: str, build_dir: Path, result: Dict[str, Any]):
+        with open(build_dir / "result.json", "w") as f:
+            json.dump(result, f)
+        try:
+            os.rename(build_dir, self.cache_dir / key)
+        except OSError:
+            # An identical build finished first; its entry is just as good
+            shutil.rmtree(build_dir, ignore_errors=True)
+        self._prune()
+
+    def _prune(self):
+        entries = [entry for entry in self.cache_dir.iterdir() if entry.is_dir() and not entry.name.startswith(".")]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_entries]:
+            shutil.rmtree(entry, ignore_errors=True)
+
+    async def compile(self, code: str, test_code: Optional[str] = None) -> Dict[str, Any]:
+        """Compile code (and tests) once per distinct source, returning the class directory"""
+        key = self._key(code, test_code)
+        result = await asyncio.to_thread(self._cached, key)
+        if result is not None:
+            self.counters["cache_hits"] += 1
+            return {**result, "cached": True, "classes": str(self.cache_dir / key / "classes")}
+
+        async with self._limit:
+            self.counters["builds"] += 1
+            build_dir = Path(tempfile.mkdtemp(prefix=".build-", dir=self.cache_dir))
+            try:
+                sources = build_dir / "src"
+                classes = build_dir / "classes"
+                sources.mkdir()
+                classes.mkdir()
+                files = [sources / source_filename(code, "Main")]
+                files[0].write_text(code)
+                if test_code:
+                    files.append(sources / source_filename(test_code, "MainTest"))
+                    files[1].write_text(test_code)
+
+                started = time.monotonic()
+                returncode, output = await run_process(
+                    self.javac + ["-d", str(classes), "-cp", str(self.junit_jar)] + [str(f) for f in files],
+                    build_dir, self.timeout
+                )
+                result = {
+                    "compiled": returncode == 0,
+                    "output": output,
+                    "compile_time": time.monotonic() - started
+                }
+                if returncode is None:
+                    # Timeouts say nothing about the source; don't cache them
+                    shutil.rmtree(build_dir, ignore_errors=True)
+                else:
+                    await asyncio.to_thread(self._store, key, build_dir, result)
+            except BaseException:
+                shutil.rmtree(build_dir, ignore_errors=True)
+                raise
+
+        if not result["compiled"]:
+            self.counters["compile_failures"] += 1
+        return {**result, "cached": False, "classes": str(self.cache_dir / key / "classes")}
+
+    async def build_and_test(self, code: str, test_code: str) -> Dict[str, Any]:
+        """Compile code and tests, then run the tests with the JUnit console launcher"""
+        build = await self.compile(code, test_code)
+        if not build["compiled"]:
+            return {**build, "test_output": None}
+        async with self._limit:
+            self.counters["test_runs"] += 1
+            with tempfile.TemporaryDirectory(prefix="java-run-") as work_dir:
+                returncode, output = await run_process(
+                    self.java + ["-jar", str(self.junit_jar), "--class-path", build["classes"], "--scan-class-path"],
+                    Path(work_dir), self.timeout
+                )
+        return {**build, "test_output": output, "test_returncode": returncode}
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.counters)
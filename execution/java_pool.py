@@ -0,0 +1,54 @@
+from typing import Dict, List, Optional, Any, Callable
+from pathlib import Path
+from .interpreter_pool import InterpreterPool, InterpreterWorker
+from .limits import ResourceLimits, MB
+
+RUNNER_SOURCE = Path(__file__).parent / "java" / "SnippetRunner.java"
+
+
+class JavaWorker(InterpreterWorker):
+    """A resident JVM running SnippetRunner, which speaks the interpreter worker protocol"""
+
+    @classmethod
+    async def spawn(cls, java: str, jvm_options: List[str], cwd: Optional[str] = None,
+                    limits: Optional[ResourceLimits] = None) -> "JavaWorker":
+        # Single-file source launch compiles the runner in memory; it is
+        # paid once per worker, not per snippet
+        options, preexec_fn = list(jvm_options), None
+        if limits is not None:
+            if limits.memory_bytes is not None:
+                # The heap, not the address space: a JVM reserves far more
+                # of that than it uses. An -Xmx in jvm_options still wins.
+                options.insert(0, f"-Xmx{max(limits.memory_bytes // MB, 16)}m")
+            # CPU time would add up over every snippet the JVM runs
+            preexec_fn = ResourceLimits(open_files=limits.open_files, processes=limits.processes).apply
+        return await cls.start([java, *options, str(RUNNER_SOURCE)], cwd, preexec_fn)
+
+
+class JavaSnippetPool(InterpreterPool):
+    """Pool of warm JVMs for Java snippets.
+
+    Snippets are compiled in memory by the worker's already-loaded compiler
+    and run in their own class loader, so neither JVM startup nor javac
+    startup is paid per execution. Workers are recycled after ``max_runs``
+    snippets, since class loaders and threads a snippet leaves behind can
+    accumulate.
+
+    A JVM is shared by every snippet it runs, so ``limits`` hold for the
+    worker as a whole: its heap is capped at the memory limit and its open
+    files and processes as hard rlimits. CPU time is bounded only by the
+    run's timeout, and per-run limits don't apply.
+    """
+
+    def __init__(self, size: int = 2, max_runs: int = 100, java: str = "java",
+                 jvm_options: Optional[List[str]] = None, cwd: Optional[str] = None,
+                 on_spawn: Optional[Callable[[float], None]] = None,
+                 limits: Optional[ResourceLimits] = None):
+        super().__init__(size=size, max_runs=max_runs, cwd=cwd, on_spawn=on_spawn)
+        self.java = java
+        self.jvm_options = list(jvm_options or [])
+        # Set on each JVM at spawn, not sent with runs
+        self.jvm_limits = limits
+
+    async def _spawn_worker(self) -> JavaWorker:
+        return await JavaWorker.spawn(self.java, self.jvm_options, self.cwd, self.jvm_limits)
@@ -0,0 +1,150 @@
+from typing import Dict, List, Optional, Any, Awaitable, Callable, ContextManager
+import asyncio
+import contextvars
+import logging
+import time
+import uuid
+from datetime import datetime
+from .scheduler import ExecutionScheduler
+from .store import ExecutionStore
+
+FINISHED = ("completed", "error", "cancelled")
+
+ProgressScope = Callable[[Callable[[str, Optional[Dict[str, Any]]], None]], ContextManager]
+
+
+class JobManager:
+    """Runs long operations as jobs instead of inside the request.
+
+    A job is admitted through an ExecutionScheduler, so at most its
+    ``max_concurrency`` jobs run at once however many are submitted; the
+    rest wait by priority and submissions beyond the queue limit raise
+    QueueFull. Records live in an ExecutionStore like executions do: status,
+    the current phase and the phases so far, partial results, and the
+    result or error once finished. ``progress_scope(reporter)`` is entered
+    around each job so the code it runs can report phases and partial
+    results.
+    """
+
+    def __init__(self, store: ExecutionStore, scheduler: ExecutionScheduler,
+                 progress_scope: Optional[ProgressScope] = None):
+        self.store = store
+        self.scheduler = scheduler
+        self.progress_scope = progress_scope
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._partial: Dict[str, Dict[str, Any]] = {}
+        self._phases: Dict[str, List[Dict[str, Any]]] = {}
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "cancelled": 0}
+
+    def submit(self, kind: str, params: Dict[str, Any], factory: Callable[[], Awaitable[Any]],
+               priority: int = 0) -> Dict[str, Any]:
+        """Queue factory() as a job; raises QueueFull when the queue is at its limit"""
+        job_id = str(uuid.uuid4())
+        ticket = self.scheduler.admit(job_id, priority)
+        self.counters["submitted"] += 1
+        self.store[job_id] = {
+            "kind": kind,
+            "params": params,
+            "status": "queued" if self.scheduler.queue_info(job_id) else "running",
+            "phase": None,
+            "phases": [],
+            "partial": {},
+            "result": None,
+            "error": None,
+            "created_at": datetime.utcnow().isoformat()
+        }
+        self._partial[job_id] = {}
+        self._phases[job_id] = []
+        # A fresh context: the job outlives the request, and its spans
+        # don't belong in the request's trace
+        task = self._tasks[job_id] = asyncio.create_task(self._run(job_id, ticket, factory),
+                                                         context=contextvars.Context())
+        task.add_done_callback(lambda task: self._done(job_id, ticket, task))
+        return self.status(job_id)
+
+    def _done(self, job_id: str, ticket, task: asyncio.Task):
+        ticket.cancel()
+        # A task cancelled before it starts never reaches _run's finally block
+        if not task.cancelled() or job_id not in self._tasks:
+            return
+        record = self.store.get(job_id)
+        if record is not None and record["status"] == "queued":
+            self.store.patch(job_id, {"status": "cancelled", "finished_at": datetime.utcnow().isoformat()})
+            self.counters["cancelled"] += 1
+        self._tasks.pop(job_id, None)
+        self._partial.pop(job_id, None)
+        self._phases.pop(job_id, None)
+
+    def _progress(self, job_id: str, phase: str, partial: Optional[Dict[str, Any]]):
+        fields: Dict[str, Any] = {"phase": phase}
+        phases = self._phases.get(job_id)
+        if phases is None:
+            return
+        if not phases or phases[-1]["phase"] != phase:
+            phases.append({"phase": phase, "at": time.time()})
+            fields["phases"] = list(phases)
+        if partial:
+            self._partial[job_id].update(partial)
+            fields["partial"] = dict(self._partial[job_id])
+        self.store.patch(job_id, fields)
+
+    async def _run(self, job_id: str, ticket, factory: Callable[[], Awaitable[Any]]):
+        outcome: Dict[str, Any] = {}
+        started = None
+        try:
+            async with ticket:
+                started = time.monotonic()
+                self.store.patch(job_id, {"status": "running", "wait_time": ticket.wait_time})
+                if self.progress_scope is not None:
+                    with self.progress_scope(lambda phase, partial=None: self._progress(job_id, phase, partial)):
+                        result = await factory()
+                else:
+                    result = await factory()
+            outcome = {"status": "completed", "result": result}
+            self.counters["completed"] += 1
+        except asyncio.CancelledError:
+            outcome = {"status": "cancelled"}
+            self.counters["cancelled"] += 1
+        except Exception as e:
+            logging.error(f"Error in job {job_id}: {str(e)}")
+            outcome = {"status": "error", "error": str(e)}
+            self.counters["failed"] += 1
+        finally:
+            if started is not None:
+                outcome["duration"] = time.monotonic() - started
+            outcome["finished_at"] = datetime.utcnow().isoformat()
+            self.store.patch(job_id, outcome)
+            self._tasks.pop(job_id, None)
+            self._partial.pop(job_id, None)
+            self._phases.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """The full job record, result included"""
+        return self.store.get(job_id)
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """The job record without its result, with the queue position while queued"""
+        record = self.store.get(job_id)
+        if record is None:
+            return None
+        record.pop("result", None)
+        record["job_id"] = job_id
+        record.update(self.scheduler.queue_info(job_id) or {})
+        return record
+
+    async def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; False if it has already finished"""
+        task = self._tasks.get(job_id)
+        if task is None:
+            return False
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "active": len(self._tasks), **{
+            key: value for key, value in self.scheduler.stats().items() if key in ("running", "queued", "max_concurrency")
+        }}
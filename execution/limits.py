@@ -0,0 +1,122 @@
+from typing import Dict, Optional, Any, Callable
+import math
+import os
+import signal
+
+try:
+    import resource
+except ImportError:  # Windows: limits are not enforced
+    resource = None
+
+MB = 1024 * 1024
+
+# Request option -> attribute, with the factor that converts it
+LIMIT_OPTIONS = {
+    "cpu_seconds": ("cpu_seconds", 1),
+    "memory_mb": ("memory_bytes", MB),
+    "open_files": ("open_files", 1),
+    "processes": ("processes", 1),
+}
+
+
+class ResourceLimits:
+    """Per-execution caps on CPU time, address space, open files and processes.
+
+    Warm interpreter workers fork a child per limited run and set them
+    there; a fresh ``python -c`` process gets them through ``apply()``.
+    Either way the hard limit is lowered too, so the snippet can't raise
+    them back. A None (or 0) field leaves that resource alone. Executions
+    can tighten the server's limits through their options but never raise
+    them.
+    """
+
+    def __init__(self, cpu_seconds: Optional[float] = None, memory_bytes: Optional[int] = None,
+                 open_files: Optional[int] = None, processes: Optional[int] = None):
+        self.cpu_seconds = cpu_seconds or None
+        self.memory_bytes = memory_bytes or None
+        self.open_files = open_files or None
+        self.processes = processes or None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "cpu_seconds": self.cpu_seconds,
+            "memory_bytes": self.memory_bytes,
+            "open_files": self.open_files,
+            "processes": self.processes
+        }
+
+    def tightened(self, options: Optional[Dict[str, Any]]) -> "ResourceLimits":
+        """These limits lowered by any of cpu_seconds, memory_mb, open_files, processes in options"""
+        limits = self.to_dict()
+        for option, (field, factor) in LIMIT_OPTIONS.items():
+            value = (options or {}).get(option)
+            if value is None:
+                continue
+            value = float(value) * factor
+            if value <= 0:
+                raise ValueError(f"{option} must be positive")
+            if field != "cpu_seconds":
+                value = int(value)
+            if limits[field] is None or value < limits[field]:
+                limits[field] = value
+        return ResourceLimits(**limits)
+
+    def apply(self):
+        """Lower this process's rlimits for good; used as preexec_fn of a fresh snippet process"""
+        if resource is None:
+            return
+        for kind, value in self._rlimits().items():
+            soft, hard = resource.getrlimit(kind)
+            # The kernel sends SIGKILL at the hard CPU limit and SIGXCPU at
+            # the soft one; a second apart, the snippet gets the SIGXCPU
+            ceiling = value + 1 if kind == resource.RLIMIT_CPU else value
+            if hard != resource.RLIM_INFINITY:
+                value, ceiling = min(value, hard), min(ceiling, hard)
+            resource.setrlimit(kind, (value, ceiling))
+
+    def _rlimits(self) -> Dict[int, int]:
+        limits = {}
+        if self.cpu_seconds is not None:
+            limits[resource.RLIMIT_CPU] = math.ceil(self.cpu_seconds)
+        if self.memory_bytes is not None:
+            limits[resource.RLIMIT_AS] = int(self.memory_bytes)
+        if self.open_files is not None:
+            limits[resource.RLIMIT_NOFILE] = int(self.open_files)
+        if self.processes is not None and hasattr(resource, "RLIMIT_NPROC"):
+            limits[resource.RLIMIT_NPROC] = int(self.processes)
+        return limits
+
+
+def classify_exit(returncode: Optional[int], limits: Optional[ResourceLimits] = None) -> Optional[Dict[str, str]]:
+    """Status and message for a snippet process that a limit killed, if one did"""
+    # Neither signal exists on Windows, where limits aren't enforced
+    if hasattr(signal, "SIGXCPU") and returncode == -signal.SIGXCPU:
+        seconds = f" of {limits.cpu_seconds:g} seconds" if limits is not None and limits.cpu_seconds else ""
+        return {"status": "timeout", "error": f"CPU time limit{seconds} exceeded"}
+    if hasattr(signal, "SIGKILL") and returncode == -signal.SIGKILL:
+        # Nothing here sends SIGKILL except on timeout, which is reported
+        # separately; the kernel's OOM killer does
+        return {"status": "oom", "error": "Killed, most likely out of memory"}
+    return None
+
+def spawn_options(preexec_fn: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+    """Subprocess arguments that start a snippet process in its own process group.
+
+    Windows has neither preexec_fn nor sessions, so there the process
+    starts as is.
+    """
+    if os.name != "posix":
+        return {}
+    return {"preexec_fn": preexec_fn, "start_new_session": True}
+
+
+def kill_process_group(process):
+    """SIGKILL a snippet process started with spawn_options() and everything it spawned"""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            # No process groups: its children are out of reach
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
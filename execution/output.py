@@ -0,0 +1,283 @@
+from typing import Dict, List, Optional, Any
+import asyncio
+import codecs
+import gzip
+import os
+import threading
+import zlib
+from pathlib import Path
+
+STREAMS = ("stdout", "stderr")
+READ_CHUNK = 64 * 1024
+
+
+class OutputRangeUnavailable(Exception):
+    pass
+
+
+class _StreamCapture:
+    """Head, tail and size of one stream, plus its spill file once it overflows"""
+
+    def __init__(self):
+        self.buffer: List[str] = []
+        self.buffered = 0
+        self.head = ""
+        self.tail = ""
+        self.chars = 0
+        self.truncated = False
+        self.spill: Optional[gzip.GzipFile] = None
+        self.spilled_chars = 0
+
+
+class OutputCapture:
+    """Bounded capture of one execution's stdout and stderr.
+
+    Output is held in memory until a stream passes ``head_chars + tail_chars``;
+    from then on only its first ``head_chars`` and last ``tail_chars`` stay in
+    memory, and with a ``spill_prefix`` the whole stream goes to a gzip file
+    next to it (up to ``max_spill_chars``), from which ``read()`` serves any
+    range. Memory per execution stays under twice the head and tail sizes
+    whatever the snippet prints.
+    """
+
+    def __init__(self, head_chars: int = 64 * 1024, tail_chars: int = 64 * 1024,
+                 spill_prefix: Optional[Path] = None, max_spill_chars: Optional[int] = None):
+        self.head_chars = head_chars
+        self.tail_chars = tail_chars
+        self.spill_prefix = Path(spill_prefix) if spill_prefix is not None else None
+        self.max_spill_chars = max_spill_chars
+        self.closed = False
+        self._lock = threading.Lock()
+        self._streams = {name: _StreamCapture() for name in STREAMS}
+
+    def spill_path(self, stream: str) -> Optional[Path]:
+        if self.spill_prefix is None:
+            return None
+        return self.spill_prefix.with_name(f"{self.spill_prefix.name}.{stream}.gz")
+
+    def write(self, stream: str, text: str):
+        if not text or self.closed:
+            return
+        with self._lock:
+            capture = self._streams[stream]
+            capture.chars += len(text)
+            if not capture.truncated:
+                capture.buffer.append(text)
+                capture.buffered += len(text)
+                if capture.buffered <= self.head_chars + self.tail_chars:
+                    return
+                # Past the in-memory budget: keep a head and tail from here on
+                text = "".join(capture.buffer)
+                capture.buffer, capture.buffered = [], 0
+                capture.truncated = True
+                capture.head = text[:self.head_chars]
+                self._open_spill(stream, capture)
+            self._spill(capture, text)
+            capture.tail = (capture.tail + text)[-self.tail_chars:] if self.tail_chars else ""
+
+    async def awrite(self, stream: str, text: str):
+        """write() from the event loop, opening and writing the spill file in a worker thread"""
+        capture = self._streams[stream]
+        spills = capture.truncated or capture.buffered + len(text) > self.head_chars + self.tail_chars
+        if self.spill_prefix is not None and spills and not self.closed:
+            await asyncio.to_thread(self.write, stream, text)
+        else:
+            self.write(stream, text)
+
+    def _open_spill(self, stream: str, capture: _StreamCapture):
+        path = self.spill_path(stream)
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        capture.spill = gzip.open(path, "wb", compresslevel=1)
+
+    def _spill(self, capture: _StreamCapture, text: str):
+        if capture.spill is None:
+            return
+        if self.max_spill_chars is not None:
+            text = text[:max(self.max_spill_chars - capture.spilled_chars, 0)]
+            if not text:
+                return
+        capture.spill.write(text.encode("utf-8"))
+        capture.spilled_chars += len(text)
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            for capture in self._streams.values():
+                if capture.spill is not None:
+                    capture.spill.close()
+                    capture.spill = None
+
+    def text(self, stream: str) -> str:
+        """The stream's output, or its head and tail if it overflowed"""
+        with self._lock:
+            capture = self._streams[stream]
+            if not capture.truncated:
+                return "".join(capture.buffer)
+            omitted = capture.chars - len(capture.head) - len(capture.tail)
+            return f"{capture.head}\n[... {omitted} characters omitted ...]\n{capture.tail}"
+
+    def info(self) -> Dict[str, Dict[str, Any]]:
+        """Size of each stream, whether it was cut and how much of it is on disk"""
+        with self._lock:
+            return {
+                name: {
+                    "chars": capture.chars,
+                    "truncated": capture.truncated,
+                    "spilled_chars": capture.spilled_chars
+                }
+                for name, capture in self._streams.items()
+            }
+
+    def read(self, stream: str, offset: int = 0, limit: int = READ_CHUNK) -> Dict[str, Any]:
+        """Up to limit characters of the stream from offset, wherever they are kept"""
+        with self._lock:
+            capture = self._streams[stream]
+            total = capture.chars
+            tail_start = total - len(capture.tail)
+            if not capture.truncated:
+                return page(stream, offset, "".join(capture.buffer)[offset:offset + limit], total)
+            if offset + limit <= len(capture.head):
+                return page(stream, offset, capture.head[offset:offset + limit], total)
+            if offset >= tail_start:
+                return page(stream, offset, capture.tail[offset - tail_start:offset - tail_start + limit], total)
+            spilled = capture.spilled_chars
+            if offset < spilled and capture.spill is not None:
+                # Make everything written so far decompressible
+                capture.spill.flush(zlib.Z_SYNC_FLUSH)
+            head = capture.head
+        if offset < spilled:
+            # Decompress outside the lock; only what was flushed is read
+            return page(stream, offset, read_spill(self.spill_path(stream), offset, min(limit, spilled - offset)), total)
+        if offset < len(head):
+            return page(stream, offset, head[offset:offset + limit], total)
+        raise OutputRangeUnavailable(
+            f"Only the first {spilled} characters were kept" if spilled
+            else "Only the head and tail of this output were kept"
+        )
+
+
+def page(stream: str, offset: int, data: str, total: int) -> Dict[str, Any]:
+    return {
+        "stream": stream,
+        "offset": offset,
+        "data": data,
+        "next_offset": offset + len(data) if offset + len(data) < total else None,
+        "total": total
+    }
+
+
+def read_spill(path: Path, offset: int, limit: int) -> str:
+    """Characters [offset, offset + limit) of a gzip spill file, which may still be being written"""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    skipped = 0
+    parts: List[str] = []
+    wanted = limit
+    raw = b""
+    with open(path, "rb") as f:
+        while wanted > 0:
+            if not raw:
+                raw = f.read(READ_CHUNK)
+                if not raw:
+                    break
+            # Bounded steps: repetitive output can compress a thousandfold
+            text = decoder.decode(decompressor.decompress(raw, READ_CHUNK))
+            raw = decompressor.unconsumed_tail
+            if skipped < offset:
+                drop = min(offset - skipped, len(text))
+                skipped += drop
+                text = text[drop:]
+            if text:
+                parts.append(text[:wanted])
+                wanted -= len(parts[-1])
+    return "".join(parts)
+
+
+class OutputSpool:
+    """Creates execution output captures and serves their spilled output.
+
+    Captures are registered under the execution id while they run; once
+    closed their gzip files stay in ``directory`` (the ``max_files`` most
+    recent are kept) for ranged reads of finished executions.
+    """
+
+    def __init__(self, directory: Path, head_chars: int = 64 * 1024, tail_chars: int = 64 * 1024,
+                 max_spill_chars: Optional[int] = None, max_files: int = 200):
+        self.directory = Path(directory)
+        self.head_chars = head_chars
+        self.tail_chars = tail_chars
+        self.max_spill_chars = max_spill_chars
+        self.max_files = max_files
+        self._live: Dict[str, OutputCapture] = {}
+        self.counters = {"captures": 0, "truncated": 0, "spilled_chars": 0}
+
+    def capture(self, key: str) -> OutputCapture:
+        capture = OutputCapture(self.head_chars, self.tail_chars, self.directory / key, self.max_spill_chars)
+        self._live[key] = capture
+        self.counters["captures"] += 1
+        return capture
+
+    def release(self, key: str):
+        """Close a finished capture, keeping its spill files for later reads"""
+        capture = self._live.pop(key, None)
+        if capture is None:
+            return
+        capture.close()
+        if self._count(capture):
+            self._prune()
+
+    async def arelease(self, key: str):
+        """release() from the event loop, closing and pruning files in a worker thread"""
+        capture = self._live.pop(key, None)
+        if capture is None:
+            return
+        await asyncio.to_thread(capture.close)
+        if self._count(capture):
+            await asyncio.to_thread(self._prune)
+
+    def _count(self, capture: OutputCapture) -> int:
+        info = capture.info()
+        if any(stream["truncated"] for stream in info.values()):
+            self.counters["truncated"] += 1
+        spilled = sum(stream["spilled_chars"] for stream in info.values())
+        self.counters["spilled_chars"] += spilled
+        return spilled
+
+    def _prune(self):
+        try:
+            files = [entry for entry in self.directory.iterdir() if entry.name.endswith(".gz")]
+        except FileNotFoundError:
+            return
+        if len(files) <= self.max_files:
+            return
+        files.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in files[:len(files) - self.max_files]:
+            try:
+                os.remove(entry)
+            except OSError:
+                pass
+
+    def read(self, key: str, stream: str, offset: int, limit: int,
+             info: Optional[Dict[str, Any]] = None, text: str = "") -> Dict[str, Any]:
+        """A range of an execution's output.
+
+        Running executions are read from their capture. For finished ones,
+        info is the stream's entry in the capture's ``info()`` and text what
+        was stored for it: the whole output unless it was truncated, in
+        which case the range comes from the spill file.
+        """
+        capture = self._live.get(key)
+        if capture is not None:
+            return capture.read(stream, offset, limit)
+        if not info or not info["truncated"]:
+            return page(stream, offset, text[offset:offset + limit], len(text))
+        spilled = info.get("spilled_chars", 0)
+        path = self.directory / f"{key}.{stream}.gz"
+        if offset >= spilled or not path.exists():
+            raise OutputRangeUnavailable("This part of the output is no longer kept")
+        return page(stream, offset, read_spill(path, offset, min(limit, spilled - offset)), info["chars"])
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "live": len(self._live)}
@@ -0,0 +1,62 @@
+from typing import Dict, List, Optional, Any, AsyncIterator
+import asyncio
+from collections import deque
+
+
+class OutputStream:
+    """Fan-out of one execution's output chunks to any number of listeners.
+
+    Chunks are kept until the stream is closed so a listener that connects
+    late still sees everything from the beginning, up to ``max_backlog``
+    characters of output; past that the oldest chunks are dropped and a
+    listener that hadn't seen them gets a ``truncated`` event instead.
+    """
+
+    def __init__(self, max_backlog: Optional[int] = None):
+        self.events: deque = deque()
+        self.closed = False
+        self.max_backlog = max_backlog
+        self._backlog = 0
+        self._dropped = 0
+        self._changed = asyncio.Event()
+
+    def publish(self, stream: str, data: str):
+        if self.closed:
+            return
+        self.events.append({"event": stream, "data": data})
+        if isinstance(data, str):
+            self._backlog += len(data)
+        if self.max_backlog is not None:
+            while self._backlog > self.max_backlog and len(self.events) > 1:
+                dropped = self.events.popleft()
+                if isinstance(dropped["data"], str):
+                    self._backlog -= len(dropped["data"])
+                self._dropped += 1
+        self._notify()
+
+    def close(self, status: Dict[str, Any]):
+        if self.closed:
+            return
+        self.events.append({"event": "status", "data": status})
+        self.closed = True
+        self._notify()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def subscribe(self) -> AsyncIterator[Dict[str, Any]]:
+        index = 0
+        while True:
+            if index < self._dropped:
+                # Fell behind a bounded backlog; skip to what is still kept
+                yield {"event": "truncated", "data": {"dropped_chunks": self._dropped - index}}
+                index = self._dropped
+            elif index - self._dropped < len(self.events):
+                event = self.events[index - self._dropped]
+                index += 1
+                yield event
+            elif self.closed:
+                return
+            else:
+                await self._changed.wait()
@@ -0,0 +1,162 @@
+from typing import Dict, List, Optional, Any
+import asyncio
+import heapq
+import itertools
+import time
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__("Execution queue is full")
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """A place in the scheduler's queue. ``async with`` waits for a
+    concurrency slot and holds it for the duration of the block; the slot is
+    only granted once the ticket's holder is waiting there."""
+
+    def __init__(self, scheduler: "ExecutionScheduler", job_id: str, priority: int):
+        self.scheduler = scheduler
+        self.job_id = job_id
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.waiting = False
+        self.released = False
+        self._granted = asyncio.get_running_loop().create_future()
+
+    @property
+    def wait_time(self) -> float:
+        end = self.started_at if self.started_at is not None else time.monotonic()
+        return end - self.enqueued_at
+
+    def cancel(self):
+        """Give up the ticket's place, or its slot if it still holds one"""
+        self.scheduler._abandon(self)
+
+    async def __aenter__(self) -> "Ticket":
+        self.waiting = True
+        self.scheduler._dispatch()
+        try:
+            await self._granted
+        except asyncio.CancelledError:
+            self.scheduler._abandon(self)
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.scheduler._release(self)
+
+
+class ExecutionScheduler:
+    """Admission control for code executions.
+
+    At most ``max_concurrency`` tickets hold a slot at once. Others wait in a
+    queue ordered by priority (higher first, then arrival); once
+    ``max_queue`` tickets are waiting beyond the free slots, ``admit``
+    raises QueueFull with a retry hint based on recent run times. A ticket
+    is only granted a slot once its holder enters it, so one whose task
+    never starts can't keep a slot busy.
+    """
+
+    def __init__(self, max_concurrency: int = 4, max_queue: int = 100):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._running = 0
+        self._waiting: List[Any] = []
+        self._queued: Dict[str, Ticket] = {}
+        self._sequence = itertools.count()
+        self._avg_runtime = 1.0
+        self._avg_wait = 0.0
+        self.counters = {"admitted": 0, "rejected": 0, "completed": 0}
+
+    def admit(self, job_id: str, priority: int = 0) -> Ticket:
+        if self._backlog() >= self.max_queue:
+            self.counters["rejected"] += 1
+            raise QueueFull(self.retry_after())
+        ticket = Ticket(self, job_id, priority)
+        self.counters["admitted"] += 1
+        self._queued[job_id] = ticket
+        heapq.heappush(self._waiting, (-priority, next(self._sequence), ticket))
+        return ticket
+
+    def _free_slots(self) -> int:
+        return max(self.max_concurrency - self._running, 0)
+
+    def _backlog(self) -> int:
+        """Tickets that will have to wait for a slot to free up"""
+        return max(len(self._queued) - self._free_slots(), 0)
+
+    def retry_after(self) -> float:
+        """Estimated seconds until a queue slot frees up"""
+        backlog = (self._backlog() + 1) / max(self.max_concurrency, 1)
+        return max(1.0, self._avg_runtime * backlog)
+
+    def queue_info(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Position (1-based), depth and time waited for a queued job; None
+        once it runs, or when a free slot is there for it as soon as it asks"""
+        ticket = self._queued.get(job_id)
+        if ticket is None:
+            return None
+        ahead = sum(1 for other in self._queued.values()
+                    if (-other.priority, other.enqueued_at) < (-ticket.priority, ticket.enqueued_at))
+        position = ahead + 1 - self._free_slots()
+        if position < 1:
+            return None
+        return {
+            "queue_position": position,
+            "queue_depth": self._backlog(),
+            "wait_time": ticket.wait_time
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._running,
+            "queued": self._backlog(),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "avg_wait_time": self._avg_wait,
+            "avg_runtime": self._avg_runtime,
+            **self.counters
+        }
+
+    def _grant(self, ticket: Ticket):
+        self._running += 1
+        ticket.started_at = time.monotonic()
+        self._avg_wait = 0.9 * self._avg_wait + 0.1 * ticket.wait_time
+        ticket._granted.set_result(None)
+
+    def _dispatch(self):
+        # Tickets whose holder hasn't entered yet keep their place but are
+        # passed over, so they never hold a slot nobody is using
+        idle = []
+        while self._waiting and self._running < self.max_concurrency:
+            entry = heapq.heappop(self._waiting)
+            ticket = entry[2]
+            if self._queued.get(ticket.job_id) is not ticket:
+                continue  # abandoned while waiting
+            if not ticket.waiting:
+                idle.append(entry)
+                continue
+            del self._queued[ticket.job_id]
+            self._grant(ticket)
+        for entry in idle:
+            heapq.heappush(self._waiting, entry)
+
+    def _abandon(self, ticket: Ticket):
+        if self._queued.get(ticket.job_id) is ticket:
+            del self._queued[ticket.job_id]
+        elif ticket._granted.done():
+            # Granted just as the waiter was cancelled: hand the slot on
+            self._release(ticket)
+
+    def _release(self, ticket: Ticket):
+        if ticket.released:
+            return
+        ticket.released = True
+        self._running -= 1
+        self.counters["completed"] += 1
+        runtime = time.monotonic() - ticket.started_at
+        self._avg_runtime = 0.9 * self._avg_runtime + 0.1 * runtime
+        self._dispatch()
@@ -0,0 +1,262 @@
+from typing import Dict, List, Optional, Any, Iterator, Tuple
+from collections import OrderedDict
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+ACTIVE_STATUSES = ("queued", "running")
+# Records that haven't finished yet; the TTL only applies once they have
+UNFINISHED_STATUSES = ACTIVE_STATUSES + ("created",)
+
+
+def estimate_size(value: Any) -> int:
+    """Rough in-memory footprint of a record field, in bytes"""
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(str(k)) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(v) for v in value)
+    if isinstance(value, (int, float, bool)):
+        return 8
+    return len(repr(value))
+
+
+class _Entry:
+    __slots__ = ("record", "size", "updated_at", "spilled")
+
+    def __init__(self):
+        self.record: Dict[str, Any] = {}
+        self.size = 0
+        self.updated_at = 0.0
+        # Field name -> file holding its value
+        self.spilled: Dict[str, Path] = {}
+
+
+class ExecutionStore:
+    """Bounded store for execution and workflow records.
+
+    Records are plain dicts keyed by id. Finished records (any status other
+    than created/queued/running) expire ``ttl`` seconds after their last
+    update, and the least recently used records that aren't queued or running
+    are evicted once the store holds more than ``max_entries`` records or
+    ``max_bytes`` of field data. Fields larger than ``spill_bytes`` are
+    written to ``spill_dir`` and read back on access so they don't count
+    against the memory budget. On an event loop the file is written in a
+    worker thread, and the field stays in memory until it is; ``aget()``
+    reads spilled fields back in one as well.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 64 * 1024 * 1024,
+                 ttl: Optional[float] = 3600, spill_bytes: int = 256 * 1024,
+                 spill_dir: Optional[Path] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.spill_bytes = spill_bytes
+        self.spill_dir = Path(spill_dir) if spill_dir is not None else None
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._last_sweep = time.monotonic()
+        self._spill_ids = itertools.count()
+        self._spilling = set()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "spills": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and not self._expired(entry)
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        record = self.get(key)
+        if record is None:
+            raise KeyError(key)
+        return record
+
+    def __setitem__(self, key: str, record: Dict[str, Any]):
+        self._remove(key)
+        entry = _Entry()
+        self._entries[key] = entry
+        self._write(key, entry, record)
+        self._maintain()
+
+    def __delitem__(self, key: str):
+        if key not in self._entries:
+            raise KeyError(key)
+        self._remove(key)
+
+    def get(self, key: str, default: Any = None) -> Optional[Dict[str, Any]]:
+        """Return a copy of the record, counting the lookup as a hit or miss"""
+        entry = self._lookup(key)
+        if entry is None:
+            return default
+        return self._load(key, entry)
+
+    async def aget(self, key: str, default: Any = None) -> Optional[Dict[str, Any]]:
+        """get() from the event loop, reading spilled fields in a worker thread"""
+        entry = self._lookup(key)
+        if entry is None:
+            return default
+        if not entry.spilled:
+            return dict(entry.record)
+        record, spilled = dict(entry.record), dict(entry.spilled)
+        return await asyncio.to_thread(_read_spilled, key, record, spilled)
+
+    def _lookup(self, key: str) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is not None and self._expired(entry):
+            self._remove(key)
+            self.counters["expirations"] += 1
+            entry = None
+        if entry is None:
+            self.counters["misses"] += 1
+            return None
+        self.counters["hits"] += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def patch(self, key: str, fields: Dict[str, Any]) -> bool:
+        """Merge fields into an existing record; returns False if it is gone"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        self._entries.move_to_end(key)
+        self._write(key, entry, fields)
+        self._maintain()
+        return True
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for key, entry in list(self._entries.items()):
+            if not self._expired(entry):
+                yield key, self._load(key, entry)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            **self.counters
+        }
+
+    def _expired(self, entry: _Entry) -> bool:
+        if self.ttl is None or entry.record.get("status") in UNFINISHED_STATUSES:
+            return False
+        return time.monotonic() - entry.updated_at > self.ttl
+
+    def _write(self, key: str, entry: _Entry, fields: Dict[str, Any]):
+        for name, value in fields.items():
+            path = entry.spilled.pop(name, None)
+            if path is not None:
+                _drop_file(path)
+            size = estimate_size(value)
+            old_size = estimate_size(entry.record.get(name))
+            entry.record[name] = value
+            entry.size += size - old_size
+            self._bytes += size - old_size
+            if self.spill_dir is not None and size > self.spill_bytes:
+                self._start_spill(key, entry, name, value)
+        entry.updated_at = time.monotonic()
+
+    def _start_spill(self, key: str, entry: _Entry, name: str, value: Any):
+        # A fresh file per write, so a late write never lands on a newer value
+        path = self.spill_dir / f"{key}.{name}.{next(self._spill_ids)}.json"
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._finish_spill(key, entry, name, value, path, _write_spill(path, value))
+            return
+
+        async def spill():
+            written = await asyncio.to_thread(_write_spill, path, value)
+            self._finish_spill(key, entry, name, value, path, written)
+
+        task = asyncio.ensure_future(spill())
+        self._spilling.add(task)
+        task.add_done_callback(self._spilling.discard)
+
+    def _finish_spill(self, key: str, entry: _Entry, name: str, value: Any, path: Path, written: bool):
+        if not written:
+            return
+        current = entry.record.get(name) is value and name not in entry.spilled
+        if not current or self._entries.get(key) is not entry:
+            # Overwritten or removed while the file was being written
+            _drop_file(path)
+            return
+        size = estimate_size(value)
+        entry.record[name] = None
+        entry.spilled[name] = path
+        entry.size -= size
+        self._bytes -= size
+        self.counters["spills"] += 1
+
+    def _load(self, key: str, entry: _Entry) -> Dict[str, Any]:
+        return _read_spilled(key, dict(entry.record), entry.spilled)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        for path in entry.spilled.values():
+            _drop_file(path)
+        entry.spilled.clear()
+
+    def _maintain(self):
+        now = time.monotonic()
+        if self.ttl is not None and now - self._last_sweep > min(self.ttl, 60):
+            self._last_sweep = now
+            for key, entry in list(self._entries.items()):
+                if self._expired(entry):
+                    self._remove(key)
+                    self.counters["expirations"] += 1
+
+        if len(self._entries) <= self.max_entries and self._bytes <= self.max_bytes:
+            return
+        # Oldest first; records still queued or running are never evicted
+        for key, entry in list(self._entries.items()):
+            if len(self._entries) <= self.max_entries and self._bytes <= self.max_bytes:
+                break
+            if entry.record.get("status") in ACTIVE_STATUSES:
+                continue
+            self._remove(key)
+            self.counters["evictions"] += 1
+
+
+def _write_spill(path: Path, value: Any) -> bool:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(value, f)
+    except (TypeError, ValueError, OSError) as e:
+        logging.warning(f"Keeping {path.name} in memory: {str(e)}")
+        _drop_file(path)
+        return False
+    return True
+
+
+def _read_spilled(key: str, record: Dict[str, Any], spilled: Dict[str, Path]) -> Dict[str, Any]:
+    for name, path in spilled.items():
+        try:
+            with open(path) as f:
+                record[name] = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.error(f"Error reading spilled {name} of {key}: {str(e)}")
+    return record
+
+
+def _drop_file(path: Path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
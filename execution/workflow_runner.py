@@ -0,0 +1,107 @@
+from typing import Dict, List, Optional, Any, Callable, Awaitable
+import asyncio
+import time
+from datetime import datetime
+
+
+class WorkflowGraphError(ValueError):
+    pass
+
+
+def step_ids(steps: List[Any]) -> List[str]:
+    """Ids of the steps, defaulting to ``step_<index>`` for unnamed ones"""
+    return [getattr(step, "id", None) or f"step_{index}" for index, step in enumerate(steps)]
+
+
+def step_dependencies(steps: List[Any], parallel: bool = False) -> Dict[str, List[str]]:
+    """Steps each step waits for.
+
+    That is its ``depends_on``; a step that doesn't declare one waits for the
+    step before it, unless the workflow opted into running them in parallel.
+    """
+    ids = step_ids(steps)
+    waits = {}
+    for index, (step_id, step) in enumerate(zip(ids, steps)):
+        declared = getattr(step, "depends_on", None)
+        if declared is None:
+            waits[step_id] = [ids[index - 1]] if index > 0 and not parallel else []
+        else:
+            waits[step_id] = list(declared)
+    return waits
+
+
+def validate_graph(steps: List[Any], parallel: bool = False) -> List[str]:
+    """Check ids are unique, dependencies exist and there are no cycles"""
+    ids = step_ids(steps)
+    if len(set(ids)) != len(ids):
+        raise WorkflowGraphError("Workflow step ids must be unique")
+    dependencies = step_dependencies(steps, parallel)
+    for step_id, deps in dependencies.items():
+        unknown = [dep for dep in deps if dep not in dependencies]
+        if unknown:
+            raise WorkflowGraphError(f"Step {step_id} depends on unknown steps: {', '.join(unknown)}")
+
+    visiting, done = set(), set()
+
+    def visit(step_id: str, path: List[str]):
+        if step_id in done:
+            return
+        if step_id in visiting:
+            raise WorkflowGraphError(f"Workflow steps form a cycle: {' -> '.join(path + [step_id])}")
+        visiting.add(step_id)
+        for dep in dependencies[step_id]:
+            visit(dep, path + [step_id])
+        visiting.discard(step_id)
+        done.add(step_id)
+
+    for step_id in ids:
+        visit(step_id, [])
+    return ids
+
+
+async def run_workflow_graph(
+    steps: List[Any],
+    run_step: Callable[[Any, Dict[str, Any]], Awaitable[Dict[str, Any]]],
+    max_parallel: int = 4,
+    parallel: bool = False
+) -> List[Dict[str, Any]]:
+    """Run steps as soon as their dependencies finish, at most max_parallel at a time.
+
+    ``run_step(step, inputs)`` receives the results of the step's declared
+    dependencies keyed by step id. A step whose declared dependency did not
+    complete is skipped. Steps without ``depends_on`` run one after another,
+    as they always have, unless ``parallel`` is set. Results come back in
+    step order, each with its id and timings.
+    """
+    ids = validate_graph(steps, parallel)
+    waits = step_dependencies(steps, parallel)
+    semaphore = asyncio.Semaphore(max(max_parallel, 1))
+    loop = asyncio.get_running_loop()
+    finished = {step_id: loop.create_future() for step_id in ids}
+
+    async def run(step_id: str, step: Any) -> Dict[str, Any]:
+        for dep in waits[step_id]:
+            await finished[dep]
+        inputs = {dep: finished[dep].result() for dep in getattr(step, "depends_on", None) or []}
+
+        failed = [dep for dep, result in inputs.items() if result.get("status") != "completed"]
+        if failed:
+            result = {"status": "skipped", "error": f"Dependency failed: {', '.join(failed)}"}
+        else:
+            async with semaphore:
+                started = time.monotonic()
+                started_at = datetime.utcnow().isoformat()
+                try:
+                    result = dict(await run_step(step, inputs))
+                except Exception as e:
+                    result = {"status": "error", "error": str(e)}
+                result.update({
+                    "started_at": started_at,
+                    "finished_at": datetime.utcnow().isoformat(),
+                    "duration": time.monotonic() - started
+                })
+        result["step"] = step_id
+        finished[step_id].set_result(result)
+        return result
+
+    return await asyncio.gather(*(run(step_id, step) for step_id, step in zip(ids, steps)))
@@ -0,0 +1,7 @@
+from .cache import CompletionCache
+from .tokens import estimate_tokens
+from .single_flight import SingleFlight, ClientDisconnected, request_key, cancel_on_disconnect
+from .router import LLMRouter, RouterClient, Backend, RouterError, parse_backends
+
+__all__ = ['CompletionCache', 'estimate_tokens', 'SingleFlight', 'ClientDisconnected', 'request_key', 'cancel_on_disconnect',
+           'LLMRouter', 'RouterClient', 'Backend', 'RouterError', 'parse_backends']
@@ -0,0 +1,118 @@
+from typing import Dict, Optional, Any
+import logging
+import pickle
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# Attribute set on completions served from the cache
+CACHE_HIT = "cache_hit"
+
+
+class CompletionCache:
+    """Disk-backed LLM completion cache for autogen chats.
+
+    Implements autogen's cache protocol (``get``/``set``/``close`` and the
+    context manager methods), so it can be passed as ``cache=`` to
+    ``initiate_chat``; autogen derives the key from the model, messages and
+    request config. Entries are evicted least-recently-used once the stored
+    responses exceed ``max_bytes``, and are ignored after ``ttl`` seconds.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = 256 * 1024 * 1024, ttl: Optional[float] = None):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # autogen calls the cache from its executor threads
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            "key TEXT PRIMARY KEY, value BLOB, size INTEGER, created REAL, accessed REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS completions_accessed ON completions (accessed)")
+        self._db.commit()
+        self._bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+        self.counters = {"hits": 0, "misses": 0, "sets": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key: str, default: Optional[Any] = None) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, size, created FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[2] > self.ttl:
+                self._delete(key, row[1])
+                self.counters["expirations"] += 1
+                row = None
+            if row is None:
+                self.counters["misses"] += 1
+                return default
+            self._db.execute("UPDATE completions SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.counters["hits"] += 1
+        try:
+            value = pickle.loads(row[0])
+        except Exception as e:
+            logging.warning(f"Discarding unreadable cache entry: {str(e)}")
+            return default
+        # Lets wrappers of the LLM client tell a replayed completion from a
+        # fresh one; plain values that take no attributes are returned as is
+        try:
+            setattr(value, CACHE_HIT, True)
+        except (AttributeError, TypeError, ValueError):
+            pass
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        data = pickle.dumps(value)
+        now = time.time()
+        with self._lock:
+            old = self._db.execute("SELECT size FROM completions WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO completions (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now, now)
+            )
+            self._bytes += len(data) - (old[0] if old else 0)
+            self.counters["sets"] += 1
+            self._evict()
+            self._db.commit()
+
+    def _delete(self, key: str, size: int):
+        self._db.execute("DELETE FROM completions WHERE key = ?", (key,))
+        self._db.commit()
+        self._bytes -= size
+
+    def _evict(self):
+        while self._bytes > self.max_bytes:
+            rows = self._db.execute(
+                "SELECT key, size FROM completions ORDER BY accessed LIMIT 32"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self._bytes <= self.max_bytes:
+                    break
+                self._db.execute("DELETE FROM completions WHERE key = ?", (key,))
+                self._bytes -= size
+                self.counters["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hit_rate": self.counters["hits"] / lookups if lookups else 0.0,
+            **self.counters
+        }
+
+    def close(self) -> None:
+        # Shared across chats; autogen closes caches it was handed when a
+        # ``with`` block ends, so keep the connection open here.
+        pass
+
+    def __enter__(self) -> "CompletionCache":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
@@ -0,0 +1,447 @@
+from typing import Dict, List, Optional, Any, Tuple
+import json
+import logging
+import math
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from types import SimpleNamespace
+import httpx
+from .tokens import estimate_tokens
+
+STRATEGIES = ("least_outstanding", "weighted")
+
+# Request fields forwarded to the backends; autogen's own config keys are not
+FORWARDED_PARAMS = (
+    "messages", "temperature", "top_p", "max_tokens", "stop", "n", "seed", "presence_penalty",
+    "frequency_penalty", "response_format", "tools", "tool_choice", "functions", "function_call", "stream"
+)
+
+
+class RouterError(Exception):
+    pass
+
+
+class BackendFailure(RouterError):
+    """The backend is down or overloaded; the request may succeed on another one"""
+
+
+class Backend:
+    """One OpenAI-compatible model server behind the router"""
+
+    def __init__(self, base_url: str, model: Optional[str] = None, api_key: Optional[str] = None,
+                 weight: float = 1.0, max_concurrency: int = 4, name: Optional[str] = None):
+        if weight <= 0 or max_concurrency < 1:
+            raise ValueError("Backend weight must be positive and max_concurrency at least 1")
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api_key = api_key
+        self.weight = weight
+        self.max_concurrency = max_concurrency
+        self.name = name or self.base_url
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.latencies = deque(maxlen=200)
+        self.counters = {"requests": 0, "failures": 0, "ejections": 0, "hedges": 0, "hedge_wins": 0}
+
+    def available(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+
+
+def parse_backends(value: str, model: Optional[str] = None, api_key: Optional[str] = None,
+                   max_concurrency: int = 4) -> List[Backend]:
+    """Backends from a comma-separated list of base URLs, or a JSON list of
+    objects with base_url and optionally model, api_key, weight, max_concurrency and name"""
+    value = value.strip()
+    if value.startswith("["):
+        return [
+            Backend(**{"model": model, "api_key": api_key, "max_concurrency": max_concurrency, **entry})
+            for entry in json.loads(value)
+        ]
+    return [Backend(url.strip(), model, api_key, max_concurrency=max_concurrency)
+            for url in value.split(",") if url.strip()]
+
+
+def percentile(values: List[float], quantile: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(math.ceil(quantile * len(ordered)) - 1, 0)]
+
+
+def to_response(data: Dict[str, Any], backend: str) -> SimpleNamespace:
+    """An OpenAI-style completion object, which autogen and the cache can handle"""
+    choices = []
+    for index, choice in enumerate(data.get("choices") or []):
+        message = choice.get("message") or {}
+        choices.append(SimpleNamespace(
+            index=choice.get("index", index),
+            finish_reason=choice.get("finish_reason"),
+            message=SimpleNamespace(
+                role=message.get("role", "assistant"),
+                content=message.get("content"),
+                tool_calls=message.get("tool_calls"),
+                function_call=message.get("function_call")
+            )
+        ))
+    usage = data.get("usage") or {}
+    return SimpleNamespace(
+        id=data.get("id"),
+        model=data.get("model"),
+        choices=choices,
+        usage=SimpleNamespace(
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+            total_tokens=usage.get("total_tokens", 0)
+        ),
+        cost=0.0,
+        backend=backend
+    )
+
+
+class LLMRouter:
+    """Spreads LLM completions over several model servers.
+
+    Each request goes to the backend with the fewest requests in flight
+    relative to its weight (``least_outstanding``), or to one picked at
+    random in proportion to the weights (``weighted``). No backend gets more
+    than its ``max_concurrency`` requests at once; when all are full,
+    callers wait for a slot. A backend that fails ``failure_threshold``
+    times in a row is ejected for ``eject_seconds``. Every
+    ``health_interval`` seconds each backend's /models is probed; a failing
+    probe ejects the backend until a probe passes again. Failed requests are
+    retried on another backend. With ``hedge``, a request still running
+    after the router's recent p95 latency is also sent to a second backend,
+    and the first answer wins.
+
+    Completions are blocking calls, made from autogen's executor threads.
+    """
+
+    def __init__(self, backends: List[Backend], strategy: str = "least_outstanding", timeout: float = 120,
+                 failure_threshold: int = 3, eject_seconds: float = 30, health_interval: float = 10,
+                 hedge: bool = False, hedge_quantile: float = 0.95, hedge_min_samples: int = 20,
+                 hedge_min_delay: float = 0.05):
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"strategy must be one of {', '.join(STRATEGIES)}")
+        self.backends = backends
+        self.strategy = strategy
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.eject_seconds = eject_seconds
+        self.health_interval = health_interval
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self._cond = threading.Condition()
+        self._latencies = deque(maxlen=500)
+        self._http = httpx.Client(timeout=timeout, limits=httpx.Limits(
+            max_connections=sum(backend.max_concurrency for backend in backends) + len(backends)
+        ))
+        # Hedged requests run both attempts here; each holds a backend slot
+        self._executor = ThreadPoolExecutor(
+            max_workers=sum(backend.max_concurrency for backend in backends),
+            thread_name_prefix="llm-router"
+        )
+        self._stop = threading.Event()
+        self._health_thread: Optional[threading.Thread] = None
+        self.counters = {"requests": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "waits": 0}
+
+    def add_to_agent(self, agent) -> None:
+        """Serve the agent's ``model_client_cls: RouterClient`` config entries from this router"""
+        if getattr(agent, "client", None) is not None:
+            agent.register_model_client(model_client_cls=RouterClient, router=self)
+
+    def _pick(self, exclude: List[Backend]) -> Tuple[Optional[Backend], bool]:
+        """A backend with a free slot, and whether any backend is left to wait for"""
+        now = time.monotonic()
+        candidates = [backend for backend in self.backends if backend not in exclude]
+        healthy = [backend for backend in candidates if backend.available(now)]
+        # With every backend ejected, trying one beats failing outright
+        candidates = healthy or candidates
+        free = [backend for backend in candidates if backend.in_flight < backend.max_concurrency]
+        if not free:
+            return None, bool(candidates)
+        if self.strategy == "weighted":
+            return random.choices(free, weights=[backend.weight for backend in free])[0], True
+        return min(free, key=lambda backend: (backend.in_flight / backend.weight, random.random())), True
+
+    def _acquire(self, exclude: List[Backend], block: bool = True) -> Optional[Backend]:
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        with self._cond:
+            while True:
+                backend, remaining = self._pick(exclude)
+                if backend is not None:
+                    backend.in_flight += 1
+                    backend.counters["requests"] += 1
+                    return backend
+                if not remaining or not block:
+                    return None
+                if not waited:
+                    self.counters["waits"] += 1
+                    waited = True
+                if not self._cond.wait(deadline - time.monotonic()) and time.monotonic() >= deadline:
+                    raise RouterError(f"No LLM backend had a free slot within {self.timeout} seconds")
+
+    def _release(self, backend: Backend, failed: bool, latency: Optional[float]):
+        with self._cond:
+            backend.in_flight -= 1
+            if failed:
+                backend.counters["failures"] += 1
+                backend.consecutive_failures += 1
+                if backend.consecutive_failures >= self.failure_threshold and backend.available(time.monotonic()):
+                    self._eject(backend, time.monotonic() + self.eject_seconds)
+            else:
+                backend.consecutive_failures = 0
+                if latency is not None:
+                    backend.latencies.append(latency)
+                    self._latencies.append(latency)
+            self._cond.notify_all()
+
+    def _count(self, name: str, backend: Optional[Backend] = None):
+        # complete() runs on many threads at once
+        with self._cond:
+            self.counters[name] += 1
+            if backend is not None:
+                backend.counters[name] += 1
+
+    def _eject(self, backend: Backend, until: float):
+        backend.ejected_until = until
+        backend.counters["ejections"] += 1
+        logging.warning(f"Ejected LLM backend {backend.name}")
+
+    def _body(self, backend: Backend, params: Dict[str, Any]) -> Dict[str, Any]:
+        body = {key: params[key] for key in FORWARDED_PARAMS if params.get(key) is not None}
+        body["model"] = backend.model or params.get("model")
+        return body
+
+    def _post(self, backend: Backend, params: Dict[str, Any]) -> SimpleNamespace:
+        """One attempt on one backend, holding one of its slots"""
+        body = self._body(backend, params)
+        started = time.monotonic()
+        failed = False
+        try:
+            if body.get("stream"):
+                return self._stream(backend, body)
+            response = self._http.post(f"{backend.base_url}/chat/completions", json=body, headers=backend.headers())
+            self._check(backend, response)
+            return to_response(response.json(), backend.name)
+        except BackendFailure:
+            failed = True
+            raise
+        except httpx.HTTPError as e:
+            failed = True
+            raise BackendFailure(f"{backend.name}: {str(e) or type(e).__name__}") from e
+        finally:
+            self._release(backend, failed, time.monotonic() - started)
+
+    def _check(self, backend: Backend, response: httpx.Response):
+        if response.status_code >= 500 or response.status_code == 429:
+            raise BackendFailure(f"{backend.name} returned {response.status_code}")
+        if response.status_code >= 400:
+            # The request itself is bad; another backend won't take it either
+            raise RouterError(f"{backend.name} rejected the request ({response.status_code}): {response.text[:200]}")
+
+    def _stream(self, backend: Backend, body: Dict[str, Any]) -> SimpleNamespace:
+        """Stream a completion, printing tokens to autogen's IOStream as they arrive"""
+        from autogen.io import IOStream
+        iostream = IOStream.get_default()
+        parts: List[str] = []
+        data: Dict[str, Any] = {}
+        finish_reason = None
+        with self._http.stream("POST", f"{backend.base_url}/chat/completions", json=body,
+                               headers=backend.headers()) as response:
+            if response.status_code >= 400:
+                response.read()
+                self._check(backend, response)
+            for line in response.iter_lines():
+                if not line.startswith("data:"):
+                    continue
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    break
+                chunk = json.loads(payload)
+                data.update({key: chunk[key] for key in ("id", "model", "usage") if chunk.get(key)})
+                for choice in chunk.get("choices") or []:
+                    content = (choice.get("delta") or {}).get("content")
+                    if content:
+                        parts.append(content)
+                        if iostream is not None:
+                            iostream.print(content, end="", flush=True)
+                    finish_reason = choice.get("finish_reason") or finish_reason
+        content = "".join(parts)
+        if "usage" not in data:
+            prompt_tokens = sum(estimate_tokens(str(m.get("content") or "")) for m in body.get("messages", []))
+            completion_tokens = estimate_tokens(content)
+            data["usage"] = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                             "total_tokens": prompt_tokens + completion_tokens}
+        data["choices"] = [{"index": 0, "finish_reason": finish_reason,
+                            "message": {"role": "assistant", "content": content}}]
+        return to_response(data, backend.name)
+
+    def hedge_delay(self) -> Optional[float]:
+        """How long a request runs before it is hedged; None until there are
+        hedge_min_samples latencies (with 0, hedge_min_delay until there are any)"""
+        with self._cond:
+            samples = list(self._latencies)
+        if len(samples) < self.hedge_min_samples:
+            return None
+        quantile = percentile(samples, self.hedge_quantile) if samples else 0.0
+        return max(quantile, self.hedge_min_delay)
+
+    def _hedged(self, primary: Backend, params: Dict[str, Any], tried: List[Backend]) -> SimpleNamespace:
+        first = self._executor.submit(self._post, primary, params)
+        delay = self.hedge_delay()
+        if delay is None or wait([first], timeout=delay).done:
+            return first.result()
+        backup = self._acquire(tried, block=False)
+        if backup is None:
+            return first.result()
+        tried.append(backup)
+        self._count("hedges", backup)
+        second = self._executor.submit(self._post, backup, params)
+        pending = {first, second}
+        error: Optional[Exception] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except BackendFailure as e:
+                    error = e
+                    continue
+                # The other attempt finishes in the background and frees its slot
+                if future is second:
+                    self._count("hedge_wins", backup)
+                return result
+        raise error
+
+    def complete(self, params: Dict[str, Any]) -> SimpleNamespace:
+        """Run a chat completion on the best available backend, retrying on others"""
+        self._count("requests")
+        tried: List[Backend] = []
+        error: Optional[Exception] = None
+        while True:
+            backend = self._acquire(tried)
+            if backend is None:
+                break
+            if tried:
+                self._count("retries")
+            tried.append(backend)
+            try:
+                # A stream already printed to the chat can't be raced
+                if self.hedge and not params.get("stream"):
+                    return self._hedged(backend, params, tried)
+                return self._post(backend, params)
+            except BackendFailure as e:
+                logging.warning(f"LLM backend failed, trying another: {str(e)}")
+                error = e
+        raise RouterError(f"All LLM backends failed: {str(error)}")
+
+    def check_health(self):
+        """Probe every backend once, ejecting failing ones and restoring recovered ones"""
+        for backend in self.backends:
+            try:
+                response = self._http.get(f"{backend.base_url}/models", headers=backend.headers(),
+                                          timeout=min(self.timeout, 5))
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            with self._cond:
+                if ok:
+                    if not backend.available(time.monotonic()):
+                        logging.info(f"LLM backend {backend.name} is healthy again")
+                    backend.ejected_until = 0.0
+                    backend.consecutive_failures = 0
+                elif backend.available(time.monotonic()):
+                    # Out until a probe passes
+                    self._eject(backend, math.inf)
+                self._cond.notify_all()
+
+    def _health_loop(self):
+        while not self._stop.wait(self.health_interval):
+            try:
+                self.check_health()
+            except Exception as e:
+                logging.error(f"Error checking LLM backends: {str(e)}")
+
+    def start(self):
+        """Start the background health checks"""
+        if self.health_interval > 0 and self._health_thread is None:
+            self._stop.clear()
+            self._health_thread = threading.Thread(target=self._health_loop, name="llm-health", daemon=True)
+            self._health_thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._health_thread is not None:
+            self._health_thread.join()
+            self._health_thread = None
+        self._executor.shutdown(wait=False)
+        self._http.close()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._cond:
+            return {
+                **self.counters,
+                "strategy": self.strategy,
+                "hedge_delay": self.hedge_delay() if self.hedge else None,
+                "backends": [
+                    {
+                        "name": backend.name,
+                        "healthy": backend.available(now),
+                        "in_flight": backend.in_flight,
+                        "max_concurrency": backend.max_concurrency,
+                        "weight": backend.weight,
+                        "p95_latency": percentile(list(backend.latencies), 0.95) if backend.latencies else None,
+                        **backend.counters
+                    }
+                    for backend in self.backends
+                ]
+            }
+
+
+class RouterClient:
+    """autogen model client that sends completions through an LLMRouter.
+
+    Used by config entries with ``"model_client_cls": "RouterClient"`` once
+    ``LLMRouter.add_to_agent`` has registered it on the agent.
+    """
+
+    def __init__(self, config: Dict[str, Any], router: LLMRouter, **kwargs):
+        self.model = config.get("model")
+        self.router = router
+
+    def create(self, params: Dict[str, Any]) -> SimpleNamespace:
+        return self.router.complete({"model": self.model, **params})
+
+    def message_retrieval(self, response: SimpleNamespace) -> List[Any]:
+        messages = []
+        for choice in response.choices:
+            message = choice.message
+            if message.tool_calls or message.function_call:
+                messages.append({key: value for key, value in vars(message).items() if value is not None})
+            else:
+                messages.append(message.content)
+        return messages
+
+    def cost(self, response: SimpleNamespace) -> float:
+        return 0.0
+
+    @staticmethod
+    def get_usage(response: SimpleNamespace) -> Dict[str, Any]:
+        return {
+            "prompt_tokens": response.usage.prompt_tokens,
+            "completion_tokens": response.usage.completion_tokens,
+            "total_tokens": response.usage.total_tokens,
+            "cost": 0.0,
+            "model": response.model
+        }
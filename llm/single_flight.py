@@ -0,0 +1,88 @@
+from typing import Dict, Any, Callable, Awaitable
+import asyncio
+import hashlib
+import json
+import re
+
+
+def request_key(endpoint: str, params: Dict[str, Any]) -> str:
+    """Key for a request with whitespace and parameter order normalized away"""
+    def normalize(value):
+        if isinstance(value, str):
+            return re.sub(r"\s+", " ", value).strip()
+        if isinstance(value, dict):
+            return {k: normalize(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [normalize(v) for v in value]
+        return value
+
+    payload = json.dumps({"endpoint": endpoint, "params": normalize(params)}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces identical in-flight requests onto one execution.
+
+    The first caller for a key starts the work; later callers with the same
+    key wait on that result instead of starting their own. The work is
+    cancelled once every waiter has gone away.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.counters = {"leaders": 0, "coalesced": 0, "cancelled": 0}
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._flights.get(key)
+        if flight is None or flight.task.done():
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.counters["leaders"] += 1
+        else:
+            self.counters["coalesced"] += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+                self._forget(key, flight)
+                self.counters["cancelled"] += 1
+
+    def _forget(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._flights), **self.counters}
+
+
+async def cancel_on_disconnect(work: Awaitable[Any], is_disconnected: Callable[[], Awaitable[bool]],
+                               interval: float = 1.0) -> Any:
+    """Await work, cancelling it if the client goes away first"""
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=interval)
+            if done:
+                return task.result()
+            if await is_disconnected():
+                raise ClientDisconnected("Client disconnected before the response was ready")
+    finally:
+        if not task.done():
+            task.cancel()
@@ -0,0 +1,15 @@
+import math
+
+# Rough average for English text and code with OpenAI tokenizers; close
+# enough for budgeting without pulling in a tokenizer
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of text"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def token_budget_chars(tokens: int) -> int:
+    """Characters that fit in a token budget"""
+    return tokens * CHARS_PER_TOKEN
@@ -1,85 +1,215 @@
 from fastapi import FastAPI, HTTPException, Request, BackgroundTasks
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
 import asyncio
+import codecs
 import uuid
 import json
 import os
 from datetime import datetime
 import logging
+import math
+import time
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 import autogen
 from autogen.coding import LocalCommandLineCodeExecutor
 import os
+import shutil
 from dotenv import load_dotenv
 import re
-import subprocess
-from agents import TeamManager
+import tempfile
+from agents import TeamManager, AgentPool, HistoryCompactor, ConvergenceMonitor, is_termination_msg, ChatStreamer, last_code_block
+from agents import report_progress, reporting
+from analysis import iter_chunks, has_header, map_reduce, ProfileCache, format_profile
+from execution import InterpreterPool, OutputStream, ExecutionStore, ExecutionScheduler, QueueFull
+from execution import WorkflowGraphError, validate_graph, run_workflow_graph, JavaBuilder, JavaSnippetPool, JobManager
+from execution import ResourceLimits, classify_exit, kill_process_group, spawn_options
+from execution import OutputCapture, OutputSpool, OutputRangeUnavailable
+from llm import CompletionCache, SingleFlight, ClientDisconnected, request_key, cancel_on_disconnect
+from llm import LLMRouter, parse_backends
+from llm.tokens import token_budget_chars
+from monitoring import MetricsRegistry, RequestMetrics, LLMCallMetrics, CONTENT_TYPE, Tracer, TraceRequests, chrome_trace
 
 load_dotenv()
 
-# Initialize autogen agents
+# Initialize autogen agents; LLM_BASE_URL can point at any OpenAI-compatible
+# server, e.g. the stub server in benchmarks/
 config_list = [
     {
-        'model': 'llama3.1:8b',
-        'base_url': "http://localhost:11434/v1",
-        'api_key': "ollama"
+        'model': os.getenv("LLM_MODEL", 'llama3.1:8b'),
+        'base_url': os.getenv("LLM_BASE_URL", "http://localhost:11434/v1"),
+        'api_key': os.getenv("LLM_API_KEY", "ollama")
     }
 ]
 
+# With LLM_BACKENDS (comma-separated base URLs or a JSON list), completions
+# are spread over several model servers instead of LLM_BASE_URL, skipping
+# unhealthy ones and optionally hedging slow requests
+llm_router = None
+if os.getenv("LLM_BACKENDS"):
+    llm_router = LLMRouter(
+        parse_backends(
+            os.environ["LLM_BACKENDS"],
+            model=config_list[0]['model'],
+            api_key=config_list[0]['api_key'],
+            max_concurrency=int(os.getenv("LLM_BACKEND_MAX_CONCURRENCY", "4"))
+        ),
+        strategy=os.getenv("LLM_ROUTING", "least_outstanding"),
+        health_interval=float(os.getenv("LLM_HEALTH_INTERVAL", "10")),
+        hedge=os.getenv("LLM_HEDGE", "false").lower() in ("1", "true", "yes"),
+        hedge_quantile=float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+    )
+    config_list = [{'model': config_list[0]['model'], 'model_client_cls': 'RouterClient'}]
+
 llm_config = {
     "config_list": config_list,
     "timeout": 120,
-    "temperature": 0
+    "temperature": 0,
+    # autogen's own per-seed disk cache grows without bound; completions are
+    # cached by completion_cache below instead
+    "cache_seed": None
 }
 
-# Create assistant agent with async capabilities
-assistant = autogen.AssistantAgent(
-    name="assistant",
-    llm_config=llm_config,
-    system_message=" You create python code robustly and send fully finished mvps based on the prompt.reply with TERMINATE when finished.",
-    human_input_mode="NEVER",
-    is_termination_msg=lambda msg: "TERMINATE" in msg["content"].lower(),
+# Shared completion cache for every agent's LLM calls. With temperature 0 a
+# repeated prompt gets the same answer, so it is served from disk.
+completion_cache = CompletionCache(
+    Path(os.getenv("LLM_CACHE_DIR", ".cache/llm")) / "completions.sqlite",
+    max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+    ttl=float(os.environ["LLM_CACHE_TTL"]) if os.getenv("LLM_CACHE_TTL") else None
+)
 
+# Every turn resends the whole history; long outputs are cut to head and
+# tail excerpts and old turns dropped so prompts stay within budget
+history_compactor = HistoryCompactor(
+    max_tokens=int(os.getenv("COMPACTION_MAX_TOKENS", "8000")),
+    max_message_tokens=int(os.getenv("COMPACTION_MAX_MESSAGE_TOKENS", "1000"))
+)
 
+# Stops chats that have finished, are repeating themselves or have run past
+# their time or token allowance, instead of using up every auto-reply
+chat_monitor = ConvergenceMonitor(
+    max_seconds=float(os.getenv("CHAT_MAX_SECONDS", "300")),
+    max_tokens=int(os.getenv("CHAT_MAX_TOKENS", "60000"))
 )
 
-# Create user proxy agent with async capabilities
-user_proxy = autogen.UserProxyAgent(
-    name="user_proxy",
-    human_input_mode="NEVER",
-    max_consecutive_auto_reply=10,
-    code_execution_config={
-        "work_dir": "workspace",
-        "use_docker": True
-    },
-    llm_config=llm_config,
-    is_termination_msg=lambda msg: "TERMINATE" in msg["content"].lower(),
-    system_message="Execute code and provide feedback."
-    
+# Prometheus metrics served on /metrics; every agent's LLM calls are
+# counted and timed under its name
+metrics = MetricsRegistry()
+llm_metrics = LLMCallMetrics(metrics)
+
+# Per-request traces of agent turns, LLM calls and code executions; the
+# most recent TRACE_HISTORY are kept, and written to TRACE_DIR when set
+tracer = Tracer(
+    history=int(os.getenv("TRACE_HISTORY", "100")),
+    directory=Path(os.environ["TRACE_DIR"]) if os.getenv("TRACE_DIR") else None
 )
 
+# Turns, messages and (with LLM_STREAM) the model's tokens of chats run by
+# the streaming generation endpoints
+chat_streamer = ChatStreamer()
+llm_stream = os.getenv("LLM_STREAM", "true").lower() in ("1", "true", "yes")
+
+def create_agent_pair():
+    # Create assistant agent with async capabilities
+    assistant = autogen.AssistantAgent(
+        name="assistant",
+        llm_config={**llm_config, "stream": llm_stream},
+        system_message=" You create python code robustly and send fully finished mvps based on the prompt.reply with TERMINATE when finished.",
+        human_input_mode="NEVER",
+        is_termination_msg=is_termination_msg,
+    )
+
+    # Create user proxy agent with async capabilities
+    user_proxy = autogen.UserProxyAgent(
+        name="user_proxy",
+        human_input_mode="NEVER",
+        max_consecutive_auto_reply=10,
+        code_execution_config={
+            "work_dir": "workspace",
+            "use_docker": True
+        },
+        llm_config=llm_config,
+        is_termination_msg=is_termination_msg,
+        system_message="Execute code and provide feedback."
+    )
+    for agent in (assistant, user_proxy):
+        history_compactor.add_to_agent(agent)
+        chat_monitor.add_to_agent(agent)
+        llm_metrics.add_to_agent(agent)
+        tracer.add_to_agent(agent)
+        chat_streamer.add_to_agent(agent)
+        if llm_router is not None:
+            llm_router.add_to_agent(agent)
+    return assistant, user_proxy
+
+# Each chat checks out its own assistant/user_proxy pair so concurrent
+# requests never share conversation state
+agent_pool = AgentPool(create_agent_pair, size=int(os.getenv("AGENT_POOL_SIZE", "4")))
+
 # Initialize team manager
-team_manager = TeamManager(config_list)
+team_manager = TeamManager(
+    config_list,
+    completion_cache,
+    chat_timeout=float(os.getenv("TEAM_CHAT_TIMEOUT", "300")),
+    research_concurrency=int(os.getenv("RESEARCH_PHASE_CONCURRENCY", "3")),
+    # Agent sets per team; team requests beyond this wait for a free set
+    team_pool_size=int(os.getenv("TEAM_POOL_SIZE", "2")),
+    compactor=history_compactor,
+    monitor=chat_monitor,
+    llm_metrics=llm_metrics,
+    tracer=tracer,
+    router=llm_router,
+    index_dir=Path(os.getenv("CODE_INDEX_DIR", ".cache/code_index")),
+    index_tokens=int(os.getenv("CODE_INDEX_TOKENS", "6000"))
+)
+
+# Identical requests that arrive while one is already running share its
+# result instead of starting another chat
+single_flight = SingleFlight()
+DISCONNECT_POLL_INTERVAL = float(os.getenv("DISCONNECT_POLL_INTERVAL", "1.0"))
+
+async def coalesced(request: Request, endpoint: str, params: Dict[str, Any], factory):
+    """Run factory once per distinct in-flight request, dropping callers that disconnect"""
+    work = single_flight.do(request_key(endpoint, params), factory)
+    return await cancel_on_disconnect(work, request.is_disconnected, DISCONNECT_POLL_INTERVAL)
+
+# Files too large for one prompt are analyzed in chunks of this many tokens,
+# at most ANALYSIS_CONCURRENCY at a time, and the partial answers reduced
+ANALYSIS_CHUNK_TOKENS = int(os.getenv("ANALYSIS_CHUNK_TOKENS", "3000"))
+ANALYSIS_CONCURRENCY = int(os.getenv("ANALYSIS_CONCURRENCY", "4"))
+
+# Tabular files are summarized once per version of the file and the
+# summary is sent to the model instead of the rows
+profile_cache = ProfileCache(
+    Path(os.getenv("PROFILE_CACHE_DIR", ".cache/profiles")),
+    sample_rows=int(os.getenv("PROFILE_SAMPLE_ROWS", "20"))
+)
+
+ANALYSIS_MODES = ("auto", "raw", "chunked", "profile")
 
 class AutogenWorkflow:
-    def __init__(self):
-        self.assistant = assistant
-        self.user_proxy = user_proxy
+    def __init__(self, pool: Optional[AgentPool] = None):
+        self.agent_pool = pool or agent_pool
         self.max_consecutive_auto_reply = 10
         self.max_retries = 3
+        self.chunk_tokens = ANALYSIS_CHUNK_TOKENS
+        self.analysis_concurrency = ANALYSIS_CONCURRENCY
 
-    async def execute_task(self, task_description: str):
+    async def execute_task(self, task_description: str, use_cache: bool = True):
         try:
+            report_progress("execute_task")
             # Create a chat between assistant and user_proxy
-            chat_manager = await self.user_proxy.a_initiate_chat(
-                self.assistant,
-                message=task_description
-            )
+            async with self.agent_pool.checkout() as (assistant, user_proxy):
+                with history_compactor.chat("execute_task"), chat_monitor.chat("execute_task"), tracer.chat("execute_task"):
+                    chat_manager = await user_proxy.a_initiate_chat(
+                        assistant,
+                        message=task_description,
+                        cache=completion_cache if use_cache else None
+                    )
             
             # Get the last message from the chat
             messages = chat_manager.chat_history
@@ -93,8 +223,55 @@ class AutogenWorkflow:
             logging.error(f"Error executing task: {str(e)}")
             raise
 
-    async def analyze_data(self, data_file: str, analysis_prompt: str):
+    async def ask(self, message: str, use_cache: bool = True) -> Optional[str]:
+        """Single assistant reply to message, without code execution rounds"""
+        async with self.agent_pool.checkout() as (assistant, user_proxy):
+            with tracer.chat("ask"):
+                chat_result = await user_proxy.a_initiate_chat(
+                    assistant,
+                    message=message,
+                    max_turns=1,
+                    cache=completion_cache if use_cache else None
+                )
+        messages = chat_result.chat_history
+        if not messages:
+            return None
+        return messages[-1].get("content", None)
+
+    async def analyze_data(self, data_file: str, analysis_prompt: str, use_cache: bool = True, mode: str = "auto"):
+        """Analyze a data file in one prompt ("raw"), map-reduced over chunks
+        ("chunked") or from a column profile and sampled rows ("profile").
+
+        "auto" profiles CSV/TSV files and otherwise picks raw when the file
+        fits in a single chunk.
+        """
         try:
+            if mode not in ANALYSIS_MODES:
+                raise ValueError(f"Unknown analysis mode: {mode}")
+            if mode == "auto":
+                # Bytes are an upper bound on characters
+                fits = os.path.getsize(data_file) <= token_budget_chars(self.chunk_tokens)
+                if has_header(Path(data_file)):
+                    mode = "profile"
+                else:
+                    mode = "raw" if fits else "chunked"
+            report_progress(mode)
+            if mode == "profile":
+                profile = await asyncio.to_thread(profile_cache.profile, Path(data_file))
+                return await self.ask(
+                    f"Data profile of {Path(data_file).name} (column statistics and sampled rows):\n"
+                    f"{format_profile(profile)}\n\nAnalysis prompt:\n{analysis_prompt}",
+                    use_cache
+                )
+            if mode == "chunked":
+                return await map_reduce(
+                    iter_chunks(Path(data_file), self.chunk_tokens),
+                    analysis_prompt,
+                    lambda message: self.ask(message, use_cache),
+                    max_tokens=self.chunk_tokens,
+                    concurrency=self.analysis_concurrency
+                )
+
             # Read the data file
             with open(data_file, 'r') as f:
                 data_content = f.read()
@@ -109,10 +286,13 @@ class AutogenWorkflow:
             """
             
             # Create a chat between assistant and user_proxy
-            chat_manager = await self.user_proxy.a_initiate_chat(
-                self.assistant,
-                message=message
-            )
+            async with self.agent_pool.checkout() as (assistant, user_proxy):
+                with history_compactor.chat("analyze_data"), chat_monitor.chat("analyze_data"), tracer.chat("analyze_data"):
+                    chat_manager = await user_proxy.a_initiate_chat(
+                        assistant,
+                        message=message,
+                        cache=completion_cache if use_cache else None
+                    )
             
             # Get the last message from the chat
             messages = chat_manager.chat_history
@@ -136,6 +316,11 @@ class CodeExecutionResult(BaseModel):
     status: str
     result: Optional[str] = None
     error: Optional[str] = None
+    queue_position: Optional[int] = None
+    queue_depth: Optional[int] = None
+    wait_time: Optional[float] = None
+    usage: Optional[Dict[str, Any]] = None
+    output: Optional[Dict[str, Any]] = None
 
 class AgentMessage(BaseModel):
     sender: str
@@ -144,6 +329,9 @@ class AgentMessage(BaseModel):
 
 class WorkflowStep(BaseModel):
     type: str
+    id: Optional[str] = None
+    # None waits for the step before; [] runs without waiting for any
+    depends_on: Optional[List[str]] = None
     code: Optional[str] = None
     message: Optional[str] = None
     options: Optional[Dict[str, Any]] = {}
@@ -151,6 +339,9 @@ class WorkflowStep(BaseModel):
 class Workflow(BaseModel):
     name: str
     steps: List[WorkflowStep]
+    max_parallel: Optional[int] = None
+    # Steps without depends_on run concurrently instead of one after another
+    parallel: bool = False
 
 class WorkflowResult(BaseModel):
     id: str
@@ -158,6 +349,11 @@ class WorkflowResult(BaseModel):
     result: Optional[str] = None
     error: Optional[str] = None
 
+class JobRequest(BaseModel):
+    kind: str
+    params: Dict[str, Any] = {}
+    use_cache: bool = True
+
 class CodeGenerationRequest(BaseModel):
     prompt: str
     options: Optional[Dict[str, Any]] = {}
@@ -168,6 +364,15 @@ class CodeGenerationResponse(BaseModel):
     error: Optional[str] = None
 
 app = FastAPI()
+app.add_middleware(RequestMetrics, histogram=metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")
+))
+app.add_middleware(TraceRequests, tracer=tracer)
+
+@app.exception_handler(ClientDisconnected)
+async def client_disconnected_handler(request: Request, exc: ClientDisconnected):
+    # Nobody is listening any more; 499 follows the nginx convention
+    return JSONResponse(status_code=499, content={"error": str(exc)})
 
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -175,33 +380,227 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 # Templates
 templates = Jinja2Templates(directory="templates")
 
-# In-memory storage for executions and workflows
-executions = {}
-workflows = {}
+# Bounded storage for executions and workflows: finished records expire
+# after EXECUTION_STORE_TTL seconds, the least recently used ones are evicted
+# beyond the entry/byte limits, and large results are spilled to disk
+store_spill_dir = Path(os.getenv("EXECUTION_STORE_SPILL_DIR", os.path.join(tempfile.gettempdir(), "autogen_flow")))
+
+def create_store(name: str) -> ExecutionStore:
+    return ExecutionStore(
+        max_entries=int(os.getenv("EXECUTION_STORE_MAX_ENTRIES", "1000")),
+        max_bytes=int(os.getenv("EXECUTION_STORE_MAX_BYTES", str(64 * 1024 * 1024))),
+        ttl=float(os.getenv("EXECUTION_STORE_TTL", "3600")),
+        spill_bytes=int(os.getenv("EXECUTION_STORE_SPILL_BYTES", str(256 * 1024))),
+        spill_dir=store_spill_dir / name
+    )
+
+executions = create_store("executions")
+workflows = create_store("workflows")
+
+# Live output of executions that are still running, keyed by execution id
+execution_streams: Dict[str, OutputStream] = {}
+# Characters of output a live stream keeps for listeners that connect late
+execution_stream_backlog = int(os.getenv("EXECUTION_STREAM_BACKLOG", str(1024 * 1024)))
+
+# Execution output beyond a head and tail of these sizes is cut from results
+# and gzipped to disk (up to EXECUTION_OUTPUT_MAX_SPILL_MB per stream), from
+# where /execution_status/{id}/output serves any range of it
+output_spool = OutputSpool(
+    store_spill_dir / "output",
+    head_chars=int(os.getenv("EXECUTION_OUTPUT_HEAD_CHARS", str(64 * 1024))),
+    tail_chars=int(os.getenv("EXECUTION_OUTPUT_TAIL_CHARS", str(64 * 1024))),
+    max_spill_chars=int(os.getenv("EXECUTION_OUTPUT_MAX_SPILL_MB", "256")) * 1024 * 1024,
+    max_files=int(os.getenv("EXECUTION_OUTPUT_MAX_FILES", "200"))
+)
+
+worker_spawn_seconds = metrics.histogram(
+    "code_worker_spawn_seconds", "Time to start a code execution process", ("backend",)
+)
+execution_seconds = metrics.histogram(
+    "code_execution_seconds", "Code execution runtime", ("language", "status")
+)
+
+# Per-execution rlimits for Python snippets (0 disables one); requests can
+# lower them through options but not raise them
+execution_limits = ResourceLimits(
+    cpu_seconds=float(os.getenv("CODE_EXEC_CPU_SECONDS", "30")),
+    memory_bytes=int(os.getenv("CODE_EXEC_MEMORY_MB", "2048")) * 1024 * 1024,
+    open_files=int(os.getenv("CODE_EXEC_MAX_OPEN_FILES", "256")),
+    processes=int(os.getenv("CODE_EXEC_MAX_PROCESSES", "512"))
+)
+
+# Warm interpreters for Python executions; CODE_POOL_SIZE=0 falls back to a
+# fresh `python -c` per snippet
+code_pool_size = int(os.getenv("CODE_POOL_SIZE", "4"))
+interpreter_pool = InterpreterPool(
+    size=code_pool_size,
+    preload=[name.strip() for name in os.getenv("CODE_POOL_PRELOAD", "matplotlib,yfinance").split(",") if name.strip()],
+    max_runs=int(os.getenv("CODE_POOL_MAX_RUNS", "50")),
+    on_spawn=lambda seconds: worker_spawn_seconds.observe(seconds, backend="python_pool"),
+    limits=execution_limits
+) if code_pool_size > 0 else None
+
+# Warm JVMs for Java executions; JAVA_POOL_SIZE=0 disables Java execution.
+# Each JVM gets the memory, open file and process limits above
+java_bin = os.getenv("JAVA_BIN", "java")
+java_pool_size = int(os.getenv("JAVA_POOL_SIZE", "2"))
+java_pool = JavaSnippetPool(
+    size=java_pool_size,
+    max_runs=int(os.getenv("JAVA_POOL_MAX_RUNS", "100")),
+    java=java_bin,
+    jvm_options=os.getenv("JAVA_OPTS", "-XX:+UseSerialGC").split(),
+    on_spawn=lambda seconds: worker_spawn_seconds.observe(seconds, backend="java_pool"),
+    limits=execution_limits
+) if java_pool_size > 0 else None
+
+# Default per-snippet time limit; a request can set options["timeout"]
+code_exec_timeout = float(os.getenv("CODE_EXEC_TIMEOUT", "30"))
+
+# Admission control for /execute_code: at most CODE_EXEC_CONCURRENCY run at
+# once, up to CODE_EXEC_QUEUE_SIZE more wait by priority, the rest get a 429
+execution_scheduler = ExecutionScheduler(
+    max_concurrency=int(os.getenv("CODE_EXEC_CONCURRENCY", str(max(code_pool_size, 1)))),
+    max_queue=int(os.getenv("CODE_EXEC_QUEUE_SIZE", "100"))
+)
+# Queue priority is set by the server, never by the request body: callers
+# presenting an X-API-Key listed in EXECUTION_PRIORITY_KEYS ("key:priority,...")
+# get that priority, everyone else 0
+execution_priority_keys = {
+    key.strip(): int(priority)
+    for key, _, priority in (entry.rpartition(":") for entry in os.getenv("EXECUTION_PRIORITY_KEYS", "").split(","))
+    if key.strip()
+}
+
+def request_priority(http_request: Request) -> int:
+    return execution_priority_keys.get(http_request.headers.get("x-api-key", ""), 0)
+
+metrics.gauge("code_executions_running", "Executions running now",
+              function=lambda: execution_scheduler.stats()["running"])
+metrics.gauge("code_executions_queued", "Executions waiting for a slot",
+              function=lambda: execution_scheduler.stats()["queued"])
+
+# Independent workflow steps run concurrently, up to this many per workflow
+workflow_max_parallel = int(os.getenv("WORKFLOW_MAX_PARALLEL", "4"))
 
-async def execute_code_async(code: str, language: str, options: Dict[str, Any]) -> Dict[str, Any]:
+async def read_output(reader: asyncio.StreamReader, stream: str,
+                      on_output: Optional[Callable[[str, str], None]], capture: OutputCapture):
+    """Capture a subprocess pipe, forwarding each chunk as soon as it is written"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while True:
+        data = await reader.read(65536)
+        text = decoder.decode(data, final=not data)
+        if text:
+            await capture.awrite(stream, text)
+            if on_output is not None:
+                on_output(stream, text)
+        if not data:
+            break
+
+@app.on_event("startup")
+async def start_interpreter_pool():
+    if interpreter_pool is not None:
+        await interpreter_pool.start()
+    # Without a JDK the workers can't start; leave the pool cold so the
+    # error surfaces on the first Java execution instead of at boot
+    if java_pool is not None and shutil.which(java_bin):
+        await java_pool.start()
+    if llm_router is not None:
+        llm_router.start()
+
+@app.on_event("shutdown")
+async def stop_interpreter_pool():
+    if interpreter_pool is not None:
+        await interpreter_pool.close()
+    if java_pool is not None:
+        await java_pool.close()
+    if llm_router is not None:
+        llm_router.close()
+
+async def execute_code_async(code: str, language: str, options: Dict[str, Any],
+                             on_output: Optional[Callable[[str, str], None]] = None,
+                             capture: Optional[OutputCapture] = None,
+                             env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    started = time.perf_counter()
+    with tracer.span("execute_code", "code_execution", language=language.lower()) as span:
+        result = await run_snippet(code, language, options, on_output, capture, env)
+        if span is not None:
+            span.attrs["status"] = result.get('status')
+    execution_seconds.observe(
+        time.perf_counter() - started,
+        language=language.lower() if language.lower() in ('python', 'java') else 'other',
+        status=result.get('status', 'error')
+    )
+    return result
+
+async def run_snippet(code: str, language: str, options: Dict[str, Any],
+                      on_output: Optional[Callable[[str, str], None]] = None,
+                      capture: Optional[OutputCapture] = None,
+                      env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Run a Python or Java snippet; env adds environment variables for a Python one"""
     try:
+        timeout = float((options or {}).get("timeout", code_exec_timeout))
+        # Without a spooled capture, output is still cut to a head and tail
+        capture = capture or OutputCapture(output_spool.head_chars, output_spool.tail_chars)
         # Create an isolated environment for code execution
         if language.lower() == 'python':
+            limits = execution_limits.tightened(options)
+            if interpreter_pool is not None:
+                return await interpreter_pool.run(code, on_output, timeout, limits, capture, env)
+
             # Use asyncio.create_subprocess_exec for better security
+            spawn_started = time.perf_counter()
             proc = await asyncio.create_subprocess_exec(
                 'python', '-c', code,
                 stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+                stderr=asyncio.subprocess.PIPE,
+                # Unbuffered so output reaches stream listeners as it is printed
+                env={**os.environ, "PYTHONUNBUFFERED": "1", **(env or {})},
+                # Its own process group, so a kill takes whatever it spawned with it
+                **spawn_options(limits.apply)
             )
-            stdout, stderr = await proc.communicate()
+            worker_spawn_seconds.observe(time.perf_counter() - spawn_started, backend="subprocess")
+            try:
+                await asyncio.wait_for(asyncio.gather(
+                    read_output(proc.stdout, "stdout", on_output, capture),
+                    read_output(proc.stderr, "stderr", on_output, capture)
+                ), timeout)
+            except asyncio.TimeoutError:
+                kill_process_group(proc)
+                await proc.wait()
+                return {
+                    'status': 'timeout',
+                    'error': f'Execution timed out after {timeout} seconds',
+                    'usage': {'wall_time': time.perf_counter() - spawn_started}
+                }
+            await proc.wait()
+            # Children it left running in the background go with it
+            kill_process_group(proc)
+            usage = {'wall_time': time.perf_counter() - spawn_started}
+            stdout, stderr = capture.text("stdout"), capture.text("stderr")
             
             if proc.returncode != 0:
+                status = 'oom' if '\nMemoryError' in stderr else 'error'
+                killed = classify_exit(proc.returncode, limits)
+                if killed is not None:
+                    status = killed['status']
+                    stderr = f"{stderr}\n{killed['error']}" if stderr else killed['error']
                 return {
-                    'status': 'error',
-                    'error': stderr.decode() if stderr else 'Unknown error occurred'
+                    'status': status,
+                    'error': stderr if stderr else 'Unknown error occurred',
+                    'usage': usage
                 }
             
             return {
                 'status': 'completed',
-                'result': stdout.decode()
+                'result': stdout,
+                'usage': usage
             }
             
+        elif language.lower() == 'java':
+            if java_pool is None:
+                raise ValueError('Java execution is disabled (JAVA_POOL_SIZE=0)')
+            return await java_pool.run(code, on_output, timeout, capture=capture)
+            
         else:
             raise ValueError(f'Unsupported language: {language}')
             
@@ -213,43 +612,131 @@ async def execute_code_async(code: str, language: str, options: Dict[str, Any])
         }
 
 @app.post("/execute_code")
-async def execute_code(request: CodeExecutionRequest, background_tasks: BackgroundTasks) -> CodeExecutionResult:
+async def execute_code(request: CodeExecutionRequest, http_request: Request,
+                       background_tasks: BackgroundTasks) -> CodeExecutionResult:
     execution_id = str(uuid.uuid4())
+    try:
+        ticket = execution_scheduler.admit(execution_id, request_priority(http_request))
+    except QueueFull as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))}
+        )
+    
+    status = 'queued' if execution_scheduler.queue_info(execution_id) else 'running'
     executions[execution_id] = {
-        'status': 'running',
+        'status': status,
         'result': None,
         'error': None
     }
+    stream = execution_streams[execution_id] = OutputStream(max_backlog=execution_stream_backlog)
+    capture = output_spool.capture(execution_id)
     
     async def run_code():
+        outcome = {'status': 'running', 'result': None, 'error': None}
         try:
-            result = await execute_code_async(request.code, request.language, request.options)
-            executions[execution_id].update(result)
+            async with ticket:
+                executions.patch(execution_id, {'status': 'running', 'wait_time': ticket.wait_time})
+                outcome['wait_time'] = ticket.wait_time
+                outcome.update(await execute_code_async(
+                    request.code, request.language, request.options, stream.publish, capture
+                ))
+                outcome['output'] = capture.info()
+                if outcome['status'] == 'completed':
+                    # Kept for /output; a completed run's result only has stdout
+                    outcome['stderr'] = capture.text("stderr")
         except Exception as e:
             logging.error(f"Error in background task: {str(e)}")
-            executions[execution_id].update({
+            outcome.update({
                 'status': 'error',
                 'error': str(e)
             })
+        finally:
+            # Gives up the queue place if the slot was never acquired
+            ticket.cancel()
+            executions.patch(execution_id, outcome)
+            await output_spool.arelease(execution_id)
+            stream.close(CodeExecutionResult(execution_id=execution_id, **outcome).dict())
+            execution_streams.pop(execution_id, None)
     
+    # The slot is acquired inside run_code, so it is only ever held by an
+    # execution that is actually running
     background_tasks.add_task(run_code)
     
     return CodeExecutionResult(
         execution_id=execution_id,
-        status='running'
+        status=status,
+        **(execution_scheduler.queue_info(execution_id) or {})
     )
 
 @app.get("/execution_status/{execution_id}")
 async def get_execution_status(execution_id: str) -> CodeExecutionResult:
-    if execution_id not in executions:
+    execution = await executions.aget(execution_id)
+    if execution is None:
         raise HTTPException(status_code=404, detail="Execution not found")
     
-    execution = executions[execution_id]
+    queue_info = execution_scheduler.queue_info(execution_id)
+    if queue_info is not None:
+        execution.update(queue_info)
     return CodeExecutionResult(
         execution_id=execution_id,
         **execution
     )
 
+@app.get("/execution_status/{execution_id}/output")
+async def get_execution_output(execution_id: str, stream: str = "stdout", offset: int = 0, limit: int = 65536):
+    """A range of an execution's full output, including parts cut from its result"""
+    record = await executions.aget(execution_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Execution not found")
+    if stream not in ("stdout", "stderr"):
+        raise HTTPException(status_code=400, detail="stream must be stdout or stderr")
+    if offset < 0 or not 0 < limit <= 1024 * 1024:
+        raise HTTPException(status_code=400, detail="offset must be >= 0 and limit between 1 and 1048576")
+    
+    text = (record.get('result') if stream == 'stdout' else record.get('error') or record.get('stderr')) or ""
+    info = (record.get('output') or {}).get(stream)
+    try:
+        return await asyncio.to_thread(output_spool.read, execution_id, stream, offset, limit, info, text)
+    except OutputRangeUnavailable as e:
+        raise HTTPException(status_code=410, detail=str(e))
+
+@app.get("/execution_stream/{execution_id}")
+async def stream_execution(execution_id: str):
+    """Server-sent events with output chunks as they are written, then the final status"""
+    record = await executions.aget(execution_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Execution not found")
+    
+    stream = execution_streams.get(execution_id)
+    
+    async def events():
+        if stream is None:
+            # Already finished: replay the stored result as a single chunk
+            execution = CodeExecutionResult(execution_id=execution_id, **record)
+            if execution.result:
+                yield format_sse("stdout", {"data": execution.result})
+            if execution.error:
+                yield format_sse("stderr", {"data": execution.error})
+            yield format_sse("status", execution.dict())
+            return
+        async for event in stream.subscribe():
+            if event["event"] in ("status", "truncated"):
+                # truncated carries {"dropped_chunks": N}; only status ends the stream
+                yield format_sse(event["event"], event["data"])
+            else:
+                yield format_sse(event["event"], {"data": event["data"]})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @app.post("/agent/message")
 async def send_agent_message(message: AgentMessage):
     try:
@@ -267,6 +754,11 @@ async def send_agent_message(message: AgentMessage):
 
 @app.post("/workflow/create")
 async def create_workflow(workflow: Workflow):
+    try:
+        validate_graph(workflow.steps, workflow.parallel)
+    except WorkflowGraphError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     workflow_id = str(uuid.uuid4())
     workflows[workflow_id] = {
         "workflow": workflow,
@@ -277,40 +769,103 @@ async def create_workflow(workflow: Workflow):
 
 @app.post("/workflow/execute/{workflow_id}")
 async def execute_workflow(workflow_id: str, background_tasks: BackgroundTasks):
-    if workflow_id not in workflows:
+    workflow_data = await workflows.aget(workflow_id)
+    if workflow_data is None:
         raise HTTPException(status_code=404, detail="Workflow not found")
     
-    workflow_data = workflows[workflow_id]
     workflow = workflow_data["workflow"]
+    workflows.patch(workflow_id, {"status": "running"})
+    
+    async def run_step(step: WorkflowStep, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        if step.type == "code":
+            env = None
+            if inputs:
+                # Upstream stdout, keyed by step id, as JSON; the snippet's
+                # own code (and line numbers) are left as they are
+                outputs = {step_id: result.get("result") for step_id, result in inputs.items()}
+                env = {"WORKFLOW_INPUTS": json.dumps(outputs)}
+            return await execute_code_async(step.code, "python", step.options, env=env)
+        elif step.type == "message":
+            # Handle agent messages
+            pass
+        return {"status": "completed", "result": None}
     
     async def run_workflow():
         try:
-            results = []
-            for step in workflow.steps:
-                if step.type == "code":
-                    result = await execute_code_async(step.code, "python", step.options)
-                    results.append(result)
-                elif step.type == "message":
-                    # Handle agent messages
-                    pass
+            started = time.monotonic()
+            results = await run_workflow_graph(
+                workflow.steps,
+                run_step,
+                max_parallel=workflow.max_parallel or workflow_max_parallel,
+                parallel=workflow.parallel
+            )
             
-            workflow_data["status"] = "completed"
-            workflow_data["results"] = results
+            workflows.patch(workflow_id, {
+                "status": "completed",
+                "results": results,
+                "duration": time.monotonic() - started
+            })
             
         except Exception as e:
             logging.error(f"Error executing workflow: {str(e)}")
-            workflow_data["status"] = "error"
-            workflow_data["error"] = str(e)
+            workflows.patch(workflow_id, {"status": "error", "error": str(e)})
     
     background_tasks.add_task(run_workflow)
     return {"status": "running"}
 
 @app.get("/workflow/status/{workflow_id}")
 async def get_workflow_status(workflow_id: str):
-    if workflow_id not in workflows:
+    workflow_data = await workflows.aget(workflow_id)
+    if workflow_data is None:
         raise HTTPException(status_code=404, detail="Workflow not found")
     
-    return workflows[workflow_id]
+    return workflow_data
+
+@app.get("/stats")
+async def get_stats():
+    stats = {
+        "executions": executions.stats(),
+        "workflows": workflows.stats(),
+        "scheduler": execution_scheduler.stats(),
+        "llm_cache": completion_cache.stats(),
+        "agent_pool": agent_pool.stats(),
+        "single_flight": single_flight.stats(),
+        "profile_cache": profile_cache.stats(),
+        "history_compaction": history_compactor.stats(),
+        "chat_termination": chat_monitor.stats(),
+        "java_builds": java_builder.stats(),
+        "jobs": job_manager.stats(),
+        "execution_output": output_spool.stats()
+    }
+    if interpreter_pool is not None:
+        stats["interpreter_pool"] = interpreter_pool.stats()
+    if java_pool is not None:
+        stats["java_pool"] = java_pool.stats()
+    if llm_router is not None:
+        stats["llm_router"] = llm_router.stats()
+    return stats
+
+@app.get("/metrics")
+async def get_metrics():
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
+
+@app.get("/traces")
+async def list_traces():
+    return {"traces": tracer.recent()}
+
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str, format: str = "json"):
+    if format not in ("json", "chrome"):
+        raise HTTPException(status_code=400, detail="format must be json or chrome")
+    trace = tracer.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    if format == "chrome":
+        return JSONResponse(
+            content=chrome_trace(trace),
+            headers={"Content-Disposition": f'attachment; filename="trace-{trace_id}.json"'}
+        )
+    return trace
 
 @app.get("/list_workflows")
 async def list_workflows():
@@ -330,13 +885,13 @@ async def list_workflows():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/run_python_tool")
-async def run_python_tool(request: CodeExecutionRequest):
-    return await execute_code(request, BackgroundTasks())
+async def run_python_tool(request: CodeExecutionRequest, http_request: Request, background_tasks: BackgroundTasks):
+    return await execute_code(request, http_request, background_tasks)
 
 @app.post("/run_java_tool")
-async def run_java_tool(request: CodeExecutionRequest):
+async def run_java_tool(request: CodeExecutionRequest, http_request: Request, background_tasks: BackgroundTasks):
     request.language = "java"
-    return await execute_code(request, BackgroundTasks())
+    return await execute_code(request, http_request, background_tasks)
 
 @app.post("/update_code")
 async def update_code(request: Request):
@@ -376,9 +931,13 @@ async def root(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 @app.post("/autogen/execute")
-async def autogen_execute_task(task_description: str):
+async def autogen_execute_task(request: Request, task_description: str, use_cache: bool = True):
     workflow = AutogenWorkflow()
-    result = await workflow.execute_task(task_description)
+    result = await coalesced(
+        request, "autogen_execute",
+        {"task_description": task_description, "use_cache": use_cache},
+        lambda: workflow.execute_task(task_description, use_cache)
+    )
     if result is None:
         return JSONResponse(
             status_code=500,
@@ -387,9 +946,11 @@ async def autogen_execute_task(task_description: str):
     return {"result": result}
 
 @app.post("/autogen/analyze")
-async def autogen_analyze_data(data_file: str, analysis_prompt: str):
+async def autogen_analyze_data(data_file: str, analysis_prompt: str, use_cache: bool = True, mode: str = "auto"):
+    if mode not in ANALYSIS_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(ANALYSIS_MODES)}")
     workflow = AutogenWorkflow()
-    result = await workflow.analyze_data(data_file, analysis_prompt)
+    result = await workflow.analyze_data(data_file, analysis_prompt, use_cache, mode)
     if result is None:
         return JSONResponse(
             status_code=500,
@@ -410,23 +971,90 @@ async def generate_python_code(request: Request):
         # Create workflow instance
         workflow = AutogenWorkflow()
         
-        # Execute the task
-        result = await workflow.execute_task(prompt)
+        # Execute the task, sharing the result with identical requests in flight
+        use_cache = body.get("use_cache", True)
+        result = await coalesced(
+            request, "generate_python",
+            {"prompt": prompt, "use_cache": use_cache},
+            lambda: workflow.execute_task(prompt, use_cache)
+        )
         
         if not result:
             raise HTTPException(status_code=500, detail="Failed to generate code")
             
         return {"result": result}
         
+    except ClientDisconnected:
+        raise
     except Exception as e:
         logging.error(f"Error in generate_python_code: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/generate_java")
-async def generate_java_code(request: CodeGenerationRequest):
-    try:
-        workflow = AutogenWorkflow()
-        task_description = f"""Generate Java code for the following request: {request.prompt}
+def stream_generation(generate: Callable[[List[str]], Any]) -> StreamingResponse:
+    """Run a generation chat and stream its events as server-sent events.
+
+    ``turn``, ``token`` and ``message`` events follow the chat as it runs;
+    generate gets the list the sent messages are collected in. The last
+    event is ``status`` with the generation's result, or its error. The
+    chat is cancelled if the client goes away.
+    """
+    stream = OutputStream()
+    messages: List[str] = []
+
+    def publish(event: str, data: Dict[str, Any]):
+        if event == "message":
+            messages.append(data["content"])
+        stream.publish(event, data)
+
+    async def run():
+        try:
+            with chat_streamer.stream(publish):
+                result = await generate(messages)
+            stream.close({"status": "completed", **result})
+        except Exception as e:
+            logging.error(f"Error in streamed generation: {str(e)}")
+            stream.close({"status": "error", "error": str(e)})
+
+    async def events():
+        task = asyncio.create_task(run())
+        try:
+            async for event in stream.subscribe():
+                yield format_sse(event["event"], event["data"])
+        finally:
+            task.cancel()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/generate_python/stream")
+async def generate_python_code_stream(request: CodeGenerationRequest):
+    use_cache = (request.options or {}).get("use_cache", True)
+
+    async def generate(messages: List[str]) -> Dict[str, Any]:
+        result = await AutogenWorkflow().execute_task(request.prompt, use_cache)
+        if not result:
+            raise ValueError("No response generated")
+        # The chat usually ends on a TERMINATE reply; the code is earlier
+        return {"result": result, "code": last_code_block(messages, "python")}
+
+    return stream_generation(generate)
+
+# Generated Java code and tests are compiled in their own directories, a
+# few builds at a time, with compiled classes cached by source hash
+java_builder = JavaBuilder(
+    Path(os.getenv("JUNIT_JAR", "junit-platform-console-standalone.jar")),
+    Path(os.getenv("JAVA_BUILD_CACHE_DIR", ".cache/java_builds")),
+    max_concurrency=int(os.getenv("JAVA_BUILD_CONCURRENCY", "2")),
+    timeout=float(os.getenv("JAVA_BUILD_TIMEOUT", "120"))
+)
+
+async def generate_java(prompt: str, use_cache: bool) -> CodeGenerationResponse:
+    """Generate Java code and tests, then compile and run the tests"""
+    workflow = AutogenWorkflow()
+    task_description = f"""Generate Java code for the following request: {prompt}
         Include appropriate test cases and documentation.
         Format the response as follows:
         ```java
@@ -436,52 +1064,51 @@ async def generate_java_code(request: CodeGenerationRequest):
         [test cases here]
         ```
         """
-        result = await workflow.execute_task(task_description)
-        
-        if not result:
-            raise ValueError("No response generated")
-            
-        # Extract code and tests from the result
-        code_match = re.search(r'```java\n(.*?)\n```', result, re.DOTALL)
-        test_match = re.search(r'```test\n(.*?)\n```', result, re.DOTALL)
-        
-        if not code_match:
-            raise ValueError("No code was generated")
-            
-        code = code_match.group(1).strip()
-        tests = []
+    result = await workflow.execute_task(task_description, use_cache)
+    
+    if not result:
+        raise ValueError("No response generated")
         
-        if test_match:
-            test_code = test_match.group(1).strip()
-            # Create temporary files
-            main_file = "Main.java"
-            test_file = "MainTest.java"
-            
-            with open(main_file, "w") as f:
-                f.write(code)
-            with open(test_file, "w") as f:
-                f.write(test_code)
-            
-            try:
-                # Compile and run tests
-                subprocess.run(["javac", "-cp", "junit-platform-console-standalone.jar", 
-                              main_file, test_file], check=True)
-                test_result = subprocess.run(["java", "-jar", "junit-platform-console-standalone.jar",
-                                            "--class-path", ".", "--scan-class-path"],
-                                           capture_output=True, text=True)
-                tests = parse_junit_output(test_result.stdout)
-            except Exception as e:
-                tests = [{"name": "Test Execution", "passed": False, "message": str(e)}]
-            finally:
-                # Clean up
-                for file in [main_file, test_file, "Main.class", "MainTest.class"]:
-                    if os.path.exists(file):
-                        os.remove(file)
+    # Extract code and tests from the result
+    code_match = re.search(r'```java\n(.*?)\n```', result, re.DOTALL)
+    test_match = re.search(r'```test\n(.*?)\n```', result, re.DOTALL)
+    
+    if not code_match:
+        raise ValueError("No code was generated")
         
-        return CodeGenerationResponse(code=code, tests=tests)
+    code = code_match.group(1).strip()
+    tests = []
+    
+    if test_match:
+        test_code = test_match.group(1).strip()
+        try:
+            # Compile and run tests in an isolated build directory
+            build = await java_builder.build_and_test(code, test_code)
+            if not build["compiled"]:
+                tests = [{"name": "Compilation", "passed": False, "message": build["output"]}]
+            else:
+                tests = parse_junit_output(build["test_output"] or "")
+        except Exception as e:
+            tests = [{"name": "Test Execution", "passed": False, "message": str(e)}]
+    
+    return CodeGenerationResponse(code=code, tests=tests)
+
+@app.post("/generate_java")
+async def generate_java_code(request: CodeGenerationRequest):
+    try:
+        return await generate_java(request.prompt, (request.options or {}).get("use_cache", True))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/generate_java/stream")
+async def generate_java_code_stream(request: CodeGenerationRequest):
+    use_cache = (request.options or {}).get("use_cache", True)
+
+    async def generate(messages: List[str]) -> Dict[str, Any]:
+        return (await generate_java(request.prompt, use_cache)).dict()
+
+    return stream_generation(generate)
+
 @app.get("/python_tool")
 async def python_tool(request: Request):
     return templates.TemplateResponse("python_tool.html", {"request": request})
@@ -491,20 +1118,125 @@ async def java_tool(request: Request):
     return templates.TemplateResponse("java_tool.html", {"request": request})
 
 @app.post("/analyze_codebase")
-async def analyze_codebase(path: str):
-    results = await team_manager.analyze_and_improve(Path(path))
+async def analyze_codebase(path: str, use_cache: bool = True, focus: Optional[str] = None):
+    if not Path(path).exists():
+        raise HTTPException(status_code=404, detail="Path not found")
+    results = await team_manager.analyze_and_improve(Path(path), use_cache, focus)
     return JSONResponse(content=results)
 
 @app.post("/solve_problem")
-async def solve_problem(problem_description: str):
-    results = await team_manager.solve_problem(problem_description)
+async def solve_problem(request: Request, problem_description: str, use_cache: bool = True):
+    results = await coalesced(
+        request, "solve_problem",
+        {"problem_description": problem_description, "use_cache": use_cache},
+        lambda: team_manager.solve_problem(problem_description, use_cache)
+    )
     return JSONResponse(content=results)
 
 @app.post("/improve_tests")
-async def improve_tests(feature_description: str):
-    results = await team_manager.improve_test_coverage(feature_description)
+async def improve_tests(request: Request, feature_description: str, use_cache: bool = True):
+    results = await coalesced(
+        request, "improve_tests",
+        {"feature_description": feature_description, "use_cache": use_cache},
+        lambda: team_manager.improve_test_coverage(feature_description, use_cache)
+    )
     return JSONResponse(content=results)
 
+# The LLM-backed operations can also be submitted as jobs: at most
+# JOB_CONCURRENCY run at once, up to JOB_QUEUE_SIZE more wait, and clients
+# poll for progress and the result instead of holding the request open
+job_manager = JobManager(
+    create_store("jobs"),
+    ExecutionScheduler(
+        max_concurrency=int(os.getenv("JOB_CONCURRENCY", "2")),
+        max_queue=int(os.getenv("JOB_QUEUE_SIZE", "50"))
+    ),
+    progress_scope=reporting
+)
+
+async def generated(work) -> Any:
+    result = await work
+    if result is None:
+        raise ValueError("No response generated")
+    return result
+
+# Job kind: (required params, factory taking params and use_cache)
+JOB_KINDS = {
+    "autogen_execute": (["task_description"], lambda params, use_cache: generated(
+        AutogenWorkflow().execute_task(params["task_description"], use_cache))),
+    "autogen_analyze": (["data_file", "analysis_prompt"], lambda params, use_cache: generated(
+        AutogenWorkflow().analyze_data(params["data_file"], params["analysis_prompt"], use_cache,
+                                       params.get("mode", "auto")))),
+    "analyze_codebase": (["path"], lambda params, use_cache: team_manager.analyze_and_improve(
+        Path(params["path"]), use_cache, params.get("focus"))),
+    "solve_problem": (["problem_description"], lambda params, use_cache: team_manager.solve_problem(
+        params["problem_description"], use_cache)),
+    "improve_tests": (["feature_description"], lambda params, use_cache: team_manager.improve_test_coverage(
+        params["feature_description"], use_cache))
+}
+
+async def run_job(kind: str, params: Dict[str, Any], use_cache: bool):
+    """Run a job under a trace of its own; it outlives the request that submitted it"""
+    _, factory = JOB_KINDS[kind]
+    with tracer.trace(f"job {kind}", attrs={"kind": kind}):
+        return await factory(params, use_cache)
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: JobRequest, http_request: Request):
+    if request.kind not in JOB_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(JOB_KINDS)}")
+    required, _ = JOB_KINDS[request.kind]
+    missing = [name for name in required if not request.params.get(name)]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing required parameters: {', '.join(missing)}")
+    if request.kind == "autogen_analyze" and request.params.get("mode", "auto") not in ANALYSIS_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(ANALYSIS_MODES)}")
+    if request.kind == "analyze_codebase" and not Path(request.params["path"]).exists():
+        raise HTTPException(status_code=404, detail="Path not found")
+    
+    try:
+        return job_manager.submit(
+            request.kind,
+            request.params,
+            lambda: run_job(request.kind, request.params, request.use_cache),
+            request_priority(http_request)
+        )
+    except QueueFull as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))}
+        )
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    status = job_manager.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] == "completed":
+        return {"job_id": job_id, "status": "completed", "result": job["result"]}
+    if job["status"] == "error":
+        raise HTTPException(status_code=500, detail=job["error"])
+    if job["status"] == "cancelled":
+        raise HTTPException(status_code=410, detail="Job was cancelled")
+    # Not finished yet: poll again
+    return JSONResponse(status_code=202, content=job_manager.status(job_id))
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    if job_manager.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not await job_manager.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job has already finished")
+    return job_manager.status(job_id)
+
 def parse_pytest_output(output: str) -> List[Dict[str, Any]]:
     tests = []
     for line in output.split('\n'):
@@ -0,0 +1,5 @@
+from .metrics import MetricsRegistry, Counter, Gauge, Histogram, RequestMetrics, LLMCallMetrics, CONTENT_TYPE
+from .tracing import Tracer, TraceRequests, chrome_trace
+
+__all__ = ['MetricsRegistry', 'Counter', 'Gauge', 'Histogram', 'RequestMetrics', 'LLMCallMetrics', 'CONTENT_TYPE',
+           'Tracer', 'TraceRequests', 'chrome_trace']
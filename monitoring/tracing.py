@@ -0,0 +1,343 @@
+from typing import Dict, List, Optional, Any, Tuple
+import contextvars
+import functools
+import itertools
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+# Request ids become file names of exported traces
+TRACE_ID = re.compile(r"[\w.-]{1,128}")
+
+# Span kinds that account for a trace's time; the rest is overhead
+LLM_KINDS = ("llm",)
+EXECUTION_KINDS = ("code_execution",)
+
+
+class Span:
+    __slots__ = ("id", "parent", "name", "kind", "start", "end", "attrs", "lane")
+
+    def __init__(self, span_id: int, parent: Optional[int], name: str, kind: str,
+                 attrs: Dict[str, Any], lane: str):
+        self.id = span_id
+        self.parent = parent
+        self.name = name
+        self.kind = kind
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.attrs = attrs
+        self.lane = lane
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "parent": self.parent,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start,
+            "duration": (self.end or time.time()) - self.start,
+            "lane": self.lane,
+            "attrs": self.attrs
+        }
+
+
+class Trace:
+    """Spans recorded while handling one request"""
+
+    def __init__(self, trace_id: str, name: str):
+        self.id = trace_id
+        self.name = name
+        self.started = time.time()
+        self.spans: List[Span] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, parent: Optional[Span], name: str, kind: str, attrs: Dict[str, Any]) -> Span:
+        # Spans inherit their parent's lane (agent) unless they name their own
+        lane = attrs.get("agent") or (parent.lane if parent else "request")
+        with self._lock:
+            span = Span(next(self._ids), parent.id if parent else None, name, kind, attrs, lane)
+            self.spans.append(span)
+        return span
+
+    def summary(self) -> Dict[str, Any]:
+        """Wall-clock time split into LLM, code execution and everything else"""
+        with self._lock:
+            spans = list(self.spans)
+        root = spans[0] if spans else None
+        duration = ((root.end or time.time()) - root.start) if root else 0.0
+
+        def covered(kinds: Tuple[str, ...]) -> List[Tuple[float, float]]:
+            intervals = sorted((s.start, s.end or time.time()) for s in spans if s.kind in kinds)
+            merged: List[Tuple[float, float]] = []
+            for start, end in intervals:
+                if merged and start <= merged[-1][1]:
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+                else:
+                    merged.append((start, end))
+            return merged
+
+        def total(intervals: List[Tuple[float, float]]) -> float:
+            return sum(end - start for start, end in intervals)
+
+        llm = covered(LLM_KINDS)
+        execution = covered(EXECUTION_KINDS)
+        # Concurrent chats overlap; time both waiting on a model and running
+        # code counts once towards the busy total
+        busy = total(covered(LLM_KINDS + EXECUTION_KINDS))
+        return {
+            "duration": duration,
+            "llm_time": total(llm),
+            "execution_time": total(execution),
+            "overhead": max(duration - busy, 0.0),
+            "turns": sum(1 for s in spans if s.kind == "turn"),
+            "llm_calls": sum(1 for s in spans if s.kind == "llm"),
+            "prompt_tokens": sum(s.attrs.get("prompt_tokens", 0) for s in spans if s.kind == "llm"),
+            "completion_tokens": sum(s.attrs.get("completion_tokens", 0) for s in spans if s.kind == "llm")
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = [span.to_dict() for span in self.spans]
+        return {"trace_id": self.id, "name": self.name, "started": self.started,
+                "summary": self.summary(), "spans": spans}
+
+
+def chrome_trace(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Chrome trace event format of an exported trace, one row per agent, for chrome://tracing or Perfetto"""
+    lanes: Dict[str, int] = {}
+    events = []
+    for span in data["spans"]:
+        if span["lane"] not in lanes:
+            lanes[span["lane"]] = len(lanes) + 1
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": lanes[span["lane"]],
+                           "args": {"name": span["lane"]}})
+        events.append({
+            "name": span["name"],
+            "cat": span["kind"],
+            "ph": "X",
+            "ts": (span["start"] - data["started"]) * 1e6,
+            "dur": span["duration"] * 1e6,
+            "pid": 1,
+            "tid": lanes[span["lane"]],
+            "args": span["attrs"]
+        })
+    return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"trace_id": data["trace_id"]}}
+
+
+_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("span", default=None)
+
+
+class Tracer:
+    """Records spans of agent chats per request.
+
+    ``trace()`` opens a trace for a request; ``span()`` and ``chat()`` nest
+    spans under the current one and do nothing outside a trace, so
+    untraced code pays one context variable lookup. ``add_to_agent`` wraps
+    an agent so each of its turns, LLM calls and code executions becomes a
+    span. Finished traces with more than their root span are kept in
+    memory (the most recent ``history``) and, given a directory, written
+    there as ``<trace id>.json``.
+    """
+
+    def __init__(self, history: int = 100, directory: Optional[Path] = None):
+        self.history = history
+        self.directory = Path(directory) if directory else None
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self._traces: "OrderedDict[str, Trace]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Turns in progress per agent, for LLM calls autogen makes from
+        # worker threads, where the turn's context isn't visible
+        self._turns: Dict[int, List[Tuple[Trace, Span]]] = {}
+
+    @contextmanager
+    def trace(self, name: str, trace_id: Optional[str] = None, attrs: Optional[Dict[str, Any]] = None):
+        """Record everything under this scope as one trace"""
+        trace = Trace(trace_id or uuid.uuid4().hex, name)
+        root = trace.add(None, name, "request", attrs or {})
+        trace_token = _trace.set(trace)
+        span_token = _span.set(root)
+        try:
+            yield trace
+        finally:
+            root.end = time.time()
+            _span.reset(span_token)
+            _trace.reset(trace_token)
+            if len(trace.spans) > 1:
+                self._keep(trace)
+
+    def _keep(self, trace: Trace):
+        with self._lock:
+            self._traces[trace.id] = trace
+            self._traces.move_to_end(trace.id)
+            while len(self._traces) > self.history:
+                self._traces.popitem(last=False)
+        if self.directory:
+            try:
+                with open(self.directory / f"{trace.id}.json", "w") as f:
+                    json.dump(trace.to_dict(), f)
+            except OSError as e:
+                logging.error(f"Error writing trace {trace.id}: {str(e)}")
+
+    @contextmanager
+    def span(self, name: str, kind: str = "span", **attrs):
+        trace = _trace.get()
+        if trace is None:
+            yield None
+            return
+        span = trace.add(_span.get(), name, kind, attrs)
+        token = _span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.attrs["error"] = type(e).__name__
+            raise
+        finally:
+            span.end = time.time()
+            _span.reset(token)
+
+    def chat(self, label: str):
+        """Span for one agent chat"""
+        return self.span(label, "chat")
+
+    def _llm_parent(self, agent) -> Tuple[Optional[Trace], Optional[Span]]:
+        trace = _trace.get()
+        if trace is not None:
+            return trace, _span.get()
+        # One turn in progress means the call is unambiguously its own
+        turns = self._turns.get(id(agent))
+        if turns and len(turns) == 1:
+            return turns[0]
+        return None, None
+
+    def add_to_agent(self, agent) -> None:
+        tracer = self
+        a_generate_reply = agent.a_generate_reply
+        generate_reply = agent.generate_reply
+
+        @contextmanager
+        def turn(kwargs):
+            sender = kwargs.get("sender")
+            with tracer.span(f"{agent.name} turn", "turn", agent=agent.name,
+                             sender=getattr(sender, "name", None)) as span:
+                if span is None:
+                    yield
+                    return
+                entry = (_trace.get(), span)
+                turns = tracer._turns.setdefault(id(agent), [])
+                turns.append(entry)
+                try:
+                    yield
+                finally:
+                    turns.remove(entry)
+
+        @functools.wraps(a_generate_reply)
+        async def traced_a_generate_reply(*args, **kwargs):
+            with turn(kwargs):
+                return await a_generate_reply(*args, **kwargs)
+
+        @functools.wraps(generate_reply)
+        def traced_generate_reply(*args, **kwargs):
+            with turn(kwargs):
+                return generate_reply(*args, **kwargs)
+
+        agent.a_generate_reply = traced_a_generate_reply
+        agent.generate_reply = traced_generate_reply
+
+        execute_code_blocks = getattr(agent, "execute_code_blocks", None)
+        if execute_code_blocks is not None:
+            @functools.wraps(execute_code_blocks)
+            def traced_execute_code_blocks(code_blocks):
+                with tracer.span("code execution", "code_execution", blocks=len(code_blocks)) as span:
+                    exitcode, logs = execute_code_blocks(code_blocks)
+                    if span is not None:
+                        span.attrs["exitcode"] = exitcode
+                    return exitcode, logs
+
+            agent.execute_code_blocks = traced_execute_code_blocks
+
+        client = getattr(agent, "client", None)
+        if client is not None:
+            create = client.create
+
+            def traced_create(**params):
+                trace, parent = tracer._llm_parent(agent)
+                if trace is None:
+                    return create(**params)
+                span = trace.add(parent, f"{agent.name} llm", "llm", {"agent": agent.name})
+                try:
+                    response = create(**params)
+                    usage = getattr(response, "usage", None)
+                    if getattr(response, "cache_hit", False):
+                        span.attrs["cached"] = True
+                    elif usage is not None:
+                        span.attrs["prompt_tokens"] = getattr(usage, "prompt_tokens", 0) or 0
+                        span.attrs["completion_tokens"] = getattr(usage, "completion_tokens", 0) or 0
+                    span.attrs["model"] = getattr(response, "model", None)
+                    return response
+                except BaseException as e:
+                    span.attrs["error"] = type(e).__name__
+                    raise
+                finally:
+                    span.end = time.time()
+
+            client.create = traced_create
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        """A recent trace, or one exported to the directory, as JSON data"""
+        with self._lock:
+            trace = self._traces.get(trace_id)
+        if trace is not None:
+            return trace.to_dict()
+        if self.directory and TRACE_ID.fullmatch(trace_id):
+            try:
+                with open(self.directory / f"{trace_id}.json") as f:
+                    return json.load(f)
+            except FileNotFoundError:
+                pass
+        return None
+
+    def recent(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            traces = list(self._traces.values())
+        return [{"trace_id": t.id, "name": t.name, "started": t.started, **t.summary()} for t in reversed(traces)]
+
+
+class TraceRequests:
+    """ASGI middleware opening a trace per HTTP request.
+
+    The trace id is always generated here, so clients can't merge their
+    requests into one trace, and is returned in the response's
+    ``X-Request-ID`` header. A well-formed ``X-Request-ID`` sent by the
+    client is kept as the root span's ``client_request_id`` attribute.
+    """
+
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        client_id = headers.get(b"x-request-id", b"").decode("latin-1")
+        attrs = {"client_request_id": client_id} if TRACE_ID.fullmatch(client_id) else {}
+        trace_id = uuid.uuid4().hex
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) +
+                           [(b"x-request-id", trace_id.encode("latin-1"))]}
+            await send(message)
+
+        with self.tracer.trace(f"{scope['method']} {scope['path']}", trace_id, attrs):
+            await self.app(scope, receive, send_wrapper)
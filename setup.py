@@ -15,6 +15,7 @@ setup(
         "requests",
         "pyautogen",
         "httpx",
+        "numpy",
         "matplotlib",
         "yfinance",
         "pathlib",
@@ -36,12 +36,12 @@ class CodeExecutor {
             }
 
             this.executionId = data.execution_id;
-            await this.pollExecutionStatus();
+            await this.streamExecutionStatus();
 
             return {
-                success: !data.error,
-                result: data.result,
-                error: data.error
+                success: this.status === 'success',
+                result: this.output,
+                error: this.error
             };
 
         } catch (error) {
@@ -52,30 +52,26 @@ class CodeExecutor {
         }
     }
 
-    async pollExecutionStatus() {
+    async streamExecutionStatus() {
         const statusElement = document.getElementById('execution-status');
         statusElement.classList.add('loading');
+        this.output = '';
 
-        while (this.status === 'running') {
-            const response = await fetch(`/execution_status/${this.executionId}`);
-            const data = await response.json();
-
-            if (data.status === 'completed') {
-                this.status = data.error ? 'error' : 'success';
-                this.output = data.result;
-                this.error = data.error;
-                break;
-            } else if (data.status === 'failed') {
-                this.status = 'error';
-                this.error = data.error;
-                break;
-            }
+        try {
+            const data = await streamExecution(this.executionId, (stream, chunk) => {
+                if (stream === 'stdout' || stream === 'notice') {
+                    this.output += chunk;
+                    this.updateUI();
+                }
+            });
 
-            await new Promise(resolve => setTimeout(resolve, 1000));
+            this.status = data.status === 'completed' ? 'success' : 'error';
+            this.output = data.result || this.output;
+            this.error = data.error;
+        } finally {
+            statusElement.classList.remove('loading');
+            this.updateUI();
         }
-
-        statusElement.classList.remove('loading');
-        this.updateUI();
     }
 
     updateUI() {
@@ -245,6 +241,31 @@ const assistantAgent = new AutoGenAgent('assistant', 'assistant');
 const userAgent = new AutoGenAgent('user', 'user');
 const workflowManager = new WorkflowManager();
 
+// Follow an execution over server-sent events, calling onChunk(stream, text)
+// for every output chunk and resolving with the final status. When output
+// was dropped before this listener caught up, onChunk gets a 'notice' chunk
+function streamExecution(executionId, onChunk) {
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(`/execution_stream/${executionId}`);
+        const forward = stream => event => onChunk(stream, JSON.parse(event.data).data);
+
+        source.addEventListener('stdout', forward('stdout'));
+        source.addEventListener('stderr', forward('stderr'));
+        source.addEventListener('truncated', event => {
+            const dropped = JSON.parse(event.data).dropped_chunks;
+            onChunk('notice', `\n[... ${dropped} earlier output chunks not shown ...]\n`);
+        });
+        source.addEventListener('status', event => {
+            source.close();
+            resolve(JSON.parse(event.data));
+        });
+        source.onerror = () => {
+            source.close();
+            reject(new Error('Lost connection to execution stream'));
+        };
+    });
+}
+
 async function runCode(code, language) {
     try {
         const result = await codeExecutor.execute(code, language);
@@ -421,7 +442,16 @@ async function runPythonTool() {
             throw new Error(data.detail || 'Failed to execute Python code');
         }
         
-        outputElement.innerHTML = `<pre class="success">${formatOutput(data.result || '')}</pre>`;
+        let output = '';
+        const status = await streamExecution(data.execution_id, (stream, chunk) => {
+            output += chunk;
+            outputElement.innerHTML = `<pre>${formatOutput(output)}</pre>`;
+        });
+        
+        if (status.status !== 'completed') {
+            throw new Error(status.error || 'Execution failed');
+        }
+        outputElement.innerHTML = `<pre class="success">${formatOutput(status.result || '')}</pre>`;
     } catch (error) {
         outputElement.innerHTML = `<pre class="error">Error: ${error.message}</pre>`;
     } finally {
@@ -458,7 +488,16 @@ async function runJavaTool() {
             throw new Error(data.detail || 'Failed to execute Java code');
         }
         
-        outputElement.innerHTML = `<pre class="success">${formatOutput(data.result || '')}</pre>`;
+        let output = '';
+        const status = await streamExecution(data.execution_id, (stream, chunk) => {
+            output += chunk;
+            outputElement.innerHTML = `<pre>${formatOutput(output)}</pre>`;
+        });
+        
+        if (status.status !== 'completed') {
+            throw new Error(status.error || 'Execution failed');
+        }
+        outputElement.innerHTML = `<pre class="success">${formatOutput(status.result || '')}</pre>`;
     } catch (error) {
         outputElement.innerHTML = `<pre class="error">Error: ${error.message}</pre>`;
     } finally {
@@ -2,16 +2,29 @@ async function generatePythonCode() {
     const promptInput = document.getElementById('prompt-input');
     const codeSection = document.querySelector('.code-section');
     const outputSection = document.querySelector('.output-section');
-    const testSection = document.querySelector('.test-section');
+    const outputElement = document.getElementById('code-output');
     const generatedCode = document.getElementById('generated-code');
     const codeEditor = document.getElementById('code-editor');
     const button = document.querySelector('.prompt-input button');
     
+    // Text of the turn being streamed; code is shown as soon as a block opens
+    let turnText = '';
+    let code = '';
+    const showCode = (text) => {
+        if (text === null || text === code) return;
+        code = text;
+        generatedCode.textContent = code;
+        codeEditor.value = code;
+        codeSection.style.display = 'block';
+    };
+    
     try {
         button.disabled = true;
         button.classList.add('loading');
+        outputSection.style.display = 'block';
+        outputElement.innerHTML = '';
         
-        const response = await fetch('/generate_python', {
+        const response = await fetch('/generate_python/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -21,25 +34,32 @@ async function generatePythonCode() {
             })
         });
         
-        const data = await response.json();
-        
         if (!response.ok) {
+            const data = await response.json();
             throw new Error(data.detail || 'Failed to generate Python code');
         }
         
-        // Show generated code
-        generatedCode.textContent = data.code;
-        codeEditor.value = data.code;
-        codeSection.style.display = 'block';
-        
-        // Show test cases if available
-        if (data.tests) {
-            testSection.style.display = 'block';
-            document.getElementById('test-results').innerHTML = formatTests(data.tests);
-        }
+        await readEvents(response, (event, data) => {
+            if (event === 'turn') {
+                turnText = '';
+                appendLog(outputElement, `${data.agent} is replying...`);
+            } else if (event === 'token') {
+                turnText += data.text;
+                showCode(latestCodeBlock(turnText, 'python'));
+            } else if (event === 'message') {
+                turnText = '';
+                showCode(latestCodeBlock(data.content, 'python', true));
+                appendLog(outputElement, `${data.sender} → ${data.recipient}: ${data.content}`);
+            } else if (event === 'status') {
+                if (data.status !== 'completed') {
+                    throw new Error(data.error || 'Failed to generate Python code');
+                }
+                if (data.code) showCode(data.code);
+            }
+        });
         
         // Highlight syntax
-        if (window.hljs) {
+        if (window.hljs && code) {
             hljs.highlightElement(generatedCode);
         }
     } catch (error) {
@@ -50,6 +70,50 @@ async function generatePythonCode() {
     }
 }
 
+// Calls onEvent(event, data) for each server-sent event of a fetch response
+async function readEvents(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let end;
+        while ((end = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, end);
+            buffer = buffer.slice(end + 2);
+            let event = 'message';
+            let data = '';
+            for (const line of frame.split('\n')) {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            }
+            onEvent(event, JSON.parse(data));
+        }
+    }
+}
+
+// Last fenced code block in language; while streaming, an unclosed block counts
+function latestCodeBlock(text, language, closedOnly = false) {
+    const fence = new RegExp('```[ \\t]*' + language + '[ \\t]*\\r?\\n', 'gi');
+    let start = -1;
+    let match;
+    while ((match = fence.exec(text)) !== null) {
+        start = match.index + match[0].length;
+    }
+    if (start === -1) return null;
+    const close = text.indexOf('```', start);
+    if (close === -1) return closedOnly ? null : text.slice(start);
+    return text.slice(start, close).trimEnd();
+}
+
+function appendLog(outputElement, line) {
+    const entry = document.createElement('pre');
+    entry.textContent = line;
+    outputElement.appendChild(entry);
+}
+
 async function runCode() {
     const codeEditor = document.getElementById('code-editor');
     const codeDisplay = document.querySelector('.code-display');
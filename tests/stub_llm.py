@@ -0,0 +1,4 @@
+"""Stub LLM server for tests; see benchmarks/stub_llm.py"""
+from benchmarks.stub_llm import StubLLMServer
+
+__all__ = ['StubLLMServer']
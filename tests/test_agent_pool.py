@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from agents import AgentPool
+from agents.agent_pool import forget_peer
+
+class FakeAgent:
+    def __init__(self):
+        self.history = []
+        self.resets = 0
+
+    def reset(self):
+        self.history.clear()
+        self.resets += 1
+
+def make_pair():
+    return FakeAgent(), FakeAgent()
+
+@pytest.mark.asyncio
+async def test_pairs_are_reset_when_returned():
+    pool = AgentPool(make_pair, size=1)
+    async with pool.checkout() as (assistant, user_proxy):
+        assistant.history.append("hello")
+    async with pool.checkout() as (again, _):
+        assert again is assistant
+        assert again.history == []
+        assert again.resets == 1
+
+@pytest.mark.asyncio
+async def test_concurrent_checkouts_get_distinct_pairs_and_queue():
+    pool = AgentPool(make_pair, size=2)
+    in_use, peak, seen = 0, 0, set()
+
+    async def chat():
+        nonlocal in_use, peak
+        async with pool.checkout() as pair:
+            in_use += 1
+            peak = max(peak, in_use)
+            seen.add(id(pair))
+            await asyncio.sleep(0.01)
+            in_use -= 1
+
+    await asyncio.gather(*(chat() for _ in range(5)))
+    assert peak == 2
+    assert len(seen) == 2
+    assert pool.stats()["checkouts"] == 5
+    assert pool.stats()["waited"] >= 3
+
+def test_forget_peer_drops_the_peers_entries():
+    agent, peer, other = FakeAgent(), FakeAgent(), FakeAgent()
+    agent._oai_messages = {peer: [{"content": "hi"}], other: []}
+    agent._consecutive_auto_reply_counter = {peer: 2, other: 0}
+    agent.reply_at_receive = {peer: True}
+    forget_peer(agent, peer)
+    forget_peer(agent, peer)
+    assert list(agent._oai_messages) == [other]
+    assert list(agent._consecutive_auto_reply_counter) == [other]
+    assert agent.reply_at_receive == {}
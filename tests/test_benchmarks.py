@@ -0,0 +1,68 @@
+import json
+import time
+import httpx
+import pytest
+from benchmarks import StubLLMServer, run_load, percentile, summarize, format_table
+
+def complete(server, stream=False):
+    return httpx.post(f"{server.base_url}/chat/completions", json={
+        "model": "stub", "stream": stream,
+        "messages": [{"role": "user", "content": "hello"}]
+    })
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 50) is None
+
+def test_summarize_counts_outcomes():
+    samples = [{"latency": 0.1, "outcome": "ok", "error": None}] * 8 + [
+        {"latency": 0.01, "outcome": "rejected", "error": None},
+        {"latency": 0.5, "outcome": "error", "error": "HTTPStatusError: 500"}
+    ]
+    summary = summarize(samples, elapsed=2.0)
+    assert summary["ok"] == 8 and summary["rejected"] == 1 and summary["error"] == 1
+    assert summary["throughput"] == 4.0
+    assert summary["p99"] == 0.1
+    assert summary["errors"] == ["HTTPStatusError: 500"]
+
+def test_stub_cycles_scripted_replies():
+    with StubLLMServer(reply=["first", "second"]) as server:
+        replies = [complete(server).json()["choices"][0]["message"]["content"] for _ in range(3)]
+    assert replies == ["first", "second", "first"]
+    assert server.requests == 3
+
+def test_stub_token_rate_slows_long_replies():
+    with StubLLMServer(reply="x" * 80, token_rate=100) as server:
+        started = time.perf_counter()
+        response = complete(server).json()
+    assert time.perf_counter() - started >= 0.2
+    assert response["usage"]["completion_tokens"] == 20
+
+def test_stub_streams_chunks():
+    with StubLLMServer(reply="streamed reply text") as server:
+        body = complete(server, stream=True).text
+    chunks = [json.loads(line[6:]) for line in body.splitlines() if line.startswith("data: {")]
+    assert "".join(c["choices"][0]["delta"].get("content", "") for c in chunks) == "streamed reply text"
+    assert body.rstrip().endswith("data: [DONE]")
+
+def test_stub_error_status():
+    with StubLLMServer() as server:
+        server.status = 503
+        assert complete(server).status_code == 503
+
+@pytest.mark.asyncio
+async def test_run_load_keeps_concurrency_in_flight():
+    with StubLLMServer(latency=0.1) as server:
+        async def scenario(client, index):
+            response = await client.post("/chat/completions", json={"messages": []})
+            response.raise_for_status()
+
+        async with httpx.AsyncClient(base_url=server.base_url) as client:
+            run = await run_load(client, scenario, concurrency=4, requests=8)
+    assert len(run["samples"]) == 8
+    assert server.max_in_flight == 4
+    assert run["elapsed"] < 0.6
+    assert "p95" in format_table([{"scenario": "stub", "concurrency": 4, **summarize(run["samples"], run["elapsed"])}])
@@ -0,0 +1,79 @@
+import asyncio
+import pytest
+from analysis.chunking import iter_chunks
+from analysis.map_reduce import map_reduce, map_chunks, group_partials
+
+
+def write_csv(path, rows):
+    path.write_text("id,value\n" + "".join(f"{i},{i * 10}\n" for i in range(rows)))
+    return path
+
+
+def test_chunks_split_on_rows_and_repeat_header(tmp_path):
+    data = write_csv(tmp_path / "data.csv", 1000)
+    chunks = list(iter_chunks(data, max_tokens=100))
+
+    assert len(chunks) > 1
+    body_rows = []
+    for chunk in chunks:
+        lines = chunk["text"].splitlines()
+        assert lines[0] == "id,value"
+        assert len(chunk["text"]) <= 400
+        assert len(lines) - 1 == chunk["last_row"] - chunk["first_row"] + 1
+        body_rows.extend(lines[1:])
+    assert body_rows == [f"{i},{i * 10}" for i in range(1000)]
+    assert chunks[-1]["last_row"] == 1000
+
+
+def test_plain_text_has_no_header_and_long_lines_stay_whole(tmp_path):
+    path = tmp_path / "log.txt"
+    path.write_text("short\n" + "x" * 1000 + "\nend")
+    chunks = list(iter_chunks(path, max_tokens=10))
+
+    assert "".join(chunk["text"] for chunk in chunks) == path.read_text()
+    assert any(chunk["text"] == "x" * 1000 + "\n" for chunk in chunks)
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.csv"
+    path.write_text("")
+    assert list(iter_chunks(path)) == []
+
+
+def test_group_partials_always_shrinks():
+    assert group_partials(["a" * 40] * 4, max_tokens=25) == [["a" * 40] * 2] * 2
+    assert group_partials(["a", "b", "c"], max_tokens=100) == [["a", "b", "c"]]
+
+
+@pytest.mark.asyncio
+async def test_map_reduce_combines_every_chunk(tmp_path):
+    data = write_csv(tmp_path / "data.csv", 500)
+    prompts = []
+
+    async def ask(message):
+        prompts.append(message)
+        if "Partial analyses" in message:
+            return str(sum(int(line) for line in message.splitlines() if line.isdigit()))
+        rows = [line for line in message.split("Data:\n", 1)[1].splitlines()[1:] if line]
+        return str(len(rows))
+
+    answer = await map_reduce(iter_chunks(data, max_tokens=100), "count rows", ask, max_tokens=20)
+    assert answer == "500"
+    assert any("Partial analyses" in prompt for prompt in prompts)
+
+
+@pytest.mark.asyncio
+async def test_map_limits_concurrency():
+    running = peak = 0
+
+    async def ask(message):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "ok"
+
+    chunks = ({"index": i, "first_row": i, "last_row": i, "text": "row"} for i in range(10))
+    assert await map_chunks(chunks, "p", ask, concurrency=3) == ["ok"] * 10
+    assert peak == 3
@@ -0,0 +1,82 @@
+import os
+import pytest
+import analysis.code_index
+from analysis.code_index import CodeIndex, parse_source
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "project"
+    (root / "pkg").mkdir(parents=True)
+    (root / "pkg" / "store.py").write_text(
+        '"""Key-value storage"""\n'
+        'import json\n\n'
+        'class Store:\n'
+        '    """Keeps records"""\n'
+        '    def get(self, key: str):\n'
+        '        return None\n\n'
+        'async def load(path, limit=10):\n'
+        '    pass\n'
+    )
+    (root / "pkg" / "api.py").write_text("from pkg.store import Store\n\ndef handler(request):\n    pass\n")
+    (root / "Main.java").write_text("public class Main {\n    public static void main(String[] args) {\n    }\n}\n")
+    (root / "__pycache__").mkdir()
+    (root / "__pycache__" / "junk.py").write_text("x = 1\n")
+    return root
+
+
+def test_python_symbols():
+    parsed = parse_source('"""Doc"""\nimport os\nclass A(B):\n    def m(self, x=1):\n        """Do m"""\n', "python")
+    assert [(s["kind"], s["name"], s["line"]) for s in parsed["symbols"]] == [("class", "A", 3), ("method", "A.m", 4)]
+    assert parsed["symbols"][1]["signature"] == "m(self, x=1)"
+    assert parsed["symbols"][1]["doc"] == "Do m"
+    assert parsed["summary"] == "Doc; classes A; imports os"
+
+
+def test_syntax_errors_are_recorded():
+    assert "syntax error" in parse_source("def broken(:\n", "python")["summary"]
+
+
+def test_java_symbols():
+    parsed = parse_source("public class Main {\n    public static void main(String[] args) {\n    }\n}\n", "java")
+    assert [(s["kind"], s["name"]) for s in parsed["symbols"]] == [("class", "Main"), ("method", "main")]
+
+
+def test_update_is_incremental(tree, tmp_path, monkeypatch):
+    index = CodeIndex(tree, tmp_path / "index")
+    assert index.update() == {"files": 3, "parsed": 3, "unchanged": 0, "removed": 0}
+    assert set(index.files) == {"pkg/store.py", "pkg/api.py", "Main.java"}
+
+    # A fresh instance loads the saved index and reads nothing
+    index = CodeIndex(tree, tmp_path / "index")
+    monkeypatch.setattr(analysis.code_index, "parse_source", lambda *args: pytest.fail("re-parsed"))
+    assert index.update()["unchanged"] == 3
+
+    # Touched but identical content is hashed, not parsed
+    os.utime(tree / "Main.java", ns=(0, 10 ** 9))
+    assert index.update()["unchanged"] == 3
+    monkeypatch.undo()
+
+    (tree / "pkg" / "api.py").write_text("def handler(request, extra):\n    pass\n")
+    (tree / "Main.java").unlink()
+    assert index.update() == {"files": 2, "parsed": 1, "unchanged": 1, "removed": 1}
+    assert index.files["pkg/api.py"]["symbols"][0]["signature"] == "handler(request, extra)"
+
+
+def test_render_prefers_relevant_files_within_budget(tree, tmp_path):
+    index = CodeIndex(tree, tmp_path / "index")
+    index.update()
+
+    text = index.render(query="java main entry point")
+    assert text.index("Main.java") < text.index("pkg/store.py")
+    assert "L4 class Store  # Keeps records" in text
+
+    small = index.render(max_tokens=40)
+    assert len(small) <= 40 * 4 + 60
+    assert "omitted" in small
+
+
+def test_single_file_root(tree, tmp_path):
+    index = CodeIndex(tree / "pkg" / "store.py", tmp_path / "index")
+    assert index.update()["files"] == 1
+    assert "store.py" in index.files
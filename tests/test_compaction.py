@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+from agents.compaction import CollapseLongMessages, TokenBudget, HistoryCompactor
+
+
+def message(content, role="user"):
+    return {"role": role, "content": content}
+
+
+def test_long_messages_keep_head_and_tail():
+    output = "start\n" + "x" * 10000 + "\nTraceback: boom"
+    messages = [message("task " * 2000), message(output, "assistant")]
+    collapsed = CollapseLongMessages(max_tokens=100).apply_transform(messages)
+
+    assert collapsed[0] is messages[0]
+    content = collapsed[1]["content"]
+    assert content.startswith("start\n") and content.endswith("Traceback: boom")
+    assert "characters omitted" in content
+    assert len(content) < 500
+    assert messages[1]["content"] == output
+
+
+def test_budget_keeps_task_and_recent_turns():
+    messages = [message("task")] + [message(f"turn {i} " + "y" * 400) for i in range(10)]
+    kept = TokenBudget(max_tokens=350).apply_transform(messages)
+
+    assert kept[0]["content"].startswith("task")
+    assert "7 earlier messages omitted" in kept[0]["content"]
+    assert [m["content"][:7] for m in kept[1:]] == ["turn 7 ", "turn 8 ", "turn 9 "]
+    assert messages[0]["content"] == "task"
+
+
+def test_budget_never_leads_with_a_tool_result():
+    messages = [message("task"), message("a" * 400, "assistant"), message("b" * 400, "tool"), message("c" * 40)]
+    kept = TokenBudget(max_tokens=120).apply_transform(messages)
+    assert [m["role"] for m in kept] == ["user", "user"]
+
+
+def test_short_histories_pass_through():
+    messages = [message("task"), message("reply", "assistant")]
+    assert HistoryCompactor().process(messages) == messages
+
+
+@pytest.mark.asyncio
+async def test_savings_reported_per_chat():
+    compactor = HistoryCompactor(max_tokens=500, max_message_tokens=100)
+    history = [message("task")] + [message("z" * 2000, "assistant") for _ in range(5)]
+
+    async def chat(label, turns):
+        with compactor.chat(label) as report:
+            for _ in range(turns):
+                compactor.process(history)
+                await asyncio.sleep(0)
+        return report
+
+    first, second = await asyncio.gather(chat("a", 2), chat("b", 1))
+    assert first["turns"] == 2 and second["turns"] == 1
+    assert first["tokens_saved"] == 2 * second["tokens_saved"] > 0
+
+    stats = compactor.stats()
+    assert stats["chats"] == 2
+    assert stats["tokens_saved"] == first["tokens_saved"] + second["tokens_saved"]
+    assert sorted(report["chat"] for report in stats["recent_chats"]) == ["a", "b"]
@@ -0,0 +1,36 @@
+import time
+from llm import CompletionCache
+
+def test_roundtrip_and_hit_rate(tmp_path):
+    cache = CompletionCache(tmp_path / "cache.sqlite")
+    assert cache.get("key") is None
+    cache.set("key", {"choices": ["hello"]})
+    assert cache.get("key") == {"choices": ["hello"]}
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+def test_entries_survive_reopen(tmp_path):
+    CompletionCache(tmp_path / "cache.sqlite").set("key", "value")
+    reopened = CompletionCache(tmp_path / "cache.sqlite")
+    assert reopened.get("key") == "value"
+    assert reopened.stats()["bytes"] > 0
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = CompletionCache(tmp_path / "cache.sqlite", max_bytes=300)
+    cache.set("a", "x" * 100)
+    cache.set("b", "x" * 100)
+    cache.get("a")
+    cache.set("c", "x" * 100)
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] <= 300
+
+def test_expired_entries_are_misses(tmp_path, monkeypatch):
+    cache = CompletionCache(tmp_path / "cache.sqlite", ttl=60)
+    cache.set("key", "value")
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get("key", "default") == "default"
+    assert cache.stats()["expirations"] == 1
@@ -0,0 +1,107 @@
+import asyncio
+import time
+import pytest
+from execution import ExecutionStore
+
+def finished(result=None):
+    return {"status": "completed", "result": result, "error": None}
+
+def test_read_through_counts_hits_and_misses():
+    store = ExecutionStore()
+    store["a"] = finished("out")
+    assert store.get("a")["result"] == "out"
+    assert store.get("missing") is None
+    assert store.stats()["hits"] == 1
+    assert store.stats()["misses"] == 1
+
+def test_patch_merges_fields():
+    store = ExecutionStore()
+    store["a"] = {"status": "running", "result": None, "error": None}
+    assert store.patch("a", {"status": "completed", "result": "done"})
+    assert store["a"] == {"status": "completed", "result": "done", "error": None}
+    assert not store.patch("missing", {"status": "completed"})
+
+def test_lru_eviction_skips_running_records():
+    store = ExecutionStore(max_entries=2)
+    store["running"] = {"status": "running"}
+    store["old"] = finished()
+    store["recent"] = finished()
+    assert "running" in store
+    assert "old" not in store
+    assert "recent" in store
+    assert store.stats()["evictions"] == 1
+
+def test_byte_budget_evicts_least_recently_used():
+    store = ExecutionStore(max_bytes=100)
+    store["a"] = finished("x" * 40)
+    store["b"] = finished("x" * 40)
+    store.get("a")
+    store["c"] = finished("x" * 40)
+    assert "a" in store and "c" in store
+    assert "b" not in store
+    assert store.stats()["bytes"] <= 100
+
+def test_finished_records_expire(monkeypatch):
+    store = ExecutionStore(ttl=10)
+    store["done"] = finished()
+    store["running"] = {"status": "running"}
+    store["created"] = {"status": "created"}
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    assert store.get("done") is None
+    assert store.get("running") is not None
+    assert store.get("created") is not None
+    assert store.stats()["expirations"] == 1
+
+def test_large_fields_spill_to_disk(tmp_path):
+    store = ExecutionStore(spill_bytes=10, spill_dir=tmp_path)
+    store["a"] = finished("x" * 1000)
+    assert store.stats()["bytes"] < 1000
+    assert store.stats()["spills"] == 1
+    assert store["a"]["result"] == "x" * 1000
+    del store["a"]
+    assert list(tmp_path.iterdir()) == []
+
+@pytest.mark.asyncio
+async def test_spill_is_written_off_the_event_loop(tmp_path, monkeypatch):
+    store = ExecutionStore(spill_bytes=10, spill_dir=tmp_path)
+    threads = []
+    original = asyncio.to_thread
+
+    async def to_thread(func, *args):
+        threads.append(func.__name__)
+        return await original(func, *args)
+
+    monkeypatch.setattr(asyncio, "to_thread", to_thread)
+    store["a"] = finished("x" * 1000)
+    # Readable straight away, from memory until the file is written
+    assert store["a"]["result"] == "x" * 1000
+    await asyncio.gather(*store._spilling)
+    assert threads == ["_write_spill"]
+    assert store.stats()["bytes"] < 1000
+    assert store["a"]["result"] == "x" * 1000
+
+    store["b"] = finished("y" * 1000)
+    del store["b"]
+    await asyncio.gather(*store._spilling)
+    # Only a's file is left
+    assert len(list(tmp_path.iterdir())) == 1
+    assert store.stats()["spills"] == 1
+
+@pytest.mark.asyncio
+async def test_aget_reads_spilled_fields_off_the_event_loop(tmp_path, monkeypatch):
+    store = ExecutionStore(spill_bytes=10, spill_dir=tmp_path)
+    store["a"] = finished("x" * 1000)
+    await asyncio.gather(*store._spilling)
+    threads = []
+    original = asyncio.to_thread
+
+    async def to_thread(func, *args):
+        threads.append(func.__name__)
+        return await original(func, *args)
+
+    monkeypatch.setattr(asyncio, "to_thread", to_thread)
+    assert (await store.aget("a"))["result"] == "x" * 1000
+    assert threads == ["_read_spilled"]
+    assert await store.aget("missing") is None
+    assert store.stats()["misses"] == 1
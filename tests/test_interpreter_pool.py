@@ -0,0 +1,206 @@
+import os
+import time
+import pytest
+import pytest_asyncio
+from execution import InterpreterPool, ResourceLimits
+
+@pytest_asyncio.fixture
+async def pool():
+    pool = InterpreterPool(size=1, preload=["json"], max_runs=3)
+    yield pool
+    await pool.close()
+
+@pytest.mark.asyncio
+async def test_runs_snippet(pool):
+    result = await pool.run("print('hello world')")
+    usage = result.pop("usage")
+    assert result == {"status": "completed", "result": "hello world\n"}
+    assert usage["wall_time"] > 0
+    assert usage["cpu_time"] >= 0
+    # The worker's peak says nothing about one run, so it isn't reported
+    assert "max_rss" not in usage
+
+@pytest.mark.asyncio
+async def test_error_reports_traceback(pool):
+    result = await pool.run("raise ValueError('boom')")
+    assert result["status"] == "error"
+    assert "ValueError: boom" in result["error"]
+    assert 'File "<string>", line 1' in result["error"]
+
+@pytest.mark.asyncio
+async def test_namespace_reset_between_runs(pool):
+    await pool.run("x = 1")
+    result = await pool.run("print(x)")
+    assert result["status"] == "error"
+    assert "NameError" in result["error"]
+
+@pytest.mark.asyncio
+async def test_env_is_set_for_one_run(pool):
+    code = "import os\nprint(os.environ.get('WORKFLOW_INPUTS'))"
+    result = await pool.run(code, env={"WORKFLOW_INPUTS": "{}"})
+    assert result["result"] == "{}\n"
+    result = await pool.run(code)
+    assert result["result"] == "None\n"
+
+@pytest.mark.asyncio
+async def test_fd_level_output_is_captured(pool):
+    result = await pool.run("import os\nos.write(1, b'raw\\n')\nprint('py')")
+    assert result["status"] == "completed"
+    assert "raw\n" in result["result"]
+    assert "py\n" in result["result"]
+
+@pytest.mark.asyncio
+async def test_worker_recycled_after_max_runs(pool):
+    pids = set()
+    for _ in range(4):
+        result = await pool.run("import os\nprint(os.getpid())")
+        pids.add(result["result"])
+    assert len(pids) == 2
+    assert pool.stats()["recycled"] == 1
+
+@pytest.mark.asyncio
+async def test_crashed_worker_is_replaced(pool):
+    result = await pool.run("import os\nos._exit(3)")
+    assert result["status"] == "error"
+    assert pool.stats()["crashed"] == 1
+    result = await pool.run("print('still here')")
+    assert result["result"] == "still here\n"
+
+@pytest.mark.asyncio
+async def test_sys_exit_zero_is_success(pool):
+    result = await pool.run("import sys\nprint('bye')\nsys.exit(0)")
+    assert result["status"] == "completed"
+    assert result["result"] == "bye\n"
+
+@pytest.mark.asyncio
+async def test_output_forwarded_while_running(pool):
+    chunks = []
+    result = await pool.run(
+        "import sys\nprint('one')\nprint('two', file=sys.stderr)\nprint('three')",
+        on_output=lambda stream, data: chunks.append((stream, data))
+    )
+    assert chunks == [("stdout", "one\n"), ("stderr", "two\n"), ("stdout", "three\n")]
+    assert result["result"] == "one\nthree\n"
+
+@pytest.mark.asyncio
+async def test_timeout_kills_worker(pool):
+    result = await pool.run("import time\ntime.sleep(30)", timeout=0.5)
+    assert result["status"] == "timeout"
+    assert result["error"] == "Execution timed out after 0.5 seconds"
+    assert result["usage"]["wall_time"] >= 0.5
+    assert pool.stats()["timeouts"] == 1
+    result = await pool.run("print('next')")
+    assert result["result"] == "next\n"
+
+@pytest.mark.asyncio
+async def test_timeout_kills_process_group(pool, tmp_path):
+    pid_file = tmp_path / "child.pid"
+    code = (
+        "import subprocess, sys, time\n"
+        "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])\n"
+        f"open({str(pid_file)!r}, 'w').write(str(child.pid))\n"
+        "time.sleep(60)"
+    )
+    result = await pool.run(code, timeout=1)
+    assert result["status"] == "timeout"
+    child = int(pid_file.read_text())
+    for _ in range(50):
+        try:
+            os.kill(child, 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.05)
+    else:
+        pytest.fail("child of timed out snippet is still running")
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("limits", [None, ResourceLimits(memory_bytes=1024 ** 3)])
+async def test_background_children_do_not_outlive_the_run(pool, limits):
+    code = (
+        "import subprocess, sys\n"
+        "loop = 'import time\\nwhile True:\\n    print(\"LEAK_FROM_PREVIOUS_RUN\", flush=True)\\n    time.sleep(0.02)'\n"
+        "subprocess.Popen([sys.executable, '-c', loop])\n"
+        "subprocess.Popen([sys.executable, '-c', loop], stdout=sys.__stderr__)\n"
+        "print('started')"
+    )
+    result = await pool.run(code, limits=limits)
+    assert result["status"] == "completed"
+    time.sleep(0.3)
+    result = await pool.run("import time\ntime.sleep(0.3)\nprint('clean')", limits=limits)
+    assert result["result"] == "clean\n"
+    assert "LEAK" not in result.get("error", "")
+
+@pytest.mark.asyncio
+async def test_cpu_limit_kills_busy_loop(pool):
+    result = await pool.run("while True: pass", timeout=10, limits=ResourceLimits(cpu_seconds=1))
+    assert result["status"] == "timeout"
+    assert "CPU time limit of 1 seconds exceeded" in result["error"]
+    assert pool.stats()["timeouts"] == 1
+
+@pytest.mark.asyncio
+async def test_memory_limit_reports_oom(pool):
+    result = await pool.run("data = bytearray(512 * 1024 ** 2)", limits=ResourceLimits(memory_bytes=256 * 1024 ** 2))
+    assert result["status"] == "oom"
+    assert "MemoryError" in result["error"]
+    # Limits only hold for the run they were set for
+    result = await pool.run("data = bytearray(512 * 1024 ** 2)\nprint(len(data))")
+    assert result["status"] == "completed"
+
+@pytest.mark.asyncio
+async def test_snippet_cannot_raise_its_limits(pool):
+    code = (
+        "import resource\n"
+        "try:\n"
+        "    resource.setrlimit(resource.RLIMIT_AS, (resource.RLIM_INFINITY, resource.RLIM_INFINITY))\n"
+        "except ValueError:\n"
+        "    pass\n"
+        "data = bytearray(600 * 1024 ** 2)"
+    )
+    result = await pool.run(code, limits=ResourceLimits(memory_bytes=300 * 1024 ** 2))
+    assert result["status"] == "oom"
+
+@pytest.mark.asyncio
+async def test_limited_runs_report_their_own_peak_memory(pool):
+    limits = ResourceLimits(memory_bytes=1024 ** 3)
+    big = await pool.run("data = bytearray(200 * 1024 ** 2)", limits=limits)
+    small = await pool.run("print('hi')", limits=limits)
+    assert big["status"] == small["status"] == "completed"
+    assert big["usage"]["max_rss"] >= 200 * 1024 ** 2
+    assert small["usage"]["max_rss"] < 100 * 1024 ** 2
+
+@pytest.mark.asyncio
+async def test_open_files_limit():
+    pool = InterpreterPool(size=1, limits=ResourceLimits(open_files=32))
+    try:
+        result = await pool.run("files = [open('/dev/null') for _ in range(64)]")
+        assert result["status"] == "error"
+        assert "Too many open files" in result["error"]
+    finally:
+        await pool.close()
+
+def test_request_options_only_tighten_limits():
+    limits = ResourceLimits(cpu_seconds=10, memory_bytes=512 * 1024 ** 2)
+    tightened = limits.tightened({"cpu_seconds": 2, "memory_mb": 4096, "processes": 8})
+    assert tightened.to_dict() == {
+        "cpu_seconds": 2, "memory_bytes": 512 * 1024 ** 2, "open_files": None, "processes": 8
+    }
+    with pytest.raises(ValueError):
+        limits.tightened({"cpu_seconds": 0})
+
+def test_process_helpers_without_posix(monkeypatch):
+    import signal
+    from types import SimpleNamespace
+    from execution import classify_exit, kill_process_group, spawn_options
+    monkeypatch.setattr(os, "name", "nt")
+    monkeypatch.delattr(os, "killpg")
+    monkeypatch.delattr(signal, "SIGXCPU")
+    assert spawn_options(lambda: None) == {}
+    assert classify_exit(-24) is None
+    killed = []
+    kill_process_group(SimpleNamespace(pid=1, kill=lambda: killed.append(True)))
+    assert killed == [True]
+
+def test_kill_strays_without_process_groups(monkeypatch):
+    from execution import interpreter_worker
+    monkeypatch.delattr(os, "getpgrp")
+    interpreter_worker.kill_strays()
@@ -0,0 +1,87 @@
+import asyncio
+import sys
+import time
+import pytest
+from execution.java_build import JavaBuilder, source_filename
+
+# Stands in for javac/java: "compiles" by copying sources into the class
+# directory, and "tests" by listing the classes it was given
+FAKE_TOOL = """
+import os, sys, time
+args = sys.argv[1:]
+log = os.environ["FAKE_JAVA_LOG"]
+with open(log, "a") as f:
+    f.write(args[0] + "\\n")
+time.sleep(0.2)
+if args[0] == "-d":
+    classes = args[1]
+    for source in args[4:]:
+        text = open(source).read()
+        if "syntax error" in text:
+            print(source + ": error: syntax error")
+            sys.exit(1)
+        name = os.path.basename(source).replace(".java", ".class")
+        open(os.path.join(classes, name), "w").write(text)
+else:
+    classes = args[args.index("--class-path") + 1]
+    for name in sorted(os.listdir(classes)):
+        print("Test " + name + " SUCCESS")
+"""
+
+
+@pytest.fixture
+def builder(tmp_path, monkeypatch):
+    tool = tmp_path / "fake_java.py"
+    tool.write_text(FAKE_TOOL)
+    log = tmp_path / "calls.log"
+    log.touch()
+    monkeypatch.setenv("FAKE_JAVA_LOG", str(log))
+    builder = JavaBuilder(tmp_path / "junit.jar", tmp_path / "cache", max_concurrency=2,
+                          javac=[sys.executable, str(tool)], java=[sys.executable, str(tool)])
+    builder.calls = lambda: log.read_text().splitlines()
+    return builder
+
+
+def test_source_filename():
+    assert source_filename("import x;\npublic final class Calculator {}", "Main") == "Calculator.java"
+    assert source_filename("class Helper {}", "Main") == "Main.java"
+
+
+@pytest.mark.asyncio
+async def test_identical_sources_compile_once(builder):
+    code, tests = "public class Main {}", "public class MainTest {}"
+    first = await builder.build_and_test(code, tests)
+    second = await builder.build_and_test(code, tests)
+
+    assert first["compiled"] and not first["cached"]
+    assert second["cached"]
+    assert "Test Main.class SUCCESS" in second["test_output"]
+    assert builder.calls().count("-d") == 1
+    assert builder.calls().count("-jar") == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_builds_are_isolated_and_limited(builder):
+    sources = [(f"public class Main {{ int v = {i}; }}", f"public class MainTest{i} {{}}") for i in range(4)]
+    started = time.monotonic()
+    builds = await asyncio.gather(*(builder.compile(code, tests) for code, tests in sources))
+    elapsed = time.monotonic() - started
+
+    for (code, tests), build in zip(sources, builds):
+        assert build["compiled"]
+        assert open(f"{build['classes']}/Main.class").read() == code
+    # Four builds, two at a time
+    assert elapsed >= 0.4
+    assert not [p for p in builder.cache_dir.iterdir() if p.name.startswith(".build-")]
+
+
+@pytest.mark.asyncio
+async def test_compile_errors_are_reported_and_cached(builder):
+    result = await builder.build_and_test("public class Main { syntax error }", "public class MainTest {}")
+    assert not result["compiled"]
+    assert "syntax error" in result["output"]
+    assert result["test_output"] is None
+
+    again = await builder.compile("public class Main { syntax error }", "public class MainTest {}")
+    assert again["cached"] and not again["compiled"]
+    assert builder.stats()["compile_failures"] == 1
@@ -0,0 +1,64 @@
+import shutil
+import pytest
+import pytest_asyncio
+from execution import JavaSnippetPool, ResourceLimits
+
+pytestmark = pytest.mark.skipif(shutil.which("java") is None, reason="needs a JDK")
+
+@pytest_asyncio.fixture
+async def pool():
+    pool = JavaSnippetPool(size=1, max_runs=3)
+    yield pool
+    await pool.close()
+
+@pytest.mark.asyncio
+async def test_runs_statements(pool):
+    result = await pool.run('int x = 6 * 7;\nSystem.out.println("answer " + x);')
+    usage = result.pop("usage")
+    assert result == {"status": "completed", "result": "answer 42\n"}
+    assert usage["wall_time"] > 0
+
+@pytest.mark.asyncio
+async def test_runs_class_with_main(pool):
+    code = 'public class Hello {\n    public static void main(String[] args) {\n        System.out.println("hi");\n    }\n}'
+    result = await pool.run(code)
+    result.pop("usage")
+    assert result == {"status": "completed", "result": "hi\n"}
+
+@pytest.mark.asyncio
+async def test_compile_error_reports_line(pool):
+    result = await pool.run('int x = 1;\nString s = x;')
+    assert result["status"] == "error"
+    assert "line 2" in result["error"]
+
+@pytest.mark.asyncio
+async def test_exception_reported(pool):
+    result = await pool.run('throw new IllegalStateException("boom");')
+    assert result["status"] == "error"
+    assert "IllegalStateException: boom" in result["error"]
+
+@pytest.mark.asyncio
+async def test_static_state_reset_between_runs(pool):
+    code = 'public class Counter {\n    static int n;\n    public static void main(String[] args) {\n        System.out.println(++n);\n    }\n}'
+    assert (await pool.run(code))["result"] == "1\n"
+    assert (await pool.run(code))["result"] == "1\n"
+
+@pytest.mark.asyncio
+async def test_timeout_replaces_worker(pool):
+    result = await pool.run('while (true) {}', timeout=2)
+    assert result["status"] == "timeout"
+    assert "timed out" in result["error"]
+    result = await pool.run('System.out.println("next");')
+    assert result["result"] == "next\n"
+
+@pytest.mark.asyncio
+async def test_heap_is_capped_by_memory_limit():
+    pool = JavaSnippetPool(size=1, limits=ResourceLimits(memory_bytes=64 * 1024 ** 2))
+    try:
+        result = await pool.run('byte[] data = new byte[256 * 1024 * 1024];')
+        assert result["status"] == "oom"
+        assert "OutOfMemoryError" in result["error"]
+        result = await pool.run('System.out.println("after");')
+        assert result["result"] == "after\n"
+    finally:
+        await pool.close()
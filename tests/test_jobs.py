@@ -0,0 +1,147 @@
+import asyncio
+import pytest
+from agents.progress import report_progress, reporting
+from execution import ExecutionStore, ExecutionScheduler, JobManager, QueueFull
+
+def make_manager(max_concurrency=1, max_queue=10):
+    return JobManager(ExecutionStore(), ExecutionScheduler(max_concurrency=max_concurrency, max_queue=max_queue),
+                      progress_scope=reporting)
+
+async def wait_finished(manager, job_id):
+    for _ in range(200):
+        if manager.get(job_id)["status"] in ("completed", "error", "cancelled"):
+            return manager.get(job_id)
+        await asyncio.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+@pytest.mark.asyncio
+async def test_job_reports_phases_and_partial_results():
+    manager = make_manager()
+    release = asyncio.Event()
+
+    async def work():
+        report_progress("research")
+        report_progress("research", {"research": "found it"})
+        await release.wait()
+        report_progress("review")
+        return {"answer": 42}
+
+    job = manager.submit("solve_problem", {"problem_description": "x"}, work)
+    await asyncio.sleep(0.01)
+    status = manager.status(job["job_id"])
+    assert status["status"] == "running"
+    assert status["phase"] == "research"
+    assert status["partial"] == {"research": "found it"}
+    assert "result" not in status
+
+    release.set()
+    record = await wait_finished(manager, job["job_id"])
+    assert record["status"] == "completed"
+    assert record["result"] == {"answer": 42}
+    assert [p["phase"] for p in record["phases"]] == ["research", "review"]
+    assert record["duration"] >= 0
+
+@pytest.mark.asyncio
+async def test_jobs_are_bounded_by_the_scheduler():
+    manager = make_manager(max_concurrency=2)
+    running = 0
+    peak = 0
+
+    async def work():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        return "done"
+
+    jobs = [manager.submit("solve_problem", {}, work) for _ in range(6)]
+    assert [job["status"] for job in jobs].count("queued") == 4
+    assert jobs[-1]["queue_position"] == 4
+    for job in jobs:
+        assert (await wait_finished(manager, job["job_id"]))["status"] == "completed"
+    assert peak == 2
+    assert manager.stats()["completed"] == 6
+
+@pytest.mark.asyncio
+async def test_cancel_queued_and_running_jobs():
+    manager = make_manager(max_concurrency=1)
+    started = asyncio.Event()
+
+    async def work():
+        started.set()
+        await asyncio.sleep(10)
+
+    running = manager.submit("solve_problem", {}, work)
+    queued = manager.submit("solve_problem", {}, work)
+    await started.wait()
+
+    assert await manager.cancel(queued["job_id"])
+    assert await manager.cancel(running["job_id"])
+    assert manager.get(queued["job_id"])["status"] == "cancelled"
+    assert manager.get(running["job_id"])["status"] == "cancelled"
+    # Finished jobs can't be cancelled again
+    assert not await manager.cancel(running["job_id"])
+    assert manager.stats()["active"] == 0
+
+@pytest.mark.asyncio
+async def test_failed_job_records_error():
+    manager = make_manager()
+
+    async def work():
+        raise ValueError("No response generated")
+
+    job = manager.submit("autogen_execute", {}, work)
+    record = await wait_finished(manager, job["job_id"])
+    assert record["status"] == "error"
+    assert record["error"] == "No response generated"
+    assert manager.stats()["failed"] == 1
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_submissions():
+    manager = make_manager(max_concurrency=1, max_queue=1)
+
+    async def work():
+        await asyncio.sleep(10)
+
+    jobs = [manager.submit("solve_problem", {}, work) for _ in range(2)]
+    with pytest.raises(QueueFull):
+        manager.submit("solve_problem", {}, work)
+    for job in jobs:
+        await manager.cancel(job["job_id"])
+
+@pytest.mark.asyncio
+async def test_job_cancelled_before_it_starts_is_recorded():
+    manager = make_manager()
+
+    async def work():
+        await asyncio.sleep(10)
+
+    job = manager.submit("solve_problem", {}, work)
+    queued = manager.submit("solve_problem", {}, work)
+    # Cancelled before its task took its first step
+    manager._tasks[queued["job_id"]].cancel()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    record = manager.get(queued["job_id"])
+    assert record["status"] == "cancelled"
+    assert "finished_at" in record
+    assert manager.stats()["cancelled"] == 1
+    assert queued["job_id"] not in manager._tasks
+    await manager.cancel(job["job_id"])
+
+@pytest.mark.asyncio
+async def test_jobs_do_not_join_the_submitting_request_trace():
+    from monitoring import Tracer
+    tracer = Tracer()
+    manager = make_manager()
+    seen = []
+
+    async def work():
+        with tracer.span("job work") as span:
+            seen.append(span)
+
+    with tracer.trace("request"):
+        job = manager.submit("solve_problem", {}, work)
+    await wait_finished(manager, job["job_id"])
+    assert seen == [None]
@@ -0,0 +1,143 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+import pytest
+from benchmarks import StubLLMServer
+from llm import LLMRouter, RouterClient, Backend, RouterError, parse_backends
+
+PARAMS = {"model": "stub", "messages": [{"role": "user", "content": "hello"}]}
+
+def start_stubs(stack, *latencies, reply="Done. TERMINATE"):
+    return [stack.enter_context(StubLLMServer(latency=latency, reply=reply)) for latency in latencies]
+
+def make_router(servers, **kwargs):
+    max_concurrency = kwargs.pop("max_concurrency", 4)
+    weights = kwargs.pop("weights", [1.0] * len(servers))
+    backends = [Backend(server.base_url, model="stub", weight=weight, max_concurrency=max_concurrency)
+                for server, weight in zip(servers, weights)]
+    return LLMRouter(backends, health_interval=0, **kwargs)
+
+def run_many(router, count, workers):
+    with ThreadPoolExecutor(workers) as pool:
+        return list(pool.map(lambda _: router.complete(PARAMS), range(count)))
+
+def test_least_outstanding_spreads_load_within_caps():
+    with ExitStack() as stack:
+        servers = start_stubs(stack, 0.05, 0.05, 0.05)
+        router = make_router(servers, max_concurrency=2)
+        responses = run_many(router, 24, workers=10)
+        router.close()
+    assert all(r.choices[0].message.content == "Done. TERMINATE" for r in responses)
+    assert sum(server.requests for server in servers) == 24
+    assert all(server.requests >= 6 for server in servers)
+    assert all(server.max_in_flight <= 2 for server in servers)
+    assert router.stats()["waits"] > 0
+
+def test_weighted_routing_follows_weights():
+    with ExitStack() as stack:
+        servers = start_stubs(stack, 0, 0)
+        router = make_router(servers, strategy="weighted", weights=[4.0, 1.0])
+        run_many(router, 50, workers=1)
+        router.close()
+    assert servers[0].requests > servers[1].requests * 2
+
+def test_failing_backend_is_ejected_and_requests_retried():
+    with ExitStack() as stack:
+        servers = start_stubs(stack, 0, 0)
+        servers[0].status = 500
+        router = make_router(servers, failure_threshold=2, strategy="weighted", weights=[1e6, 1.0])
+        responses = [router.complete(PARAMS) for _ in range(10)]
+        router.close()
+    assert all(r.backend == router.backends[1].name for r in responses)
+    # Two failures, then the backend is skipped
+    assert servers[0].requests == 2
+    assert router.backends[0].counters["ejections"] == 1
+    assert router.stats()["retries"] == 2
+
+def test_health_check_ejects_and_restores():
+    with ExitStack() as stack:
+        servers = start_stubs(stack, 0, 0)
+        router = make_router(servers)
+        servers[1].status = 503
+        router.check_health()
+        assert [b["healthy"] for b in router.stats()["backends"]] == [True, False]
+        run_many(router, 5, workers=1)
+        assert servers[1].requests == 0
+
+        servers[1].status = 200
+        router.check_health()
+        assert all(b["healthy"] for b in router.stats()["backends"])
+        router.close()
+
+def test_all_backends_failing_raises():
+    with ExitStack() as stack:
+        servers = start_stubs(stack, 0, 0)
+        for server in servers:
+            server.status = 500
+        router = make_router(servers)
+        with pytest.raises(RouterError):
+            router.complete(PARAMS)
+        router.close()
+    assert sum(server.requests for server in servers) == 2
+
+def test_client_errors_are_not_retried():
+    with ExitStack() as stack:
+        servers = start_stubs(stack, 0, 0)
+        servers[0].status = 400
+        router = make_router(servers, strategy="weighted", weights=[1e6, 1.0])
+        with pytest.raises(RouterError):
+            router.complete(PARAMS)
+        router.close()
+    assert servers[1].requests == 0
+    assert router.backends[0].consecutive_failures == 0
+
+def test_slow_request_is_hedged_to_another_backend():
+    with ExitStack() as stack:
+        slow, fast = start_stubs(stack, 1.0, 0)
+        router = make_router([slow, fast], hedge=True, hedge_min_samples=0, hedge_min_delay=0.05,
+                             strategy="weighted", weights=[1e6, 1.0])
+        response = router.complete(PARAMS)
+        stats = router.stats()
+        router.close()
+    assert response.backend == router.backends[1].name
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+    assert slow.requests == 1
+
+def test_hedge_waits_for_latency_history():
+    router = LLMRouter([Backend("http://127.0.0.1:9/v1")], hedge=True, hedge_min_samples=3, health_interval=0)
+    assert router.hedge_delay() is None
+    router._latencies.extend([0.1, 0.2, 0.3, 2.0])
+    assert router.hedge_delay() == 2.0
+    router.close()
+
+def test_streaming_goes_through_router():
+    with ExitStack() as stack:
+        servers = start_stubs(stack, 0, reply="streamed reply")
+        router = make_router(servers)
+        try:
+            response = router.complete({**PARAMS, "stream": True})
+        except ImportError:
+            pytest.skip("autogen is not installed")
+        finally:
+            router.close()
+    assert response.choices[0].message.content == "streamed reply"
+    assert response.usage.completion_tokens > 0
+
+def test_router_client_for_autogen():
+    with ExitStack() as stack:
+        servers = start_stubs(stack, 0, reply="hi there")
+        router = make_router(servers)
+        client = RouterClient({"model": "stub", "model_client_cls": "RouterClient"}, router=router)
+        response = client.create({"messages": PARAMS["messages"]})
+        router.close()
+    assert client.message_retrieval(response) == ["hi there"]
+    assert client.cost(response) == 0.0
+    assert RouterClient.get_usage(response)["total_tokens"] == response.usage.total_tokens
+
+def test_parse_backends():
+    backends = parse_backends("http://a/v1, http://b/v1/", model="m", api_key="k", max_concurrency=2)
+    assert [b.base_url for b in backends] == ["http://a/v1", "http://b/v1"]
+    assert all(b.model == "m" and b.max_concurrency == 2 for b in backends)
+    backends = parse_backends('[{"base_url": "http://a/v1", "weight": 3, "model": "big"}]', model="m")
+    assert backends[0].weight == 3 and backends[0].model == "big"
+    assert math.isclose(backends[0].ejected_until, 0.0)
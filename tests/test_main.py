@@ -75,3 +75,68 @@ def test_autogen_analyze_data():
     assert result is not None
     assert hasattr(result, "chat_history")
     assert hasattr(result, "summary")
+
+def test_execution_stream_reports_dropped_output_as_truncated():
+    from main import executions, execution_streams
+    from execution import OutputStream
+    stream = OutputStream(max_backlog=10)
+    for i in range(5):
+        stream.publish("stdout", f"chunk {i}\n")
+    stream.close({"status": "completed"})
+    executions["stream-test"] = {"status": "completed", "result": None, "error": None}
+    execution_streams["stream-test"] = stream
+    try:
+        response = client.get("/execution_stream/stream-test")
+    finally:
+        execution_streams.pop("stream-test", None)
+    events = [block.split("\n")[0] for block in response.text.strip().split("\n\n")]
+    assert events[0] == "event: truncated"
+    assert 'data: {"dropped_chunks": 4}' in response.text
+    assert events[-1] == "event: status"
+    assert events.count("event: status") == 1
+
+def test_execution_priority_comes_from_api_key(monkeypatch):
+    import main
+    from starlette.requests import Request
+    monkeypatch.setitem(main.execution_priority_keys, "ops-key", 5)
+
+    def request(headers):
+        return Request({"type": "http", "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()]})
+
+    assert main.request_priority(request({"X-API-Key": "ops-key"})) == 5
+    assert main.request_priority(request({"X-API-Key": "guess"})) == 0
+    assert main.request_priority(request({})) == 0
+
+def test_workflow_steps_get_inputs_without_shifting_their_lines():
+    response = client.post("/workflow/create", json={
+        "name": "inputs",
+        "steps": [
+            {"type": "code", "id": "source", "code": "print(21)"},
+            {"type": "code", "id": "double", "depends_on": ["source"], "code": (
+                "import json, os\n"
+                "value = int(json.loads(os.environ['WORKFLOW_INPUTS'])['source'])\n"
+                "print(value * 2)\n"
+                "raise ValueError('after')"
+            )}
+        ]
+    })
+    workflow_id = response.json()["id"]
+    client.post(f"/workflow/execute/{workflow_id}")
+    status = client.get(f"/workflow/status/{workflow_id}").json()
+    assert status["status"] == "completed"
+    double = status["results"][1]
+    assert double["status"] == "error"
+    assert 'File "<string>", line 4' in double["error"]
+
+def test_completed_execution_keeps_its_stderr():
+    response = client.post("/execute_code", json={
+        "code": "import sys\nprint('out')\nprint('warning', file=sys.stderr)",
+        "language": "python"
+    })
+    execution_id = response.json()["execution_id"]
+    status = client.get(f"/execution_status/{execution_id}").json()
+    assert status["status"] == "completed"
+    assert status["output"]["stderr"]["chars"] == len("warning\n")
+    output = client.get(f"/execution_status/{execution_id}/output", params={"stream": "stderr"}).json()
+    assert output["data"] == "warning\n"
+    assert output["total"] == status["output"]["stderr"]["chars"]
@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+import httpx
+import pytest
+from fastapi import FastAPI
+from monitoring import MetricsRegistry, RequestMetrics, LLMCallMetrics
+
+def test_counter_and_gauge_render():
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Calls", ("outcome",))
+    calls.inc(outcome="ok")
+    calls.inc(2, outcome="ok")
+    calls.inc(outcome='say "hi"')
+    registry.gauge("queued", "Queued", function=lambda: 7)
+    text = registry.render()
+    assert "# TYPE calls_total counter" in text
+    assert 'calls_total{outcome="ok"} 3' in text
+    assert 'calls_total{outcome="say \\"hi\\""} 1' in text
+    assert "queued 7" in text
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, route="/x")
+    text = registry.render()
+    assert 'latency_seconds_bucket{route="/x",le="0.1"} 2' in text
+    assert 'latency_seconds_bucket{route="/x",le="1"} 3' in text
+    assert 'latency_seconds_bucket{route="/x",le="+Inf"} 4' in text
+    assert 'latency_seconds_sum{route="/x"} 3.65' in text
+    assert 'latency_seconds_count{route="/x"} 4' in text
+
+def test_duplicate_metric_rejected():
+    registry = MetricsRegistry()
+    registry.counter("calls_total", "Calls")
+    with pytest.raises(ValueError):
+        registry.gauge("calls_total", "Calls")
+
+@pytest.mark.asyncio
+async def test_request_metrics_use_route_template():
+    registry = MetricsRegistry()
+    latency = registry.histogram("http_request_duration_seconds", "Latency", ("method", "route", "status"))
+    app = FastAPI()
+    app.add_middleware(RequestMetrics, histogram=latency)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        await client.get("/items/1")
+        await client.get("/items/2")
+        await client.get("/missing")
+    assert latency.count(method="GET", route="/items/{item_id}", status=200) == 2
+    assert latency.count(method="GET", route="unmatched", status=404) == 1
+
+def test_llm_calls_counted_per_agent():
+    registry = MetricsRegistry()
+    llm_metrics = LLMCallMetrics(registry)
+    usage = SimpleNamespace(prompt_tokens=12, completion_tokens=5)
+    responses = iter([SimpleNamespace(usage=usage), RuntimeError("backend down")])
+
+    def create(**params):
+        response = next(responses)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    agent = SimpleNamespace(name="fix_proposer", client=SimpleNamespace(create=create))
+    llm_metrics.add_to_agent(agent)
+    agent.client.create(messages=[])
+    with pytest.raises(RuntimeError):
+        agent.client.create(messages=[])
+
+    assert llm_metrics.calls.value(agent="fix_proposer", outcome="ok") == 1
+    assert llm_metrics.calls.value(agent="fix_proposer", outcome="error") == 1
+    assert llm_metrics.tokens.value(agent="fix_proposer", kind="prompt") == 12
+    assert llm_metrics.latency.count(agent="fix_proposer") == 2
+
+def test_agent_without_llm_left_alone():
+    llm_metrics = LLMCallMetrics(MetricsRegistry())
+    agent = SimpleNamespace(name="coordinator", client=None)
+    llm_metrics.add_to_agent(agent)
+    assert agent.client is None
+
+def test_cached_completions_add_no_tokens(tmp_path):
+    from llm import CompletionCache
+    cache = CompletionCache(tmp_path / "cache.sqlite")
+    cache.set("key", SimpleNamespace(usage=SimpleNamespace(prompt_tokens=12, completion_tokens=5)))
+    llm_metrics = LLMCallMetrics(MetricsRegistry())
+    agent = SimpleNamespace(name="researcher", client=SimpleNamespace(create=lambda **params: cache.get("key")))
+    llm_metrics.add_to_agent(agent)
+    agent.client.create(messages=[])
+
+    assert llm_metrics.calls.value(agent="researcher", outcome="cached") == 1
+    assert llm_metrics.calls.value(agent="researcher", outcome="ok") == 0
+    assert llm_metrics.tokens.value(agent="researcher", kind="prompt") == 0
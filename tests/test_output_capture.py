@@ -0,0 +1,104 @@
+import pytest
+from execution import OutputCapture, OutputSpool, OutputRangeUnavailable, InterpreterPool
+
+def test_small_output_stays_in_memory(tmp_path):
+    capture = OutputCapture(head_chars=10, tail_chars=10, spill_prefix=tmp_path / "run")
+    capture.write("stdout", "hello\n")
+    capture.close()
+    assert capture.text("stdout") == "hello\n"
+    assert capture.info()["stdout"] == {"chars": 6, "truncated": False, "spilled_chars": 0}
+    assert list(tmp_path.iterdir()) == []
+
+def test_large_output_keeps_head_and_tail_and_spills(tmp_path):
+    capture = OutputCapture(head_chars=100, tail_chars=100, spill_prefix=tmp_path / "run")
+    lines = [f"line {i}\n" for i in range(10000)]
+    for line in lines:
+        capture.write("stdout", line)
+    full = "".join(lines)
+
+    text = capture.text("stdout")
+    assert text.startswith(full[:100])
+    assert text.endswith(full[-100:])
+    assert f"[... {len(full) - 200} characters omitted ...]" in text
+    # Ranges come from the spill file while the capture is still open
+    middle = capture.read("stdout", 5000, 300)
+    assert middle["data"] == full[5000:5300]
+    assert middle["next_offset"] == 5300
+    assert middle["total"] == len(full)
+
+    capture.close()
+    assert capture.read("stdout", len(full) - 50, 100)["data"] == full[-50:]
+    assert capture.read("stdout", len(full) - 50, 100)["next_offset"] is None
+    assert (tmp_path / "run.stdout.gz").exists()
+    assert not (tmp_path / "run.stderr.gz").exists()
+
+def test_without_spill_only_head_and_tail_are_readable():
+    capture = OutputCapture(head_chars=10, tail_chars=10)
+    capture.write("stderr", "x" * 1000)
+    assert capture.read("stderr", 0, 5)["data"] == "xxxxx"
+    assert capture.read("stderr", 995, 10)["data"] == "xxxxx"
+    with pytest.raises(OutputRangeUnavailable):
+        capture.read("stderr", 500, 10)
+
+def test_spill_is_capped(tmp_path):
+    capture = OutputCapture(head_chars=10, tail_chars=10, spill_prefix=tmp_path / "run", max_spill_chars=100)
+    capture.write("stdout", "a" * 1000)
+    capture.close()
+    assert capture.info()["stdout"]["spilled_chars"] == 100
+    with pytest.raises(OutputRangeUnavailable):
+        capture.read("stdout", 500, 10)
+
+def test_spool_serves_finished_output_from_disk(tmp_path):
+    spool = OutputSpool(tmp_path, head_chars=10, tail_chars=10, max_files=1)
+    capture = spool.capture("first")
+    capture.write("stdout", "0123456789" * 100)
+    info = capture.info()["stdout"]
+    spool.release("first")
+    assert spool.read("first", "stdout", 500, 20, info)["data"] == "01234567890123456789"
+    assert spool.read("small", "stdout", 2, 3, {"chars": 5, "truncated": False}, "hello")["data"] == "llo"
+
+    # Only the most recent max_files spill files are kept
+    capture = spool.capture("second")
+    capture.write("stdout", "z" * 1000)
+    spool.release("second")
+    with pytest.raises(OutputRangeUnavailable):
+        spool.read("first", "stdout", 500, 20, info)
+    assert spool.stats()["truncated"] == 2
+
+@pytest.mark.asyncio
+async def test_pool_output_is_bounded(tmp_path):
+    pool = InterpreterPool(size=1)
+    try:
+        capture = OutputCapture(head_chars=1000, tail_chars=1000, spill_prefix=tmp_path / "run")
+        result = await pool.run("for i in range(200000):\n    print(i)", capture=capture)
+        capture.close()
+        assert result["status"] == "completed"
+        assert len(result["result"]) < 2100
+        assert result["result"].endswith("199999\n")
+        total = capture.info()["stdout"]["chars"]
+        assert total == sum(len(f"{i}\n") for i in range(200000))
+        assert capture.read("stdout", 0, total)["data"] == "".join(f"{i}\n" for i in range(200000))
+    finally:
+        await pool.close()
+
+@pytest.mark.asyncio
+async def test_spill_files_are_written_off_the_event_loop(tmp_path, monkeypatch):
+    import asyncio
+    spool = OutputSpool(tmp_path, head_chars=10, tail_chars=10)
+    capture = spool.capture("run")
+    threads = []
+    original = asyncio.to_thread
+
+    async def to_thread(func, *args):
+        threads.append(func.__name__)
+        return await original(func, *args)
+
+    monkeypatch.setattr(asyncio, "to_thread", to_thread)
+    await capture.awrite("stdout", "small")
+    assert threads == []
+    await capture.awrite("stdout", "x" * 100)
+    await capture.awrite("stdout", "y" * 100)
+    await spool.arelease("run")
+    assert threads == ["write", "write", "close", "_prune"]
+    assert capture.read("stdout", 0, 300)["data"] == "small" + "x" * 100 + "y" * 100
+    assert spool.stats()["truncated"] == 1
@@ -0,0 +1,42 @@
+import asyncio
+import pytest
+from execution import OutputStream
+
+async def collect(stream):
+    return [event async for event in stream.subscribe()]
+
+@pytest.mark.asyncio
+async def test_live_and_late_subscribers_see_everything():
+    stream = OutputStream()
+    stream.publish("stdout", "early\n")
+    live = asyncio.create_task(collect(stream))
+    await asyncio.sleep(0)
+    stream.publish("stderr", "warn\n")
+    stream.close({"status": "completed"})
+
+    expected = [
+        {"event": "stdout", "data": "early\n"},
+        {"event": "stderr", "data": "warn\n"},
+        {"event": "status", "data": {"status": "completed"}},
+    ]
+    assert await live == expected
+    assert await collect(stream) == expected
+
+@pytest.mark.asyncio
+async def test_publish_after_close_is_ignored():
+    stream = OutputStream()
+    stream.close({"status": "error"})
+    stream.publish("stdout", "late\n")
+    assert await collect(stream) == [{"event": "status", "data": {"status": "error"}}]
+
+@pytest.mark.asyncio
+async def test_backlog_is_bounded_for_late_subscribers():
+    stream = OutputStream(max_backlog=10)
+    for i in range(5):
+        stream.publish("stdout", f"chunk{i}\n")
+    stream.close({"status": "completed"})
+    assert await collect(stream) == [
+        {"event": "truncated", "data": {"dropped_chunks": 4}},
+        {"event": "stdout", "data": "chunk4\n"},
+        {"event": "status", "data": {"status": "completed"}},
+    ]
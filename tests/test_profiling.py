@@ -0,0 +1,107 @@
+import os
+import pytest
+from analysis.profiling import ProfileCache, profile_table, format_profile
+
+
+@pytest.fixture
+def table(tmp_path):
+    path = tmp_path / "sales.csv"
+    lines = ["region,units,price,revenue"]
+    for i in range(200):
+        units = "" if i % 50 == 0 else str(i)
+        lines.append(f"{['north', 'south', 'east'][i % 3]},{units},{i * 0.5},{i * 2.0}")
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def test_profile_columns(table):
+    profile = profile_table(table, sample_rows=5)
+    columns = {column["name"]: column for column in profile["columns"]}
+
+    assert profile["rows"] == 200
+    assert columns["region"]["type"] == "string"
+    assert columns["region"]["top_values"][0] == ["north", 67]
+    assert columns["units"]["type"] == "integer"
+    assert columns["units"]["nulls"] == 4
+    assert columns["price"]["type"] == "float"
+    assert columns["price"]["quantiles"]["max"] == 99.5
+    assert columns["revenue"]["quantiles"]["p50"] == pytest.approx(199.0)
+    assert len(profile["sample"]) == 5
+
+
+def test_correlations_skip_columns_with_nulls(table):
+    profile = profile_table(table)
+    assert profile["correlations"] == [{"columns": ["price", "revenue"], "r": 1.0}]
+
+
+def test_long_cell_does_not_widen_the_batch(tmp_path):
+    path = tmp_path / "notes.csv"
+    long_note = "x" * 50000
+    lines = ["id,note"] + [f"{i},short" for i in range(9999)] + [f"9999,{long_note}", f"10000,{long_note}"]
+    path.write_text("\n".join(lines) + "\n")
+    profile = profile_table(path, sample_rows=20000)
+    note = profile["columns"][1]
+
+    assert note["type"] == "string"
+    assert note["distinct"] == 2
+    shortened, count = note["top_values"][1]
+    assert count == 2 and len(shortened) < 300 and "50000 chars" in shortened
+    assert max(len(row[1]) for row in profile["sample"]) < 300
+
+
+def test_column_demoted_to_string(tmp_path):
+    path = tmp_path / "mixed.csv"
+    path.write_text("code\n1\n2\nA7\n")
+    column = profile_table(path)["columns"][0]
+    assert column["type"] == "string"
+    assert column["distinct"] == 3
+
+
+def test_format_profile_is_compact(table):
+    text = format_profile(profile_table(table, sample_rows=3))
+    assert "units: type=integer nulls=4" in text
+    assert "price ~ revenue: r=1.0" in text
+    assert len(text) < len(table.read_text()) / 4
+
+
+def test_cache_skips_parsing_unchanged_files(table, tmp_path, monkeypatch):
+    cache = ProfileCache(tmp_path / "profiles")
+    first = cache.profile(table)
+
+    import analysis.profiling
+    monkeypatch.setattr(analysis.profiling, "profile_table", lambda *args: pytest.fail("parsed again"))
+    assert cache.profile(table) == first
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+    monkeypatch.undo()
+    table.write_text(table.read_text() + "west,1,1.0,2.0\n")
+    os.utime(table, ns=(0, 10 ** 9))
+    assert cache.profile(table)["rows"] == 201
+    assert cache.stats()["misses"] == 2
+
+
+def test_numeric_columns_keep_bounded_state(tmp_path, monkeypatch):
+    import numpy as np
+    import analysis.profiling
+    monkeypatch.setattr(analysis.profiling, "BATCH_ROWS", 1000)
+    monkeypatch.setattr(analysis.profiling, "QUANTILE_SAMPLE", 500)
+    path = tmp_path / "big.csv"
+    path.write_text("x,y\n" + "".join(f"{i},{3 * i + 1}\n" for i in range(20000)))
+    profile = profile_table(path)
+    x = profile["columns"][0]
+
+    values = np.arange(20000)
+    assert x["mean"] == pytest.approx(values.mean())
+    assert x["std"] == pytest.approx(values.std())
+    assert x["quantiles"]["min"] == 0 and x["quantiles"]["max"] == 19999
+    # Quantiles come from the reservoir: close, not exact
+    assert x["quantiles"]["p50"] == pytest.approx(10000, rel=0.1)
+    assert profile["correlations"] == [{"columns": ["x", "y"], "r": 1.0}]
+
+
+def test_tsv_sample_keeps_its_delimiter(tmp_path):
+    path = tmp_path / "people.tsv"
+    path.write_text("name\tcity\nAda\tLondon, UK\n")
+    text = format_profile(profile_table(path))
+    assert "name\tcity" in text
+    assert "Ada\tLondon, UK" in text
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from execution import ExecutionScheduler, QueueFull
+
+@pytest.mark.asyncio
+async def test_waiters_run_by_priority_then_arrival():
+    scheduler = ExecutionScheduler(max_concurrency=1, max_queue=10)
+    order = []
+    release = asyncio.Event()
+
+    async def job(ticket, name):
+        async with ticket:
+            order.append(name)
+            await release.wait()
+
+    tasks = [asyncio.create_task(job(scheduler.admit("first"), "first"))]
+    await asyncio.sleep(0)
+    tickets = [
+        ("low", scheduler.admit("low", priority=0)),
+        ("high", scheduler.admit("high", priority=5)),
+        ("low2", scheduler.admit("low2", priority=0)),
+    ]
+    assert scheduler.queue_info("high")["queue_position"] == 1
+    assert scheduler.queue_info("low2")["queue_depth"] == 3
+
+    tasks += [asyncio.create_task(job(ticket, name)) for name, ticket in tickets]
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(*tasks)
+    assert order == ["first", "high", "low", "low2"]
+    assert scheduler.stats()["running"] == 0
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_with_retry_hint():
+    scheduler = ExecutionScheduler(max_concurrency=1, max_queue=1)
+    scheduler.admit("running")
+    scheduler.admit("waiting")
+    with pytest.raises(QueueFull) as error:
+        scheduler.admit("rejected")
+    assert error.value.retry_after >= 1
+    assert scheduler.stats()["rejected"] == 1
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_gives_up_its_place():
+    scheduler = ExecutionScheduler(max_concurrency=1, max_queue=10)
+    running = scheduler.admit("running")
+    await running.__aenter__()
+    waiting = scheduler.admit("waiting")
+
+    async def wait():
+        async with waiting:
+            pass
+
+    task = asyncio.create_task(wait())
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert scheduler.queue_info("waiting") is None
+
+    await running.__aexit__(None, None, None)
+    assert scheduler.stats()["running"] == 0
+    async with scheduler.admit("next") as ticket:
+        assert ticket.wait_time < 1
+
+@pytest.mark.asyncio
+async def test_slot_is_granted_only_when_the_ticket_is_entered():
+    scheduler = ExecutionScheduler(max_concurrency=1, max_queue=10)
+    idle = scheduler.admit("idle")
+    assert scheduler.queue_info("idle") is None
+    # idle's task never started, so it doesn't hold the only slot
+    async with scheduler.admit("next"):
+        assert scheduler.stats()["running"] == 1
+        assert scheduler.queue_info("idle")["queue_position"] == 1
+    idle.cancel()
+    assert scheduler.queue_info("idle") is None
+    assert scheduler.stats()["running"] == 0 and scheduler.stats()["queued"] == 0
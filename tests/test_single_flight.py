@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from llm.single_flight import SingleFlight, ClientDisconnected, request_key, cancel_on_disconnect
+
+
+def test_request_key_normalizes_whitespace():
+    assert request_key("solve", {"prompt": "sort  a\nlist "}) == request_key("solve", {"prompt": "sort a list"})
+    assert request_key("solve", {"prompt": "a"}) != request_key("improve", {"prompt": "a"})
+    assert request_key("solve", {"prompt": "a", "use_cache": True}) != request_key("solve", {"prompt": "a", "use_cache": False})
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_share_one_call():
+    flight = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"answer": 42}
+
+    results = await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+    assert calls == 1
+    assert all(result == {"answer": 42} for result in results)
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 4, "cancelled": 0}
+
+    await flight.do("k", work)
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(flight.do("k", work), flight.do("k", work), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_work_survives_until_last_waiter_leaves():
+    flight = SingleFlight()
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def work():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    first = asyncio.create_task(flight.do("k", work))
+    second = asyncio.create_task(flight.do("k", work))
+    await started.wait()
+
+    first.cancel()
+    await asyncio.sleep(0.01)
+    assert not cancelled.is_set()
+
+    second.cancel()
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert flight.stats()["cancelled"] == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancel_on_disconnect():
+    flight = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def gone():
+        return True
+
+    with pytest.raises(ClientDisconnected):
+        await cancel_on_disconnect(flight.do("k", work), gone, interval=0.01)
+    await asyncio.wait_for(cancelled.wait(), 1)
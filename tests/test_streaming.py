@@ -0,0 +1,70 @@
+import asyncio
+import pytest
+from autogen.io.base import IOStream
+from agents import ChatStreamer, last_code_block
+
+class FakeAgent:
+    def __init__(self, name):
+        self.name = name
+        self.hooks = {}
+
+    def register_hook(self, hookable_method, hook):
+        self.hooks.setdefault(hookable_method, []).append(hook)
+
+    def reply(self, messages):
+        for hook in self.hooks["process_all_messages_before_reply"]:
+            messages = hook(messages)
+        return messages
+
+    def send(self, message, recipient):
+        for hook in self.hooks["process_message_before_send"]:
+            message = hook(sender=self, message=message, recipient=recipient, silent=False)
+        return message
+
+@pytest.mark.asyncio
+async def test_turns_tokens_and_messages_are_streamed():
+    streamer = ChatStreamer()
+    assistant, proxy = FakeAgent("assistant"), FakeAgent("user_proxy")
+    streamer.add_to_agent(assistant)
+    streamer.add_to_agent(proxy)
+    events = []
+
+    with streamer.stream(lambda event, data: events.append((event, data))):
+        assistant.reply([{"content": "task"}])
+
+        # Like autogen: the stream is looked up on the loop, then tokens are
+        # printed (colored) from a worker thread
+        iostream = IOStream.get_default()
+
+        def generate():
+            iostream.print("\x1b[32mprint(", end="")
+            iostream.print("1)\x1b[0m", end="")
+            iostream.print("assistant (to user_proxy):")
+
+        await asyncio.get_running_loop().run_in_executor(None, generate)
+        assert assistant.send({"content": "print(1)"}, proxy) == {"content": "print(1)"}
+        await asyncio.sleep(0)
+
+    assert events == [
+        ("turn", {"agent": "assistant"}),
+        ("token", {"agent": "assistant", "text": "print("}),
+        ("token", {"agent": "assistant", "text": "1)"}),
+        ("message", {"sender": "assistant", "recipient": "user_proxy", "content": "print(1)"})
+    ]
+
+def test_hooks_do_nothing_outside_a_stream():
+    streamer = ChatStreamer()
+    agent = FakeAgent("assistant")
+    streamer.add_to_agent(agent)
+    assert agent.reply([{"content": "x"}]) == [{"content": "x"}]
+    assert agent.send("hello", FakeAgent("user_proxy")) == "hello"
+
+def test_last_code_block_prefers_latest():
+    texts = [
+        "```python\nprint('first')\n```",
+        "Fixed:\n```python\nprint('a')\n```\nand\n```Python\nprint('second')\n```",
+        "exitcode: 0",
+        "TERMINATE"
+    ]
+    assert last_code_block(texts, "python") == "print('second')"
+    assert last_code_block(texts, "java") is None
@@ -0,0 +1,98 @@
+import asyncio
+import re
+import time
+import pytest
+from stub_llm import StubLLMServer
+from agents import TeamManager
+
+LATENCY = 0.5
+
+@pytest.fixture
+def stub_config_list(monkeypatch):
+    monkeypatch.setenv("AUTOGEN_USE_DOCKER", "False")
+    with StubLLMServer(latency=LATENCY) as server:
+        yield [{"model": "stub", "base_url": server.base_url, "api_key": "stub"}]
+
+@pytest.mark.asyncio
+async def test_research_and_debug_overlap(stub_config_list):
+    team_manager = TeamManager(stub_config_list)
+    started = time.monotonic()
+    results = await team_manager.analyze_and_improve("example.py")
+    elapsed = time.monotonic() - started
+
+    assert set(results["research"]) >= {"code_analysis", "solution_research", "test_strategy"}
+    assert set(results["debug"]) >= {"error_analysis", "fix_proposal", "validation_plan"}
+    # Three sequential chats per team; run one after the other they'd take 6 x LATENCY
+    assert elapsed < 5 * LATENCY
+
+@pytest.mark.asyncio
+async def test_team_chats_leave_event_loop_responsive(stub_config_list):
+    team_manager = TeamManager(stub_config_list)
+    ticks = 0
+
+    async def heartbeat():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.05)
+            ticks += 1
+
+    beat = asyncio.create_task(heartbeat())
+    await team_manager.debug_team.validate_fix({"original_issue": "bug", "fix": "patch"})
+    beat.cancel()
+    assert ticks >= LATENCY / 0.05 / 2
+
+@pytest.mark.asyncio
+async def test_chat_timeout(stub_config_list):
+    team_manager = TeamManager(stub_config_list, chat_timeout=LATENCY / 5)
+    with pytest.raises(asyncio.TimeoutError):
+        await team_manager.debug_team.validate_fix({"original_issue": "bug", "fix": "patch"})
+
+@pytest.mark.asyncio
+async def test_research_phases_fan_out(stub_config_list):
+    team_manager = TeamManager(stub_config_list)
+    started = time.monotonic()
+    results = await team_manager.research_team.analyze_codebase("example.py")
+    elapsed = time.monotonic() - started
+
+    assert set(results["phase_latency"]) == {"code_analysis", "solution_research", "test_strategy"}
+    assert all(latency >= LATENCY for latency in results["phase_latency"].values())
+    assert elapsed < 2 * LATENCY
+
+@pytest.mark.asyncio
+async def test_research_phase_limit(stub_config_list):
+    team_manager = TeamManager(stub_config_list, research_concurrency=1)
+    started = time.monotonic()
+    await team_manager.research_team.research_solution("slow function")
+    assert time.monotonic() - started >= 2 * LATENCY
+
+@pytest.mark.asyncio
+async def test_chats_without_terminate_stop_when_repeating(monkeypatch):
+    monkeypatch.setenv("AUTOGEN_USE_DOCKER", "False")
+    with StubLLMServer(reply="I need more details about the issue.") as server:
+        team_manager = TeamManager([{"model": "stub", "base_url": server.base_url, "api_key": "stub"}])
+        await team_manager.debug_team.validate_fix({"original_issue": "bug", "fix": "patch"})
+
+    # The assistant repeats itself on its second reply instead of running
+    # through the coordinator's whole auto-reply budget
+    assert server.requests <= 2
+    report = team_manager.monitor.stats()["recent_chats"][-1]
+    assert report["reason"] == "repeated"
+
+@pytest.mark.asyncio
+async def test_concurrent_chats_get_their_own_replies(monkeypatch):
+    monkeypatch.setenv("AUTOGEN_USE_DOCKER", "False")
+
+    def reply(body):
+        issue = re.search(r"ISSUE-\d+", body["messages"][-1]["content"]).group(0)
+        return f"Fix for {issue} verified. TERMINATE"
+
+    with StubLLMServer(latency=LATENCY, reply=reply) as server:
+        team_manager = TeamManager([{"model": "stub", "base_url": server.base_url, "api_key": "stub"}])
+        results = await asyncio.gather(*(
+            team_manager.debug_team.validate_fix({"original_issue": issue, "fix": "patch"})
+            for issue in ("ISSUE-1", "ISSUE-2")
+        ))
+
+    first, second = (result["validation_result"] for result in results)
+    assert "ISSUE-1" in first and "ISSUE-2" not in first
+    assert "ISSUE-2" in second and "ISSUE-1" not in second
@@ -0,0 +1,84 @@
+import time
+import pytest
+from agents.termination import ConvergenceMonitor, is_termination_msg
+
+
+@pytest.mark.parametrize("content", [
+    "Done. TERMINATE", "TERMINATE", "**TERMINATE**", "All tests pass.\n\nterminate.", "Finished! Terminate"
+])
+def test_termination_detected(content):
+    assert is_termination_msg({"content": content})
+
+
+@pytest.mark.parametrize("message", [
+    {"content": "Reply with TERMINATE when finished"},
+    {"content": "The process will terminate."},
+    {"content": None},
+    {"tool_calls": [{"id": "1"}]},
+    {},
+    None,
+])
+def test_termination_not_detected(message):
+    assert not is_termination_msg(message)
+
+
+def user(content):
+    return {"role": "user", "content": content}
+
+
+def assistant(content):
+    return {"role": "assistant", "content": content}
+
+
+def test_repeated_message_stops_chat():
+    monitor = ConvergenceMonitor()
+    messages = [user("task"), assistant("I need more information."), user(""), assistant("I need more  information.")]
+    assert monitor.stop_reason(messages) == "repeated"
+
+
+def test_success_without_new_code_converges():
+    monitor = ConvergenceMonitor()
+    code = assistant("```python\nprint(1)\n```")
+    success = user("exitcode: 0 (execution succeeded)\nCode output: 1")
+    failure = user("exitcode: 1 (execution failed)\nCode output: Traceback")
+
+    # The assistant still gets to answer the execution result
+    assert monitor.stop_reason([user("task"), code, success]) is None
+    assert monitor.stop_reason([user("task"), code, success, assistant("It printed 1.")]) == "converged"
+    assert monitor.stop_reason([user("task"), code, success, assistant("Next:\n```python\nprint(2)\n```")]) is None
+    assert monitor.stop_reason([user("task"), code, failure, assistant("Try again later.")]) is None
+
+
+def test_limits_apply_within_a_chat_scope():
+    monitor = ConvergenceMonitor(max_seconds=60, max_tokens=100)
+    messages = [user("task"), assistant("x" * 200)]
+
+    assert monitor.check(None, messages) == (False, None)
+    with monitor.chat("budget") as state:
+        assert monitor.check(None, messages) == (False, None)
+        assert monitor.check(None, messages) == (True, None)
+    assert state["reason"] == "token_limit"
+
+    monitor = ConvergenceMonitor(max_seconds=0.01)
+    with monitor.chat("slow") as state:
+        time.sleep(0.02)
+        assert monitor.check(None, messages) == (True, None)
+    assert state["reason"] == "time_limit"
+
+
+def test_turns_reported_per_chat():
+    monitor = ConvergenceMonitor()
+    with monitor.chat("first"):
+        monitor.check(None, [user("task")])
+        monitor.check(None, [user("task"), assistant("answer")])
+        monitor.check(None, [user("task"), assistant("answer"), user("TERMINATE")])
+    with pytest.raises(RuntimeError):
+        with monitor.chat("second"):
+            raise RuntimeError("boom")
+
+    stats = monitor.stats()
+    assert stats["chats"] == 2
+    assert stats["stop_reasons"] == {"terminated": 1}
+    assert [(r["chat"], r["turns"], r["reason"]) for r in stats["recent_chats"]] == [
+        ("first", 2, "terminated"), ("second", 0, "error")
+    ]
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+import httpx
+import pytest
+from fastapi import FastAPI
+from monitoring import Tracer, TraceRequests, chrome_trace
+
+class FakeAgent:
+    """Replies like autogen: the LLM call runs on a worker thread, code execution inline"""
+
+    def __init__(self, name, llm_seconds=0.05):
+        self.name = name
+        self.llm_seconds = llm_seconds
+        self.client = SimpleNamespace(create=self._create)
+
+    def _create(self, **params):
+        time.sleep(self.llm_seconds)
+        return SimpleNamespace(model="stub", usage=SimpleNamespace(prompt_tokens=20, completion_tokens=7))
+
+    def execute_code_blocks(self, code_blocks):
+        time.sleep(0.02)
+        return 0, "ok"
+
+    def generate_reply(self, messages=None, sender=None):
+        return self.client.create(messages=messages)
+
+    async def a_generate_reply(self, messages=None, sender=None):
+        # run_in_executor doesn't carry context variables into the thread
+        return await asyncio.get_event_loop().run_in_executor(None, lambda: self.client.create(messages=messages))
+
+@pytest.mark.asyncio
+async def test_turns_llm_calls_and_execution_are_spans():
+    tracer = Tracer()
+    assistant, proxy = FakeAgent("assistant"), FakeAgent("user_proxy")
+    tracer.add_to_agent(assistant)
+    tracer.add_to_agent(proxy)
+
+    with tracer.trace("generate", "req-1"):
+        with tracer.chat("execute_task"):
+            await assistant.a_generate_reply(messages=[], sender=proxy)
+            proxy.execute_code_blocks([("python", "print(1)")])
+
+    trace = tracer.get("req-1")
+    spans = {span["name"]: span for span in trace["spans"]}
+    assert spans["assistant turn"]["parent"] == spans["execute_task"]["id"]
+    assert spans["assistant llm"]["parent"] == spans["assistant turn"]["id"]
+    assert spans["assistant llm"]["attrs"]["completion_tokens"] == 7
+    assert spans["code execution"]["attrs"]["exitcode"] == 0
+    summary = trace["summary"]
+    assert summary["turns"] == 1 and summary["llm_calls"] == 1
+    assert summary["llm_time"] >= 0.05
+    assert summary["execution_time"] >= 0.02
+    assert summary["prompt_tokens"] == 20
+
+@pytest.mark.asyncio
+async def test_concurrent_chats_get_separate_spans():
+    tracer = Tracer()
+    agent = FakeAgent("code_analyzer", llm_seconds=0.1)
+    other = FakeAgent("test_strategist", llm_seconds=0.1)
+    tracer.add_to_agent(agent)
+    tracer.add_to_agent(other)
+
+    async def chat(label, recipient):
+        with tracer.chat(label):
+            await recipient.a_generate_reply(messages=[])
+
+    with tracer.trace("research", "req-2"):
+        started = time.perf_counter()
+        await asyncio.gather(chat("a", agent), chat("b", other))
+        elapsed = time.perf_counter() - started
+
+    summary = tracer.get("req-2")["summary"]
+    assert summary["llm_calls"] == 2
+    # Overlapping calls are counted once
+    assert summary["llm_time"] <= elapsed + 0.01
+
+def test_spans_outside_a_trace_are_not_recorded():
+    tracer = Tracer()
+    agent = FakeAgent("assistant", llm_seconds=0)
+    tracer.add_to_agent(agent)
+    with tracer.span("lonely") as span:
+        assert span is None
+    agent.generate_reply(messages=[])
+    assert tracer.recent() == []
+
+def test_traces_without_spans_are_dropped_and_history_bounded():
+    tracer = Tracer(history=2)
+    with tracer.trace("poll", "empty"):
+        pass
+    for index in range(3):
+        with tracer.trace("work", f"t{index}"):
+            with tracer.span("step"):
+                pass
+    assert tracer.get("empty") is None
+    assert [t["trace_id"] for t in tracer.recent()] == ["t2", "t1"]
+
+def test_exported_traces_read_back_from_directory(tmp_path):
+    tracer = Tracer(history=1, directory=tmp_path)
+    for trace_id in ("first", "second"):
+        with tracer.trace("work", trace_id):
+            with tracer.span("step", "code_execution"):
+                pass
+    assert (tmp_path / "first.json").exists()
+    data = tracer.get("first")
+    assert data["trace_id"] == "first"
+    chrome = chrome_trace(data)
+    assert [e["name"] for e in chrome["traceEvents"] if e["ph"] == "X"] == ["work", "step"]
+    assert tracer.get("../first") is None
+
+@pytest.mark.asyncio
+async def test_trace_id_is_generated_per_request():
+    tracer = Tracer()
+    app = FastAPI()
+    app.add_middleware(TraceRequests, tracer=tracer)
+
+    @app.get("/work")
+    async def work():
+        with tracer.span("step"):
+            await asyncio.sleep(0)
+        return {}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        first = await client.get("/work", headers={"X-Request-ID": "abc-123"})
+        second = await client.get("/work", headers={"X-Request-ID": "abc-123"})
+        invalid = await client.get("/work", headers={"X-Request-ID": "not/valid"})
+    ids = [r.headers["x-request-id"] for r in (first, second, invalid)]
+    # Clients sending the same id still get separate traces
+    assert len(set(ids)) == 3 and "abc-123" not in ids
+    data = tracer.get(ids[0])
+    assert data["name"] == "GET /work"
+    assert data["spans"][0]["attrs"] == {"client_request_id": "abc-123"}
+    assert tracer.get(ids[2])["spans"][0]["attrs"] == {}
@@ -0,0 +1,82 @@
+import asyncio
+import time
+import pytest
+from types import SimpleNamespace
+from execution import WorkflowGraphError, validate_graph, run_workflow_graph
+
+def step(step_id, depends_on=(), delay=0.0, fail=False):
+    depends_on = list(depends_on) if depends_on is not None else None
+    return SimpleNamespace(id=step_id, depends_on=depends_on, delay=delay, fail=fail)
+
+async def fake_run(step, inputs):
+    await asyncio.sleep(step.delay)
+    if step.fail:
+        return {"status": "error", "error": "boom"}
+    return {"status": "completed", "result": f"{step.id}<{','.join(sorted(inputs))}>"}
+
+@pytest.mark.asyncio
+async def test_independent_branches_run_concurrently():
+    steps = [step("a", delay=0.2), step("b", delay=0.2), step("c", delay=0.2), step("join", ["a", "b", "c"])]
+    started = time.monotonic()
+    results = await run_workflow_graph(steps, fake_run, max_parallel=4)
+    assert time.monotonic() - started < 0.4
+    assert [r["step"] for r in results] == ["a", "b", "c", "join"]
+    assert results[3]["result"] == "join<a,b,c>"
+    assert all("duration" in r for r in results)
+
+@pytest.mark.asyncio
+async def test_parallelism_cap_is_respected():
+    running, peak = 0, 0
+
+    async def tracked(step, inputs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        return {"status": "completed"}
+
+    await run_workflow_graph([step(str(i)) for i in range(6)], tracked, max_parallel=2)
+    assert peak == 2
+
+@pytest.mark.asyncio
+async def test_dependents_of_failed_step_are_skipped():
+    steps = [step("a", fail=True), step("b", ["a"]), step("c")]
+    results = await run_workflow_graph(steps, fake_run)
+    assert [r["status"] for r in results] == ["error", "skipped", "completed"]
+
+@pytest.mark.asyncio
+async def test_undeclared_steps_run_in_order():
+    order = []
+
+    async def tracked(step, inputs):
+        order.append(f"start {step.id}")
+        await asyncio.sleep(step.delay)
+        order.append(f"end {step.id}")
+        return {"status": "error"} if step.fail else {"status": "completed"}
+
+    steps = [step("a", None, delay=0.05, fail=True), step("b", None, delay=0.01), step("c", None)]
+    results = await run_workflow_graph(steps, tracked)
+    assert order == ["start a", "end a", "start b", "end b", "start c", "end c"]
+    # Waiting for the step before isn't depending on its result
+    assert [r["status"] for r in results] == ["error", "completed", "completed"]
+
+@pytest.mark.asyncio
+async def test_undeclared_steps_run_concurrently_when_parallel():
+    steps = [step("a", None, delay=0.2), step("b", None, delay=0.2)]
+    started = time.monotonic()
+    await run_workflow_graph(steps, fake_run, parallel=True)
+    assert time.monotonic() - started < 0.35
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(WorkflowGraphError):
+        validate_graph([step("a", ["b"]), step("b", ["a"])])
+    with pytest.raises(WorkflowGraphError):
+        validate_graph([step("a", ["missing"])])
+    with pytest.raises(WorkflowGraphError):
+        validate_graph([step("a"), step("a")])
+    assert validate_graph([SimpleNamespace(id=None, depends_on=[])]) == ["step_0"]
+    # The step before the second one is implicitly its dependency
+    with pytest.raises(WorkflowGraphError):
+        validate_graph([step("a", ["b"]), step("b", None)])
+    assert validate_graph([step("a", ["b"]), step("b", None)], parallel=True) == ["a", "b"]